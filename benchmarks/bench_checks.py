@@ -0,0 +1,381 @@
+"""
+Correctness checks for the bit-level encodings the benchmarks time: packed
+observations (packed_obs), the observation / action message codec
+(comm_module) and the packed action logs (replay.pack_actions); and for the
+vendored Predator-Prey env in resources/, which must play out the same
+episodes as the installed posggym one. Run with `run_benchmarks.py --check`.
+
+Each check returns a list of failure descriptions (empty when it passes).
+"""
+import random
+from itertools import product
+
+import numpy as np
+
+import bench_utils  # noqa: F401  (sets up sys.path for src/ and resources/)
+
+import predator_prey as vendored_pp
+import posggym.envs.grid_world.predator_prey as posggym_pp
+
+from comm_module import ObsDecoder, ObsEncoder, decode_action, encode_action
+from constants import DIRS, DO_NOTHING, ORDERED_DIRS
+from env_pool import make_env
+from obs_features import obs_features
+from packed_obs import PackedObs, pack_obs, pack_obs_array, unpack_obs, unpack_obs_array
+from replay import pack_actions, unpack_actions
+
+MAX_FAILURES = 5  # failures reported per check; the rest are only counted
+
+
+def _random_windows(rng, obs_dim, count):
+    """count random windows (cell codes 0..3) as tuples."""
+    n = (2 * obs_dim + 1) ** 2
+    return [tuple(int(v) for v in row) for row in rng.integers(0, 4, size=(count, n))]
+
+
+def _sliding_windows(rng, obs_dim, steps, width=30, height=30):
+    """
+    Windows seen by an agent random-walking over a random map, with a few
+    cells changed now and then: consecutive windows are mostly shifts of
+    each other, which is what the delta encoding exploits.
+    """
+    size = 2 * obs_dim + 1
+    world = rng.integers(0, 4, size=(height + 2 * size, width + 2 * size))
+    x, y = width // 2, height // 2
+    moves = list(DIRS.values()) + [(0, 0)]
+    out = []
+    for _ in range(steps):
+        dx, dy = moves[rng.integers(len(moves))]
+        x = min(max(x + dx, 0), width - 1)
+        y = min(max(y + dy, 0), height - 1)
+        if rng.random() < 0.3:
+            for _ in range(rng.integers(1, 4)):
+                world[y + size + rng.integers(size), x + size + rng.integers(size)] = rng.integers(4)
+        window = world[y + size:y + 2 * size, x + size:x + 2 * size]
+        out.append(tuple(int(v) for v in window.ravel()))
+    return out
+
+
+def _fail(failures, count, message):
+    if len(failures) < MAX_FAILURES:
+        failures.append(message)
+    return count + 1
+
+
+def check_packed_obs(obs_dims=(1, 2, 4), count=5000, seed=0):
+    """
+    pack_obs / unpack_obs, PackedObs.to_obs and pack_obs_array /
+    unpack_obs_array round-trip random windows, and every PackedObs query
+    (features, has_prey, legal_moves, nearest_prey) equals obs_features.
+    """
+    rng = np.random.default_rng(seed)
+    failures, bad = [], 0
+    decode = obs_features.__wrapped__
+    for obs_dim in obs_dims:
+        n = (2 * obs_dim + 1) ** 2
+        windows = _random_windows(rng, obs_dim, count)
+        for obs in windows:
+            p = PackedObs.from_obs(obs, obs_dim)
+            if unpack_obs(pack_obs(obs), n) != obs or p.to_obs() != obs:
+                bad = _fail(failures, bad, f"packed_obs round trip obs_dim={obs_dim} obs={obs}")
+                continue
+            want = decode(obs, obs_dim)
+            queries = {
+                "features": (p.features(), want),
+                "has_prey": (p.has_prey(), bool(want.prey_offsets)),
+                "legal_moves": (p.legal_moves(), want.legal_moves),
+                "nearest_prey": (p.nearest_prey(), want.nearest_prey),
+            }
+            for query, (got, expected) in queries.items():
+                if got != expected:
+                    bad = _fail(failures, bad, f"PackedObs.{query} obs_dim={obs_dim} obs={obs}: {got} != {expected}")
+
+        cells = np.asarray(windows, dtype=np.uint8)
+        words = pack_obs_array(cells)
+        if not np.array_equal(unpack_obs_array(words, n), cells):
+            bad = _fail(failures, bad, f"pack_obs_array round trip obs_dim={obs_dim}")
+        for i in rng.choice(len(windows), size=min(200, len(windows)), replace=False):
+            if PackedObs.from_words(words[i], obs_dim).to_obs() != windows[i]:
+                bad = _fail(failures, bad, f"PackedObs.from_words obs_dim={obs_dim} row={i}")
+    if bad > len(failures):
+        failures.append(f"... {bad - len(failures)} more")
+    return failures
+
+
+def check_obs_codec(obs_dims=(1, 2, 4), steps=3000, num_agents=4, seed=0):
+    """
+    ObsDecoder.decode(ObsEncoder.encode(obs)) gives back every window, with
+    and without delta encoding, for several agents interleaved on one
+    channel, over random windows and random walks over a map.
+    """
+    rng = np.random.default_rng(seed)
+    failures, bad = [], 0
+    for obs_dim in obs_dims:
+        streams = {
+            "random": [_random_windows(rng, obs_dim, steps // 4) for _ in range(num_agents)],
+            "sliding": [_sliding_windows(rng, obs_dim, steps) for _ in range(num_agents)],
+        }
+        for name, per_agent in streams.items():
+            for delta in (True, False):
+                encoder, decoder = ObsEncoder(obs_dim, delta=delta), ObsDecoder(obs_dim)
+                for t in range(len(per_agent[0])):
+                    for idx in range(num_agents):
+                        obs = per_agent[idx][t]
+                        got_idx, got = decoder.decode(encoder.encode(idx, obs))
+                        if (got_idx, got) != (idx, obs):
+                            bad = _fail(failures, bad, f"obs codec {name} obs_dim={obs_dim} delta={delta} "
+                                                       f"t={t} agent={idx}")
+    for idx in range(8):
+        for action in [DO_NOTHING, *ORDERED_DIRS]:
+            if decode_action(encode_action(idx, action)) != (idx, action):
+                bad = _fail(failures, bad, f"action codec agent={idx} action={action}")
+    if bad > len(failures):
+        failures.append(f"... {bad - len(failures)} more")
+    return failures
+
+
+def check_pack_actions(shapes=((1, 1), (7, 2), (200, 3), (201, 8)), seed=0):
+    """unpack_actions(pack_actions(a)) == a for random action arrays of several shapes."""
+    rng = np.random.default_rng(seed)
+    failures = []
+    for steps, agents in shapes:
+        actions = rng.integers(0, 5, size=(steps, agents)).astype(np.uint8)
+        if not np.array_equal(unpack_actions(pack_actions(actions), steps, agents), actions):
+            failures.append(f"pack_actions round trip shape={(steps, agents)}")
+    return failures
+
+
+# (grid, num_predators, obs_dim) the env checks run on
+ENV_CONFIGS = (
+    ("5x5", 2, 1),
+    ("10x10", 2, 2),
+    ("10x10Blocks", 4, 2),
+    ("15x15Blocks", 3, 3),
+    ("20x20Blocks", 8, 4),
+)
+
+
+def _model_trace(model, seed, steps, action_seed):
+    """
+    (state, observations, rewards, terminations, all_done) of every step of
+    model, seeded with seed and driven by random actions from action_seed;
+    a finished episode restarts from a new initial state.
+    """
+    model.seed(seed)
+    rng = random.Random(action_seed)
+    state = model.sample_initial_state()
+    trace = [(state, model.sample_initial_obs(state))]
+    for _ in range(steps):
+        actions = {aid: rng.randrange(5) for aid in model.possible_agents}
+        ts = model.step(state, actions)
+        trace.append((ts.state, ts.observations, ts.rewards, ts.terminations, ts.all_done))
+        state = ts.state
+        if ts.all_done:
+            state = model.sample_initial_state()
+            trace.append((state, model.sample_initial_obs(state)))
+    return trace
+
+
+def _first_difference(a, b):
+    """Index of the first differing entry of two traces, None if they are equal."""
+    for i, (x, y) in enumerate(zip(a, b)):
+        if x != y:
+            return i
+    return None if len(a) == len(b) else min(len(a), len(b))
+
+
+def check_vendored_model(configs=ENV_CONFIGS, num_prey=(1, 2), steps=1500, seed=0):
+    """
+    The vendored PredatorPreyModel (padded-raster observations, cell tables,
+    with and without incremental observations) gives the same states,
+    observations, rewards and terminations as posggym's for the same seed and
+    actions.
+    """
+    failures = []
+    for grid, num_predators, obs_dim in configs:
+        for n_prey in num_prey:
+            args = (grid, num_predators, n_prey, True, None, obs_dim)
+            want = _model_trace(posggym_pp.PredatorPreyModel(*args), seed, steps, seed)
+            for incremental in (True, False):
+                model = vendored_pp.PredatorPreyModel(*args, incremental_obs=incremental)
+                i = _first_difference(_model_trace(model, seed, steps, seed), want)
+                if i is not None:
+                    failures.append(f"vendored model grid={grid} predators={num_predators} prey={n_prey} "
+                                    f"obs_dim={obs_dim} incremental_obs={incremental}: differs at trace entry {i}")
+    return failures
+
+
+def check_vendored_env(configs=ENV_CONFIGS, num_prey=(1, 2), episodes=5, time_horizon=100, seed=0):
+    """
+    env_pool.make_env gives the same episodes (observations, rewards,
+    terminations, truncations, states) with env_impl='vendored' as with
+    'posggym', through reset(seed=...) and the time limit.
+    """
+    failures = []
+    for (grid, num_predators, _), n_prey in product(configs, num_prey):
+        traces = {}
+        for impl in ("vendored", "posggym"):
+            env = make_env(grid, num_predators, n_prey, time_horizon, env_impl=impl)
+            rng = random.Random(seed)
+            trace = []
+            for ep in range(episodes):
+                obs, _ = env.reset(seed=seed + ep)
+                trace.append((obs, env.unwrapped.state))
+                done = False
+                while not done:
+                    actions = {aid: rng.randrange(5) for aid in env.agents}
+                    obs, rewards, terms, truncs, done, _ = env.step(actions)
+                    trace.append((obs, rewards, terms, truncs, done, env.unwrapped.state))
+            env.close()
+            traces[impl] = trace
+        i = _first_difference(traces["vendored"], traces["posggym"])
+        if i is not None:
+            failures.append(f"make_env grid={grid} predators={num_predators} prey={n_prey}: vendored differs at trace entry {i}")
+    return failures
+
+
+def check_cell_tables(seed=0):
+    """
+    PredatorPreyGrid.get_cell_tables of every vendored SUPPORTED_GRIDS layout
+    equals what posggym's own grid gives per call: get_next_coord for each
+    action, get_neighbours (same order) and manhattan_dist.
+    """
+    failures, bad = [], 0
+    for name, (make_grid, _) in posggym_pp.SUPPORTED_GRIDS.items():
+        want = make_grid()
+        tables = vendored_pp.SUPPORTED_GRIDS[name][0]().get_cell_tables()
+        coords = [(x, y) for y in range(want.height) for x in range(want.width)]
+        cell = {c: i for i, c in enumerate(coords)}
+        if list(tables.coords) != coords:
+            bad = _fail(failures, bad, f"cell tables {name}: coords out of order")
+            continue
+        for i, coord in enumerate(coords):
+            moves = [coord] + [want.get_next_coord(coord, d, ignore_blocks=False)
+                               for d in vendored_pp.ACTION_TO_DIR[1:]]
+            if list(tables.moves[i]) != [cell[c] for c in moves]:
+                bad = _fail(failures, bad, f"cell tables {name}: moves of {coord}")
+            adj = want.get_neighbours(coord, ignore_blocks=False, include_out_of_bounds=False)
+            if list(tables.neighbours[i]) != [cell[c] for c in adj]:
+                bad = _fail(failures, bad, f"cell tables {name}: neighbours of {coord}")
+            if list(tables.dists[i]) != [want.manhattan_dist(coord, c) for c in coords]:
+                bad = _fail(failures, bad, f"cell tables {name}: distances from {coord}")
+    if bad > len(failures):
+        failures.append(f"... {bad - len(failures)} more")
+    return failures
+
+
+def check_obs_cache(configs=(("10x10", 2, 6), ("20x20Blocks", 8, 5), ("15x15Blocks", 4, 2)), steps=1000, seed=0):
+    """
+    Observations of the vendored model with the incremental cache
+    (IncrementalObsCache) equal posggym's, including large obs_dim and calls
+    that leave the step chain: every few steps the model is stepped from an
+    older state, as a lookahead planner would, so the cache must rebuild.
+    """
+    failures = []
+    for grid, num_predators, obs_dim in configs:
+        args = (grid, num_predators, 1, True, None, obs_dim)
+        model = vendored_pp.PredatorPreyModel(*args, incremental_obs=True)
+        ref = posggym_pp.PredatorPreyModel(*args)
+        rng = random.Random(seed)
+        model.seed(seed)
+        state = model.sample_initial_state()
+        history = [state]
+        for t in range(steps):
+            actions = {aid: rng.randrange(5) for aid in model.possible_agents}
+            # branch from an older state now and then
+            branch = rng.random() < 0.1
+            start = rng.choice(history) if branch else state
+            ts = model.step(start, actions)
+            want = ref._get_obs(start, ts.state)
+            if ts.observations != want:
+                failures.append(f"obs cache grid={grid} predators={num_predators} obs_dim={obs_dim} "
+                                f"step={t} branch={branch}")
+                break
+            if not branch:
+                state = ts.state
+                history.append(state)
+                if ts.all_done:
+                    state = model.sample_initial_state()
+                    history.append(state)
+    return failures
+
+
+def check_batched_model(configs=ENV_CONFIGS, num_envs=8, episodes=40, max_episode_steps=60, seed=0):
+    """
+    Every episode BatchedPredatorPreyModel runs (more episodes than slots, so
+    slots auto-reset, and a time limit) equals the scalar vendored model run
+    with the same seed and the actions that episode got: observations,
+    rewards, terminated / truncated and the states it reached.
+    """
+    failures, bad = [], 0
+    for grid, num_predators, obs_dim in configs:
+        for n_prey in (1, 2):
+            args = (grid, num_predators, n_prey, True, None, obs_dim)
+            batch = vendored_pp.BatchedPredatorPreyModel(num_envs, *args, max_episode_steps=max_episode_steps)
+            seeds = list(range(seed, seed + episodes))
+            obs = batch.reset(seeds)
+            rng = np.random.default_rng(seed)
+            # per episode: initial obs, then (actions, timestep fields) per step
+            runs = {int(e): [obs[s].tolist()] for s, e in enumerate(batch.episode_idx) if e >= 0}
+            while batch.num_active:
+                actions = rng.integers(0, 5, size=(num_envs, num_predators))
+                ts = batch.step(actions)
+                for s in np.flatnonzero(ts.episode_idx >= 0):
+                    runs[int(ts.episode_idx[s])].append((
+                        actions[s].tolist(), ts.rewards[s].tolist(), bool(ts.terminated[s]),
+                        bool(ts.truncated[s]), ts.predator_coords[s].tolist(), ts.prey_coords[s].tolist(),
+                        ts.prey_caught[s].tolist(),
+                        None if ts.terminated[s] or ts.truncated[s] else ts.observations[s].tolist(),
+                    ))
+                for s in np.flatnonzero((ts.terminated | ts.truncated) & (batch.episode_idx >= 0)):
+                    runs[int(batch.episode_idx[s])] = [ts.observations[s].tolist()]
+
+            model = vendored_pp.PredatorPreyModel(*args)
+            for ep, run in sorted(runs.items()):
+                model.seed(seeds[ep])
+                state = model.sample_initial_state()
+                want = [[list(o) for o in model.sample_initial_obs(state).values()]]
+                for n, (actions, *_) in enumerate(run[1:], 1):
+                    ts = model.step(state, dict(zip(model.possible_agents, actions)))
+                    state = ts.state
+                    terminated = all(ts.terminations.values())
+                    truncated = n >= max_episode_steps
+                    want.append((
+                        actions, list(ts.rewards.values()), terminated, truncated,
+                        [list(c) for c in state.predator_coords], [list(c) for c in state.prey_coords],
+                        list(state.prey_caught),
+                        None if terminated or truncated else [list(o) for o in ts.observations.values()],
+                    ))
+                    if terminated or truncated:
+                        break
+                if run != want:
+                    i = _first_difference(run, want)
+                    bad = _fail(failures, bad, f"batched model grid={grid} predators={num_predators} prey={n_prey} "
+                                               f"obs_dim={obs_dim} episode={ep}: differs at step {i}")
+    if bad > len(failures):
+        failures.append(f"... {bad - len(failures)} more")
+    return failures
+
+
+CHECKS = {
+    "packed_obs": check_packed_obs,
+    "obs_codec": check_obs_codec,
+    "pack_actions": check_pack_actions,
+    "vendored_model": check_vendored_model,
+    "vendored_env": check_vendored_env,
+    "cell_tables": check_cell_tables,
+    "obs_cache": check_obs_cache,
+    "batched_model": check_batched_model,
+}
+
+
+def run_checks(seed=0, log=print):
+    """Run every check; returns True when all pass."""
+    ok = True
+    for name, check in CHECKS.items():
+        failures = check(seed=seed)
+        log(f"check {name}: {'ok' if not failures else 'FAILED'}")
+        for f in failures:
+            log(f"  {f}")
+        ok &= not failures
+    return ok
@@ -0,0 +1,93 @@
+"""Throughput and size of the comm_module message codec and the packed observation form."""
+import numpy as np
+
+from bench_utils import summarize, timed_call
+
+from bench_planner import _make_env, _rollout
+from comm_module import ObsDecoder, ObsEncoder, decode_action, encode_action
+from obs_features import obs_features
+from packed_obs import PackedObs, pack_obs_array
+
+
+def _record_stream(grid, num_predators, obs_dim, steps, seed):
+    """Per-step (agent_ids, observations, actions) along real 'full' mode episodes."""
+    env = _make_env(grid, num_predators, obs_dim)
+    stream = []
+
+    def on_decide(controller, t, observations, agent_memory):
+        actions = controller.decide_actions(
+            t=t, env=env, observations=observations,
+            agent_memory=agent_memory, keep_prev_action=True,
+        )
+        stream.append((list(env.agents), observations, actions))
+        return actions
+
+    try:
+        _rollout(env, "full", "direct", steps, seed, 1, on_decide)
+    finally:
+        env.close()
+    return stream
+
+
+def bench_codec(grid, num_predators, obs_dim, steps, seed=0):
+    """
+    Time ObsEncoder.encode / ObsDecoder.decode per message over the
+    observation uploads of real episodes (delta and full-window encoding),
+    and encode_action / decode_action per agent. Each record carries the
+    mean encoded bytes per message next to the 1-byte-per-cell raw size.
+    """
+    stream = _record_stream(grid, num_predators, obs_dim, steps, seed)
+    raw_bytes = (2 * obs_dim + 1) ** 2
+    config = dict(grid=grid, num_predators=num_predators, obs_dim=obs_dim, raw_bytes_per_msg=raw_bytes)
+    results = []
+
+    for delta in (True, False):
+        encoder = ObsEncoder(obs_dim, delta=delta)
+        decoder = ObsDecoder(obs_dim)
+        messages = []
+        encode_ns = []
+        for agent_ids, observations, _ in stream:
+            for i, aid in enumerate(agent_ids):
+                msg, ns = timed_call(encoder.encode, i, observations[aid])
+                messages.append(msg)
+                encode_ns.append(ns)
+        decode_ns = [timed_call(decoder.decode, msg)[1] for msg in messages]
+        bytes_per_msg = sum(len(m) for m in messages) / len(messages)
+        results.append(summarize("obs_encode", encode_ns, delta=delta, bytes_per_msg=bytes_per_msg, **config))
+        results.append(summarize("obs_decode", decode_ns, delta=delta, bytes_per_msg=bytes_per_msg, **config))
+
+    action_ns = []
+    for agent_ids, _, actions in stream:
+        for i, aid in enumerate(agent_ids):
+            action_ns.append(timed_call(lambda: decode_action(encode_action(i, actions[aid])))[1])
+    results.append(summarize("action_roundtrip", action_ns, bytes_per_msg=1, **config))
+    return results
+
+
+def bench_packed_obs(grid, num_predators, obs_dim, steps, seed=0):
+    """
+    Time the planner's observation queries on PackedObs (prey check, legal
+    moves, nearest prey) against an uncached obs_features decode of the
+    tuple, over the observations of real episodes, and record the memory of
+    the stream as uint8 cells vs pack_obs_array words.
+    """
+    stream = _record_stream(grid, num_predators, obs_dim, steps, seed)
+    obs_list = [observations[aid] for agent_ids, observations, _ in stream for aid in agent_ids]
+    packed = [PackedObs.from_obs(obs, obs_dim) for obs in obs_list]
+    cells = np.asarray(obs_list, dtype=np.uint8)
+    config = dict(
+        grid=grid, num_predators=num_predators, obs_dim=obs_dim,
+        tuple_bytes=int(cells.nbytes), packed_bytes=int(pack_obs_array(cells).nbytes),
+    )
+
+    decode = obs_features.__wrapped__
+    queries = [
+        ("obs_features_decode", lambda obs, p: decode(obs, obs_dim)),
+        ("packed_has_prey", lambda obs, p: p.has_prey()),
+        ("packed_legal_moves", lambda obs, p: p.legal_moves()),
+        ("packed_nearest_prey", lambda obs, p: p.nearest_prey()),
+    ]
+    return [
+        summarize(name, [timed_call(fn, obs, p)[1] for obs, p in zip(obs_list, packed)], **config)
+        for name, fn in queries
+    ]
@@ -0,0 +1,73 @@
+"""Benchmarks for the Predator-Prey model: step, observation generation and batched stepping."""
+import random
+
+import numpy as np
+
+from bench_utils import summarize, timed_call
+
+import predator_prey as vendored_pp
+import posggym.envs.grid_world.predator_prey as posggym_pp
+
+# The installed posggym model is what run_demo uses; the vendored copy in
+# resources/ carries the grid table / padded raster optimizations.
+MODEL_IMPLS = {
+    "posggym": posggym_pp.PredatorPreyModel,
+    "resources": vendored_pp.PredatorPreyModel,
+}
+
+
+def _make_model(impl, grid, num_predators, obs_dim, seed):
+    model = MODEL_IMPLS[impl](grid, num_predators, 1, True, None, obs_dim)
+    model.seed(seed)
+    return model
+
+
+def bench_model_step(impl, grid, num_predators, obs_dim, steps, seed=0):
+    """Time PredatorPreyModel.step, and _get_obs on the transitions it visits."""
+    model = _make_model(impl, grid, num_predators, obs_dim, seed)
+    rng = random.Random(seed)
+    state = model.sample_initial_state()
+
+    step_ns = []
+    transitions = []
+    for _ in range(steps):
+        actions = {aid: rng.randrange(5) for aid in model.possible_agents}
+        timestep, ns = timed_call(model.step, state, actions)
+        step_ns.append(ns)
+        transitions.append((state, timestep.state))
+        state = timestep.state
+        if timestep.all_done:
+            state = model.sample_initial_state()
+
+    obs_ns = [timed_call(model._get_obs, s, ns_)[1] for s, ns_ in transitions]
+
+    config = dict(impl=impl, grid=grid, num_predators=num_predators, obs_dim=obs_dim)
+    return [
+        summarize("model_step", step_ns, **config),
+        summarize("model_get_obs", obs_ns, **config),
+    ]
+
+
+def bench_batched_step(grid, num_predators, obs_dim, steps, num_envs, seed=0):
+    """Time BatchedPredatorPreyModel.step; throughput counts env steps across the batch."""
+    model = vendored_pp.BatchedPredatorPreyModel(
+        num_envs, grid, num_predators, 1, True, None, obs_dim,
+        max_episode_steps=vendored_pp.SUPPORTED_GRIDS[grid][1],
+    )
+    # enough seeds that no slot goes idle during the run
+    model.reset(list(range(seed, seed + num_envs * (steps + 1))))
+    rng = np.random.default_rng(seed)
+
+    step_ns = []
+    for _ in range(steps):
+        actions = rng.integers(0, 5, size=(num_envs, num_predators))
+        _, ns = timed_call(model.step, actions)
+        step_ns.append(ns)
+
+    return [
+        summarize(
+            "batched_model_step", step_ns, items_per_call=num_envs,
+            impl="resources", grid=grid, num_predators=num_predators,
+            obs_dim=obs_dim, num_envs=num_envs,
+        )
+    ]
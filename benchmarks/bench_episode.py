@@ -0,0 +1,36 @@
+"""End-to-end benchmark of run_demo.run_single_episode."""
+import contextlib
+import io
+
+import gtpyhop
+
+from bench_utils import summarize, timed_call
+
+from run_demo import run_single_episode
+
+gtpyhop.set_verbose_level(0)
+
+
+def bench_run_single_episode(comm_mode, planner, episodes, seed=0, time_horizon=200, pipeline=None,
+                             grid="10x10", num_predators=2, num_prey=1):
+    """Time whole episodes on the given grid and team size; throughput is env steps per second."""
+    episode_ns = []
+    episode_steps = []
+    for ep in range(episodes):
+        with contextlib.redirect_stdout(io.StringIO()):
+            (captured, steps, _), ns = timed_call(
+                run_single_episode,
+                run_idx=ep, seed=seed + ep, time_horizon=time_horizon,
+                comm_mode=comm_mode, planner=planner, pipeline=pipeline,
+                grid=grid, num_predators=num_predators, num_prey=num_prey,
+            )
+        episode_ns.append(ns)
+        episode_steps.append(steps if captured else time_horizon)
+
+    return [
+        summarize(
+            "run_single_episode", episode_ns, items_per_call=episode_steps,
+            comm_mode=comm_mode, planner=planner, pipeline=pipeline, time_horizon=time_horizon,
+            grid=grid, num_predators=num_predators, num_prey=num_prey,
+        )
+    ]
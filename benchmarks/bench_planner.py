@@ -0,0 +1,141 @@
+"""Benchmarks for the communication module and planner plumbing."""
+import gtpyhop
+import posggym
+
+from bench_utils import summarize, timed_call
+
+from comm_module import HTNCommModule, init_agent_memory
+from plan_utils import joint_plan_to_actions
+from prey_belief import PreyBelief
+from wrappers import ActionLoggingWrapper
+
+# find_plan prints every call at the default verbosity
+gtpyhop.set_verbose_level(0)
+
+
+def _make_env(grid, num_predators, obs_dim, num_prey=1):
+    # env_pool.make_env has no obs_dim knob, so build the env directly
+    env = posggym.make(
+        "PredatorPrey-v0",
+        max_episode_steps=200,
+        grid=grid,
+        num_predators=num_predators,
+        num_prey=num_prey,
+        obs_dim=obs_dim,
+    )
+    return ActionLoggingWrapper(env, debug=False)
+
+
+def _rollout(env, comm_mode, planner, steps, seed, k_sync, on_decide):
+    """
+    Drive env with HTNCommModule for `steps` steps, starting a new episode
+    (fresh controller and agent memory) whenever the previous one ends.
+    on_decide(controller, t, observations, agent_memory) must return actions.
+    """
+    done = True
+    episode_seed = seed
+    for _ in range(steps):
+        if done:
+            observations, _ = env.reset(seed=episode_seed)
+            agent_memory = init_agent_memory(list(env.agents), episode_seed)
+            controller = HTNCommModule(mode=comm_mode, k_sync=k_sync, planner=planner)
+            episode_seed += 1
+            t = 0
+        actions = on_decide(controller, t, observations, agent_memory)
+        observations, _, _, _, done, _ = env.step(actions)
+        for aid in env.agents:
+            agent_memory[aid]["prev_action"] = actions[aid]
+        t += 1
+
+
+def bench_decide_actions(grid, num_predators, obs_dim, comm_mode, planner, steps, seed=0, k_sync=5, num_prey=1):
+    """Time HTNCommModule.decide_actions along real episodes."""
+    env = _make_env(grid, num_predators, obs_dim, num_prey)
+    decide_ns = []
+
+    def on_decide(controller, t, observations, agent_memory):
+        actions, ns = timed_call(
+            controller.decide_actions,
+            t=t, env=env, observations=observations,
+            agent_memory=agent_memory, keep_prev_action=True,
+        )
+        decide_ns.append(ns)
+        return actions
+
+    try:
+        _rollout(env, comm_mode, planner, steps, seed, k_sync, on_decide)
+    finally:
+        env.close()
+
+    return [
+        summarize(
+            "decide_actions", decide_ns,
+            grid=grid, num_predators=num_predators, num_prey=num_prey, obs_dim=obs_dim,
+            comm_mode=comm_mode, planner=planner, k_sync=k_sync,
+        )
+    ]
+
+
+def bench_joint_plan_to_actions(grid, num_predators, obs_dim, steps, seed=0):
+    """Time joint_plan_to_actions on the plans found along real episodes."""
+    env = _make_env(grid, num_predators, obs_dim)
+    plans = []
+
+    def on_decide(controller, t, observations, agent_memory):
+        agent_ids = list(env.agents)
+        s = controller._build_htn_state(t, env, observations, agent_memory, True)
+        plan = controller._find_plan(s, agent_ids)
+        plans.append((plan, agent_ids))
+        return joint_plan_to_actions(plan, agent_ids)
+
+    try:
+        _rollout(env, "full", "direct", steps, seed, 1, on_decide)
+    finally:
+        env.close()
+
+    convert_ns = [timed_call(joint_plan_to_actions, plan, agent_ids)[1] for plan, agent_ids in plans]
+    return [
+        summarize(
+            "joint_plan_to_actions", convert_ns,
+            grid=grid, num_predators=num_predators, obs_dim=obs_dim,
+        )
+    ]
+
+
+def bench_prey_belief(grid, num_predators, obs_dim, steps, seed=0):
+    """
+    Time PreyBelief.predict (fresh predator positions every step, so nothing
+    is reused) and update_from_obs along real 'full' mode episodes.
+    """
+    env = _make_env(grid, num_predators, obs_dim)
+    model = env.unwrapped.model
+    frames = []
+
+    def on_decide(controller, t, observations, agent_memory):
+        agent_coords = dict(zip(model.possible_agents, env.unwrapped.state.predator_coords))
+        frames.append((t, agent_coords, observations))
+        return controller.decide_actions(
+            t=t, env=env, observations=observations,
+            agent_memory=agent_memory, keep_prev_action=True,
+        )
+
+    try:
+        _rollout(env, "full", "direct", steps, seed, 1, on_decide)
+    finally:
+        env.close()
+
+    belief = PreyBelief.from_model(model)
+    predict_ns = []
+    update_ns = []
+    for t, agent_coords, observations in frames:
+        if t == 0:
+            belief.reset()
+        else:
+            predict_ns.append(timed_call(belief.predict)[1])
+        update_ns.append(timed_call(belief.update_from_obs, agent_coords, observations)[1])
+
+    config = dict(grid=grid, num_predators=num_predators, obs_dim=obs_dim, cells=model.grid.width * model.grid.height)
+    return [
+        summarize("belief_predict", predict_ns, **config),
+        summarize("belief_update", update_ns, **config),
+    ]
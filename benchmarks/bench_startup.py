@@ -0,0 +1,37 @@
+"""Cold-start benchmark: how long a fresh interpreter takes to be ready to run episodes."""
+import subprocess
+import sys
+import time
+
+from bench_utils import SRC_DIR, summarize
+
+# What a sweep worker (sweep_utils._run_episode_task) imports before its first
+# episode. Keep this under budget: thousands of short-lived workers pay it.
+WORKER_IMPORTS = "import sweep_utils; from run_demo import run_single_episode"
+WORKER_BUDGET_MS = 450
+
+# Baseline: a bare interpreter, to separate our imports from Python's own start-up
+BARE_IMPORTS = "pass"
+
+
+def _cold_start_ns(code):
+    t0 = time.perf_counter_ns()
+    subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=SRC_DIR, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter_ns() - t0
+
+
+def bench_cold_start(repeats, budget_ms=WORKER_BUDGET_MS):
+    """Time fresh-process start-up for the worker import path against budget_ms (judged on p50)."""
+    results = []
+    for name, code, budget in (("interpreter_start", BARE_IMPORTS, None),
+                               ("worker_cold_start", WORKER_IMPORTS, budget_ms)):
+        latencies = [_cold_start_ns(code) for _ in range(repeats)]
+        result = summarize(name, latencies, imports=code)
+        if budget is not None:
+            result["budget_ms"] = budget
+            result["within_budget"] = result["latency_us"]["p50"] / 1e3 <= budget
+        results.append(result)
+    return results
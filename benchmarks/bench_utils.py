@@ -0,0 +1,54 @@
+"""Timing helpers shared by the benchmark modules."""
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC_DIR = os.path.join(ROOT, "src")
+RESOURCES_DIR = os.path.join(ROOT, "resources")
+
+# src/ modules import each other as top-level modules, and the vendored
+# environment in resources/ is imported as `predator_prey`.
+for path in (SRC_DIR, RESOURCES_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def timed_call(fn, *args, **kwargs):
+    """Call fn and return (result, elapsed nanoseconds)."""
+    t0 = time.perf_counter_ns()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter_ns() - t0
+
+
+def summarize(name, latencies_ns, items_per_call=1, **config):
+    """
+    Build one JSON-able result record.
+
+    Args:
+        name: benchmark name
+        latencies_ns: per-call latencies in nanoseconds
+        items_per_call: env steps (or episodes) covered by each call, used for
+                        the throughput figure
+        config: configuration fields recorded alongside the numbers
+    """
+    lat_us = np.asarray(latencies_ns, dtype=np.float64) / 1e3
+    total_sec = lat_us.sum() / 1e6
+    items = items_per_call * len(lat_us) if np.isscalar(items_per_call) else float(np.sum(items_per_call))
+    p50, p90, p99 = np.percentile(lat_us, [50, 90, 99])
+    return {
+        "benchmark": name,
+        **config,
+        "calls": int(len(lat_us)),
+        "total_sec": float(total_sec),
+        "steps_per_sec": float(items / total_sec) if total_sec > 0 else None,
+        "latency_us": {
+            "mean": float(lat_us.mean()),
+            "p50": float(p50),
+            "p90": float(p90),
+            "p99": float(p99),
+            "max": float(lat_us.max()),
+        },
+    }
@@ -0,0 +1,186 @@
+"""
+Benchmark suite entry point.
+
+Times PredatorPreyModel.step / _get_obs (installed posggym and the vendored
+copy in resources/), BatchedPredatorPreyModel.step, HTNCommModule.decide_actions
+per comm mode and planner, joint_plan_to_actions, the prey belief, the comm message codec, end-to-end
+run_single_episode and sweep-worker cold start, and writes steps/sec plus
+latency percentiles as JSON.
+
+Usage (from the repo root):
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --grids 10x10 --predators 2 --steps 200 --output bench.json
+    python benchmarks/run_benchmarks.py --suites planner --grids 15x15,20x20 --predators 2,4,8 --prey 1,4
+    python benchmarks/run_benchmarks.py --check   # encoding round-trip and vendored env checks only, exit 1 on failure
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+import bench_utils  # noqa: F401  (sets up sys.path for src/ and resources/)
+
+# gtpyhop prints a banner on import; keep stdout clean for the JSON report
+with contextlib.redirect_stdout(sys.stderr):
+    from bench_checks import run_checks
+    from bench_codec import bench_codec, bench_packed_obs
+    from bench_env import MODEL_IMPLS, bench_batched_step, bench_model_step
+    from bench_episode import bench_run_single_episode
+    from bench_planner import bench_decide_actions, bench_joint_plan_to_actions, bench_prey_belief
+    from bench_startup import WORKER_BUDGET_MS, bench_cold_start
+    from predator_prey import SUPPORTED_GRIDS
+
+COMM_MODES = ["full", "periodic", "event", "none"]
+PLANNERS = ["gtpyhop", "direct"]
+SUITES = ["env", "batched", "planner", "codec", "episode", "startup"]
+
+
+def _int_list(s):
+    return [int(x) for x in s.split(",") if x]
+
+
+def _str_list(s):
+    return [x for x in s.split(",") if x]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Predator-Prey performance benchmarks")
+    parser.add_argument("--suites", type=_str_list, default=SUITES,
+                        help=f"Comma-separated subset of {','.join(SUITES)} (default all)")
+    parser.add_argument("--grids", type=_str_list, default=list(SUPPORTED_GRIDS),
+                        help="Comma-separated grid names (default: every supported grid)")
+    parser.add_argument("--predators", type=_int_list, default=[2, 4, 8],
+                        help="Comma-separated predator counts (default 2,4,8)")
+    parser.add_argument("--prey", type=_int_list, default=[1],
+                        help="Comma-separated prey counts for the planner and episode suites (default 1)")
+    parser.add_argument("--obs-dims", type=_int_list, default=[1, 2, 4],
+                        help="Comma-separated obs_dim values (default 1,2,4)")
+    parser.add_argument("--steps", type=int, default=1000,
+                        help="Timed calls per env/planner benchmark (default 1000)")
+    parser.add_argument("--num-envs", type=int, default=64,
+                        help="Batch size for the batched model benchmark (default 64)")
+    parser.add_argument("--episodes", type=int, default=10,
+                        help="Episodes per configuration for the run_single_episode benchmark (default 10)")
+    parser.add_argument("--pipelines", type=_str_list, default=["none"],
+                        help="Comma-separated planning pipelines for the episode suite: none,thread,process (default none)")
+    parser.add_argument("--startup-repeats", type=int, default=10,
+                        help="Fresh processes started for the cold-start benchmark (default 10)")
+    parser.add_argument("--startup-budget-ms", type=float, default=WORKER_BUDGET_MS,
+                        help=f"Cold-start budget for the worker import path (default {WORKER_BUDGET_MS})")
+    parser.add_argument("--check", action="store_true",
+                        help="Only run the round-trip / equivalence checks of the bit-level encodings "
+                             "(packed obs, message codec, packed action logs) and of the vendored env "
+                             "against posggym; exit 1 on failure")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default=None,
+                        help="Write JSON here instead of stdout")
+    return parser.parse_args()
+
+
+def _configs(args):
+    for grid in args.grids:
+        for num_predators in args.predators:
+            for obs_dim in args.obs_dims:
+                yield grid, num_predators, obs_dim
+
+
+def run(args):
+    results = []
+
+    def log(msg):
+        print(f"[BENCH] {msg}", file=sys.stderr)
+
+    if "env" in args.suites:
+        for grid, num_predators, obs_dim in _configs(args):
+            for impl in MODEL_IMPLS:
+                log(f"model step/_get_obs impl={impl} grid={grid} predators={num_predators} obs_dim={obs_dim}")
+                results += bench_model_step(impl, grid, num_predators, obs_dim, args.steps, args.seed)
+
+    if "batched" in args.suites:
+        for grid, num_predators, obs_dim in _configs(args):
+            log(f"batched step grid={grid} predators={num_predators} obs_dim={obs_dim}")
+            results += bench_batched_step(grid, num_predators, obs_dim, args.steps, args.num_envs, args.seed)
+
+    if "planner" in args.suites:
+        for grid, num_predators, obs_dim in _configs(args):
+            for num_prey in args.prey:
+                for comm_mode in COMM_MODES:
+                    for planner in PLANNERS:
+                        log(f"decide_actions mode={comm_mode} planner={planner} grid={grid} "
+                            f"predators={num_predators} prey={num_prey} obs_dim={obs_dim}")
+                        results += bench_decide_actions(
+                            grid, num_predators, obs_dim, comm_mode, planner, args.steps, args.seed,
+                            num_prey=num_prey,
+                        )
+            log(f"joint_plan_to_actions grid={grid} predators={num_predators} obs_dim={obs_dim}")
+            results += bench_joint_plan_to_actions(grid, num_predators, obs_dim, args.steps, args.seed)
+            log(f"prey belief predict/update grid={grid} predators={num_predators} obs_dim={obs_dim}")
+            results += bench_prey_belief(grid, num_predators, obs_dim, args.steps, args.seed)
+
+    if "codec" in args.suites:
+        for grid, num_predators, obs_dim in _configs(args):
+            log(f"obs/action codec grid={grid} predators={num_predators} obs_dim={obs_dim}")
+            results += bench_codec(grid, num_predators, obs_dim, args.steps, args.seed)
+            log(f"packed obs queries grid={grid} predators={num_predators} obs_dim={obs_dim}")
+            results += bench_packed_obs(grid, num_predators, obs_dim, args.steps, args.seed)
+
+    if "episode" in args.suites:
+        # run_single_episode always uses the env's default obs_dim, so only
+        # grid and team size vary here
+        for grid, num_predators in ((g, p) for g in args.grids for p in args.predators):
+            for num_prey in args.prey:
+                for comm_mode in COMM_MODES:
+                    for planner in PLANNERS:
+                        for pipeline in args.pipelines:
+                            pipeline = None if pipeline == "none" else pipeline
+                            log(f"run_single_episode mode={comm_mode} planner={planner} pipeline={pipeline} "
+                                f"grid={grid} predators={num_predators} prey={num_prey}")
+                            results += bench_run_single_episode(
+                                comm_mode, planner, args.episodes, args.seed, pipeline=pipeline,
+                                grid=grid, num_predators=num_predators, num_prey=num_prey,
+                            )
+
+    if "startup" in args.suites:
+        log("cold start")
+        results += bench_cold_start(args.startup_repeats, args.startup_budget_ms)
+        for r in results[-1:]:
+            if not r["within_budget"]:
+                log(f"WARNING: worker cold start p50 {r['latency_us']['p50'] / 1e3:.0f} ms "
+                    f"exceeds budget {r['budget_ms']} ms")
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+
+
+def main():
+    args = parse_args()
+    if args.check:
+        ok = run_checks(args.seed, log=lambda msg: print(f"[CHECK] {msg}", file=sys.stderr))
+        sys.exit(0 if ok else 1)
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"[BENCH] Wrote {len(report['results'])} results to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Lockstep episodes for sweeps: many run_single_episode tasks stepped together
+on one BatchedPredatorPreyModel (resources/predator_prey.py).
+
+Every episode keeps its own HTNCommModule and agent memory and decides its
+joint action exactly as run_single_episode does; only env.step is batched.
+The batched model plays out the same episodes as the scalar env for the same
+seed and actions (run_benchmarks.py --check), so a task gives the same
+(captured, steps, stats) either way.
+"""
+import time
+
+import gtpyhop.main
+import numpy as np
+
+from comm_module import HTNCommModule, init_agent_memory
+from env_pool import env_kwargs, vendored_env_module
+from replay import ActionLogRecorder
+from result_sink import CONFIG_DEFAULTS
+from trajectory import TrajectoryRecorder
+from wrappers import manhattan
+
+# Task fields that pick the env; tasks that share them share a batch
+ENV_FIELDS = ("grid", "num_predators", "num_prey", "time_horizon")
+
+# run_single_episode options that only make sense for one episode at a time
+UNSUPPORTED = ("render", "debug", "timing", "pipeline")
+
+
+class _SlotEnv:
+    """
+    The parts of a posggym env that HTNCommModule and the recorders read
+    (agents, unwrapped.model, unwrapped.state), for one slot of a batch.
+    """
+
+    def __init__(self, batch, slot):
+        self.unwrapped = self
+        self.model = batch.model
+        self.agents = list(batch.possible_agents)
+        self._batch = batch
+        self._slot = slot
+
+    @property
+    def state(self):
+        return self._batch.get_state(self._slot)
+
+
+class _Episode:
+    """One task running in a slot: its controller, memory and recorders."""
+
+    def __init__(self, index, task, env, observations):
+        self.index = index
+        self.task = task
+        self.env = env
+        self.agent_ids = list(env.agents)
+        self.observations = {aid: tuple(o) for aid, o in zip(self.agent_ids, observations.tolist())}
+        self.t = 0
+        self.elapsed = 0.0  # own decision time plus its share of the batched steps
+        self.capture_events = []
+
+        seed = task["seed"]
+        time_horizon = task.get("time_horizon", CONFIG_DEFAULTS["time_horizon"])
+        model = env.unwrapped.model
+        self.agent_memory = init_agent_memory(self.agent_ids, seed)
+        self.keep_prev_action = task.get("keep_prev_action", CONFIG_DEFAULTS["keep_prev_action"])
+        self.controller = HTNCommModule(
+            mode=task.get("comm_mode", CONFIG_DEFAULTS["comm_mode"]),
+            k_sync=task.get("k_sync", CONFIG_DEFAULTS["k_sync"]),
+            planner=task.get("planner", CONFIG_DEFAULTS["planner"]),
+            belief=task.get("belief", CONFIG_DEFAULTS["belief"]),
+            paths=task.get("paths", CONFIG_DEFAULTS["paths"]),
+            helper_pursuit=task.get("helper_pursuit", CONFIG_DEFAULTS["helper_pursuit"]),
+        )
+
+        store = task.get("trajectory_store")
+        if store is not None:
+            self.trajectory = store.recorder(task["trajectory_index"])
+        else:
+            self.trajectory = TrajectoryRecorder(time_horizon, model.num_predators, model.num_prey)
+        self.trajectory.reset(env)
+        self.action_log = None
+        if task.get("record_actions"):
+            self.action_log = ActionLogRecorder(time_horizon, self.agent_ids)
+            self.action_log.reset(env, seed, task.get("grid", CONFIG_DEFAULTS["grid"]))
+        self._caught = tuple(env.unwrapped.state.prey_caught)
+
+    def decide(self):
+        """This step's joint action, as a list in agent order."""
+        actions = self.controller.decide_actions(
+            t=self.t,
+            env=self.env,
+            observations=self.observations,
+            agent_memory=self.agent_memory,
+            keep_prev_action=self.keep_prev_action,
+        )
+        if self.action_log is not None:
+            self.action_log.record(actions)
+        for aid in self.agent_ids:
+            self.agent_memory[aid]["prev_action"] = actions[aid]
+        return [actions[aid] for aid in self.agent_ids]
+
+    def record(self, ts, slot, caught, observations):
+        """
+        Record the step slot took in BatchedTimestep ts, given that slot's
+        prey_caught and observations as lists; returns whether the episode ended.
+        """
+        self.trajectory.record_state((ts.predator_coords[slot], ts.prey_coords[slot]))
+
+        # same events as ActionLoggingWrapper._log_capture_events
+        caught = tuple(caught)
+        if caught != self._caught:
+            predators = ts.predator_coords[slot].tolist()
+            for i, (before, after) in enumerate(zip(self._caught, caught)):
+                if before or not after:
+                    continue
+                prey_coord = tuple(ts.prey_coords[slot, i].tolist())
+                involved = [pi for pi, pc in enumerate(predators) if manhattan(pc, prey_coord) <= 1]
+                self.capture_events.append({
+                    "step": self.t,
+                    "wall_time_sec": self.elapsed,
+                    "prey_index": i,
+                    "prey_coord": prey_coord,
+                    "involved_predators": involved,
+                    "num_adjacent": len(involved),
+                    "prey_strength": self.env.unwrapped.model.prey_strength,
+                    "rewards_this_step": dict(zip(self.agent_ids, ts.rewards[slot].tolist())),
+                })
+            self._caught = caught
+
+        self.t += 1
+        if ts.terminated[slot] or ts.truncated[slot]:
+            return True
+        self.observations = {aid: tuple(o) for aid, o in zip(self.agent_ids, observations)}
+        return False
+
+    def finish(self, captured):
+        """(captured, steps_to_capture, CommStats), as run_single_episode returns them."""
+        self.controller.close()
+        stats = self.controller.stats
+        stats.wall_time_sec = self.elapsed
+        stats.capture_events = self.capture_events
+        store = self.task.get("trajectory_store")
+        if store is not None:
+            store.finish(self.task["trajectory_index"], self.trajectory)
+        if self.action_log is not None:
+            stats.action_log = self.action_log.finish()
+        return captured, self.t if captured else None, stats
+
+
+def _check_task(task):
+    for option in UNSUPPORTED:
+        if task.get(option):
+            raise ValueError(f"Batched episodes don't support {option}={task[option]!r}")
+    env_impl = task.get("env_impl", CONFIG_DEFAULTS["env_impl"])
+    if env_impl != "vendored":
+        raise ValueError(f"Batched episodes run the vendored env, not env_impl={env_impl!r}")
+
+
+def _run_group(env_config, tasks, num_envs):
+    """Run tasks that share env_config on one batch; results in task order."""
+    grid, num_predators, num_prey, time_horizon = env_config
+    kwargs = env_kwargs()
+    batch = vendored_env_module().BatchedPredatorPreyModel(
+        min(num_envs, len(tasks)), grid, num_predators, num_prey,
+        kwargs["cooperative"], kwargs["prey_strength"], kwargs["obs_dim"],
+        max_episode_steps=time_horizon,
+    )
+    envs = [_SlotEnv(batch, slot) for slot in range(batch.num_envs)]
+    results = [None] * len(tasks)
+    running = [None] * batch.num_envs
+
+    def start(slot, observations):
+        i = int(batch.episode_idx[slot])
+        running[slot] = _Episode(i, tasks[i], envs[slot], observations) if i >= 0 else None
+
+    observations = batch.reset([task["seed"] for task in tasks])
+    try:
+        for slot in range(batch.num_envs):
+            start(slot, observations[slot])
+        actions = np.zeros((batch.num_envs, num_predators), dtype=np.int64)
+        while batch.num_active:
+            active = [slot for slot in range(batch.num_envs) if running[slot] is not None]
+            for slot in active:
+                t0 = time.perf_counter()
+                actions[slot] = running[slot].decide()
+                running[slot].elapsed += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            ts = batch.step(actions)
+            caught, observations = ts.prey_caught.tolist(), ts.observations.tolist()
+            share = (time.perf_counter() - t0) / len(active)
+            for slot in active:
+                episode = running[slot]
+                episode.elapsed += share
+                if episode.record(ts, slot, caught[slot], observations[slot]):
+                    results[episode.index] = episode.finish(bool(ts.terminated[slot]))
+                    start(slot, ts.observations[slot])
+    finally:
+        for episode in running:
+            if episode is not None:
+                episode.controller.close()
+    return results
+
+
+def run_tasks_batched(tasks, num_envs=64):
+    """
+    Run run_single_episode tasks num_envs at a time in lockstep and return
+    their (captured, steps_to_capture, CommStats) in task order.
+
+    Tasks are grouped by env config (ENV_FIELDS); each group runs on its own
+    BatchedPredatorPreyModel, whose slots start the group's next task as soon
+    as an episode ends. Nothing is printed, and tasks asking for rendering,
+    debug output, timing or a planning pipeline are refused (ValueError).
+    An episode's stats.wall_time_sec is its own decision time plus its share
+    of the batched env steps.
+    """
+    for task in tasks:
+        _check_task(task)
+    groups = {}
+    for i, task in enumerate(tasks):
+        key = tuple(task.get(f, CONFIG_DEFAULTS[f]) for f in ENV_FIELDS)
+        groups.setdefault(key, []).append(i)
+
+    # find_plan prints at gtpyhop's default verbosity (see headless.run_episode)
+    prev_verbose = gtpyhop.main.verbose
+    gtpyhop.main.verbose = 0
+    results = [None] * len(tasks)
+    try:
+        for key, indices in groups.items():
+            for i, result in zip(indices, _run_group(key, [tasks[i] for i in indices], num_envs)):
+                results[i] = result
+    finally:
+        gtpyhop.main.verbose = prev_verbose
+    return results
@@ -1,14 +1,191 @@
 import random
-import gtpyhop
 
-from constants import DO_NOTHING, PREY
-from plan_utils import build_planner_state, joint_plan_to_actions
+from constants import DO_NOTHING, UP, DOWN, LEFT, RIGHT, DIRS
+from obs_features import obs_features
+from packed_obs import obs_masks, pack_obs, unpack_obs
+from plan_pipeline import PIPELINES, PlanWorker
+from plan_utils import build_planner_state, find_joint_plan, joint_plan_to_actions
+from prey_belief import PreyBelief
+
+def init_agent_memory(agent_ids, seed):
+    """Per-agent memory (planner RNG, previous action, ...) for one episode."""
+    return {
+        aid: {
+            "rng": random.Random(seed * 1000 + i),
+            "prev_action": DO_NOTHING,
+        }
+        for i, aid in enumerate(agent_ids)
+    }
+
+
+# ----------------------------------------------------------------------
+# Message layer: binary observation uploads and action downloads
+# ----------------------------------------------------------------------
+# Every message starts with one header byte:
+#   bits 7-6  kind (MSG_*)
+#   bits 5-3  window shift for observations (an action code: the move the
+#             receiver's copy of the last window is shifted by), or the
+#             action itself for MSG_ACTION
+#   bits 2-0  agent index (posggym allows at most 8 predators)
+# Observation windows are packed at 2 bits per cell (packed_obs.pack_obs).
+MSG_OBS_FULL = 0    # header + packed window
+MSG_OBS_DELTA = 1   # header + changed-cell bitmap + packed new values of those cells
+MSG_OBS_SAME = 2    # header only: the shifted last window is exact
+MSG_ACTION = 3      # header only
+
+SHIFTS = (DO_NOTHING, UP, DOWN, LEFT, RIGHT)  # tried in this order; ties keep the first
+
+
+def _header(kind, code, idx):
+    return (kind << 6) | (code << 3) | idx
+
+
+class _WindowShifter:
+    """Predicts an agent's next window as its last one shifted by a move."""
+
+    def __init__(self, obs_dim):
+        masks = obs_masks(obs_dim)
+        size = masks.size
+        self.n = masks.n
+        self.full_mask = masks.full_mask
+        # low bit of every 2-bit cell, to count changed cells with bit_count()
+        self.low_bits = masks.low_bits
+        # bit offset between a cell of the new window and the same grid cell
+        # in the old window, per move
+        self.offsets = {a: 2 * (DIRS[a][1] * size + DIRS[a][0]) for a in DIRS}
+        self.offsets[DO_NOTHING] = 0
+
+    def shift(self, packed, move):
+        off = self.offsets[move]
+        if off >= 0:
+            return packed >> off
+        return (packed << -off) & self.full_mask
+
+
+class ObsEncoder:
+    """
+    Agent side of the observation uplink, for a window of obs_dim.
+
+    encode() turns one observation into one message. With delta=True the
+    window is compared against the last one sent by the same agent, shifted
+    by each possible move: if one of them matches exactly only the header is
+    sent (MSG_OBS_SAME), otherwise the cells that differ from the best
+    candidate are sent (MSG_OBS_DELTA) when that is shorter than the whole
+    packed window (MSG_OBS_FULL).
+    """
+
+    def __init__(self, obs_dim, delta=True):
+        self.shifter = _WindowShifter(obs_dim)
+        self.n = self.shifter.n
+        self.full_len = (2 * self.n + 7) // 8
+        self.bitmap_len = (self.n + 7) // 8
+        self.delta = delta
+        self._last = {}  # agent index -> packed window last sent
+
+    def encode(self, idx, obs):
+        packed = pack_obs(obs)
+        prev = self._last.get(idx)
+        self._last[idx] = packed
+        if prev is None or not self.delta:
+            return bytes((_header(MSG_OBS_FULL, 0, idx),)) + packed.to_bytes(self.full_len, "little")
+
+        shifter = self.shifter
+        low_bits = shifter.low_bits
+        best_move, best_changed, best_count = DO_NOTHING, None, self.n + 1
+        for move in SHIFTS:
+            diff = packed ^ shifter.shift(prev, move)
+            changed = (diff | (diff >> 1)) & low_bits
+            count = changed.bit_count()
+            if count < best_count:
+                best_move, best_changed, best_count = move, changed, count
+                if not count:
+                    return bytes((_header(MSG_OBS_SAME, move, idx),))
+
+        values_len = (2 * best_count + 7) // 8
+        if self.bitmap_len + values_len >= self.full_len:
+            return bytes((_header(MSG_OBS_FULL, 0, idx),)) + packed.to_bytes(self.full_len, "little")
+
+        bitmap = values = k = 0
+        changed = best_changed
+        while changed:
+            low = changed & -changed
+            pos = low.bit_length() - 1        # 2 * cell index
+            bitmap |= 1 << (pos >> 1)
+            values |= ((packed >> pos) & 3) << (2 * k)
+            k += 1
+            changed ^= low
+        return (bytes((_header(MSG_OBS_DELTA, best_move, idx),))
+                + bitmap.to_bytes(self.bitmap_len, "little")
+                + values.to_bytes(values_len, "little"))
+
+
+class ObsDecoder:
+    """Planner side of the observation uplink; mirrors ObsEncoder."""
+
+    def __init__(self, obs_dim):
+        self.shifter = _WindowShifter(obs_dim)
+        self.n = self.shifter.n
+        self.full_len = (2 * self.n + 7) // 8
+        self.bitmap_len = (self.n + 7) // 8
+        self._last = {}  # agent index -> (packed, obs tuple) last received
+
+    def decode(self, msg):
+        """Returns (agent index, observation tuple)."""
+        header = msg[0]
+        kind, move, idx = header >> 6, (header >> 3) & 7, header & 7
+        if kind == MSG_OBS_FULL:
+            packed = int.from_bytes(msg[1:1 + self.full_len], "little")
+        else:
+            packed = self.shifter.shift(self._last[idx][0], move)
+            if kind == MSG_OBS_DELTA:
+                bitmap = int.from_bytes(msg[1:1 + self.bitmap_len], "little")
+                values = int.from_bytes(msg[1 + self.bitmap_len:], "little")
+                mask = patch = k = 0
+                while bitmap:
+                    low = bitmap & -bitmap
+                    pos = 2 * (low.bit_length() - 1)
+                    mask |= 3 << pos
+                    patch |= ((values >> (2 * k)) & 3) << pos
+                    k += 1
+                    bitmap ^= low
+                packed = (packed & ~mask) | patch
+            elif kind != MSG_OBS_SAME:
+                raise ValueError(f"Not an observation message: kind {kind}")
+
+        last = self._last.get(idx)
+        if last is not None and last[0] == packed:
+            return idx, last[1]
+        obs = unpack_obs(packed, self.n)
+        self._last[idx] = (packed, obs)
+        return idx, obs
+
+
+def encode_action(idx, action):
+    return bytes((_header(MSG_ACTION, action, idx),))
+
+
+def decode_action(msg):
+    """Returns (agent index, action)."""
+    header = msg[0]
+    if header >> 6 != MSG_ACTION:
+        raise ValueError(f"Not an action message: kind {header >> 6}")
+    return header & 7, (header >> 3) & 7
+
+
 
 class CommStats:
     """Track communication and replanning events for evaluation."""
     def __init__(self):
-        self.messages = 0   # abstract messages (obs + actions)
+        self.messages = 0   # messages sent (one obs upload + one action download per agent per replan)
+        self.bytes_up = 0   # encoded observation bytes sent to the planner
+        self.bytes_down = 0 # encoded action bytes sent to the agents
         self.replans = 0    # number of planner calls
+        self.timings = None # phase_timing.PhaseTimings when the episode ran with timing=True
+        self.wall_time_sec = None  # episode wall time, filled in by run_single_episode
+        self.capture_events = []   # copy of ActionLoggingWrapper.capture_events for the episode
+        self.action_log = None     # replay.ActionLog when the episode ran with record_actions=True
+        self.stale_plans = 0       # steps acted on a plan older than the latest replan due (pipeline)
+        self.staleness_steps = 0   # summed lag, in steps, of those plans behind that replan
 
 
 class HTNCommModule:
@@ -20,17 +197,73 @@ class HTNCommModule:
     - 'periodic': replan every k steps.
     - 'event': replan only when trigger condition met.
     - 'none': no replanning; agents reuse fixed random plan forever.
+
+    Planners:
+    - 'gtpyhop': plan with gtpyhop.find_plan.
+    - 'direct': plan with pp_htn.find_plan_direct (same plans, less overhead).
+    - 'verify': run both from the same RNG states and raise if they disagree.
+
+    Pipeline (optional, for every mode but 'none'):
+    - None: plan inline, agents act on a plan of the current observations.
+    - 'thread' / 'process': a replan requested at step t runs on a
+      plan_pipeline.PlanWorker while the env executes step t, and agents act
+      on the freshest finished plan. With pipeline_wait=True (default) the
+      controller waits for the plan in flight, so plans are exactly one step
+      old and episodes are reproducible; with False it never waits once a
+      first plan exists, and a replan that comes due while another is in
+      flight is sent on the first step the worker is free. How far the plan
+      in use lags the latest replan that came due is counted in
+      stats.stale_plans and stats.staleness_steps (periodic reuse between
+      replans is not stale). Call close() when the episode ends.
+
+    Every replan goes through the message layer above: each agent uploads its
+    observation as an ObsEncoder message and the planner plans on what
+    ObsDecoder rebuilds from it; each action goes back as one encode_action
+    byte. Encoded sizes are counted in stats.bytes_up / stats.bytes_down.
+    delta=False sends every observation as a full packed window.
+
+    With belief=True the planner also keeps a prey_belief.PreyBelief
+    from what it receives: predicted forward one prey move per step since the
+    last replan (against the predator positions of that replan) and updated
+    with the new windows. Its most likely cell goes into the planner state as
+    s.belief_target, which predators with no prey in sight head for. It is
+    off by default so results stay comparable with the patrol planner.
+
+    paths=True puts the grid's shortest-path table in the planner state, so
+    chase and search moves go around blocks (pp_behavior.path_moves); it
+    changes nothing on grids without blocks. helper_pursuit=True sends a
+    helper that can't see the prey toward the leader's prey instead of
+    copying the leader's move.
     """
     
-    def __init__(self, mode="full", k_sync=5, debug=False):
+    def __init__(self, mode="full", k_sync=5, debug=False, planner="gtpyhop", pipeline=None, pipeline_wait=True, delta=True, belief=False,
+                 paths=False, helper_pursuit=False):
         assert mode in ("full", "periodic", "event", "none"), f"Unknown mode: {mode}"
+        assert planner in ("gtpyhop", "direct", "verify"), f"Unknown planner: {planner}"
+        assert pipeline is None or pipeline in PIPELINES, f"Unknown pipeline: {pipeline}"
         self.mode = mode
         self.k_sync = k_sync
         self.debug = debug
+        self.planner = planner
+        self.pipeline = pipeline
+        self.pipeline_wait = pipeline_wait
+        self.delta = delta
+        self.belief = belief
+        self.paths = paths
+        self.helper_pursuit = helper_pursuit
 
         self.stats = CommStats()
         self._cached_actions = None  # stores most recent joint plan
         self._frozen_plan = None     # used for 'none' mode baseline
+        self._worker = None          # PlanWorker, created on the first pipelined step
+        self._in_flight = None       # (t, Future) of the plan being computed
+        self._plan_t = None          # step whose observations _cached_actions was planned from
+        self._due_t = -1             # step of the latest replan that came due (pipeline)
+        self._requested_t = -1       # step of the latest replan sent to the worker
+        self._obs_tx = None          # ObsEncoder (agents' side), created on the first upload
+        self._obs_rx = None          # ObsDecoder (planner's side)
+        self._prey_belief = None     # PreyBelief, created on the first replan when belief=True
+        self._belief_t = None        # step of the observations last folded into it
 
     def _should_replan(self, t: int, event_triggered: bool) -> bool:
         if self.mode == "full":
@@ -41,21 +274,62 @@ class HTNCommModule:
             return event_triggered or (t % 10 == 0)  # fallback every 10 steps
         return False  # for "none"
 
-    def _compute_event_trigger(self, observations) -> bool:
-        triggered = any(PREY in obs for obs in observations.values())
+    def _compute_event_trigger(self, observations, obs_dim) -> bool:
+        triggered = any(obs_features(obs, obs_dim).prey_offsets for obs in observations.values())
         if self.debug:
             print(f"[COMM] Event trigger = {triggered}")
         return triggered
 
-    def _build_htn_state(self, env, observations, agent_memory, keep_prev_action):
+    def _build_htn_state(self, t, env, observations, agent_memory, keep_prev_action):
         agent_ids = list(env.agents)
-        s = build_planner_state(env, observations)
+        s = build_planner_state(env, observations, paths=self.paths)
+        s.helper_pursuit = self.helper_pursuit
         s.prev_actions = {aid: agent_memory[aid]["prev_action"] for aid in agent_ids}
         s.keep_prev_action = keep_prev_action
         s.rngs = {aid: agent_memory[aid]["rng"] for aid in agent_ids}
         s.agent_ids = agent_ids
+        s.belief_target = self._update_belief(t, env, s) if self.belief else None
         return s
 
+    def _update_belief(self, t, env, s):
+        """Fold the observations of step t into the prey belief; returns its most likely cell."""
+        if self._prey_belief is None:
+            self._prey_belief = PreyBelief.from_model(env.unwrapped.model)
+        else:
+            for _ in range(t - self._belief_t):
+                self._prey_belief.predict()
+        self._belief_t = t
+        self._prey_belief.update_from_obs({aid: s.agent_coords[aid] for aid in s.obs}, s.obs)
+        return self._prey_belief.mode()
+
+    def _upload(self, env, observations):
+        """Send every agent's observation to the planner; returns what the planner received."""
+        agent_ids = list(env.agents)
+        if self._obs_tx is None:
+            obs_dim = env.unwrapped.model.obs_dim
+            self._obs_tx = ObsEncoder(obs_dim, delta=self.delta)
+            self._obs_rx = ObsDecoder(obs_dim)
+        received = {}
+        for i, aid in enumerate(agent_ids):
+            msg = self._obs_tx.encode(i, observations[aid])
+            self.stats.bytes_up += len(msg)
+            idx, obs = self._obs_rx.decode(msg)
+            received[agent_ids[idx]] = obs
+        return received
+
+    def _download(self, agent_ids, actions):
+        """Send the joint action to the agents; returns what they received."""
+        received = {}
+        for i, aid in enumerate(agent_ids):
+            msg = encode_action(i, actions[aid])
+            self.stats.bytes_down += len(msg)
+            idx, action = decode_action(msg)
+            received[agent_ids[idx]] = action
+        return received
+
+    def _find_plan(self, s, agent_ids):
+        return find_joint_plan(s, agent_ids, self.planner)
+
     def decide_actions(self, t, env, observations, agent_memory, keep_prev_action):
         """
         Decide actions based on current communication mode.
@@ -65,26 +339,31 @@ class HTNCommModule:
         """
         agent_ids = list(env.agents)
         M = len(agent_ids)
-        event_triggered = self._compute_event_trigger(observations)
+        event_triggered = self._compute_event_trigger(observations, env.unwrapped.model.obs_dim)
 
         if self.mode == "none":
             if self._frozen_plan is None:
-                s = self._build_htn_state(env, observations, agent_memory, keep_prev_action)
-                plan = gtpyhop.find_plan(s, [("choose_joint_action", tuple(env.agents))])
-                self._frozen_plan = joint_plan_to_actions(plan, list(env.agents))
+                received = self._upload(env, observations)
+                s = self._build_htn_state(t, env, received, agent_memory, keep_prev_action)
+                plan = self._find_plan(s, list(env.agents))
+                self._frozen_plan = self._download(agent_ids, joint_plan_to_actions(plan, agent_ids))
                 self.stats.messages += 2 * len(env.agents)
                 self.stats.replans += 1
             return self._frozen_plan
 
+        if self.pipeline is not None:
+            return self._decide_pipelined(t, env, observations, agent_memory, keep_prev_action, event_triggered)
+
         if not self._should_replan(t, event_triggered) and self._cached_actions is not None:
             if self.debug:
                 print(f"[COMM] t={t}: reuse cached plan (mode={self.mode}, event={event_triggered})")
             return self._cached_actions
 
         # --- Replanning path ---
-        s = self._build_htn_state(env, observations, agent_memory, keep_prev_action)
-        plan = gtpyhop.find_plan(s, [("choose_joint_action", tuple(agent_ids))])
-        actions = joint_plan_to_actions(plan, agent_ids)
+        received = self._upload(env, observations)
+        s = self._build_htn_state(t, env, received, agent_memory, keep_prev_action)
+        plan = self._find_plan(s, agent_ids)
+        actions = self._download(agent_ids, joint_plan_to_actions(plan, agent_ids))
 
         self.stats.replans += 1
         self.stats.messages += 2 * M
@@ -94,3 +373,55 @@ class HTNCommModule:
             print(f"[COMM] t={t}: REPLAN (mode={self.mode}, event={event_triggered}) -> actions = {actions}")
 
         return actions
+
+    def _take_plan(self):
+        self._plan_t, future = self._in_flight
+        actions = future.result()
+        self._cached_actions = self._download(list(actions), actions)
+        self._in_flight = None
+
+    def _decide_pipelined(self, t, env, observations, agent_memory, keep_prev_action, event_triggered):
+        agent_ids = list(env.agents)
+        if self._worker is None:
+            self._worker = PlanWorker(self.pipeline, self.planner)
+            self._worker.reset({aid: agent_memory[aid]["rng"] for aid in agent_ids})
+
+        # Pick up the plan requested last time (computed while the env stepped)
+        if self._in_flight is not None and (self.pipeline_wait or self._in_flight[1].done()):
+            self._take_plan()
+
+        if self._cached_actions is None or self._should_replan(t, event_triggered):
+            self._due_t = t
+
+        # Request the next one from the current observations; a replan that
+        # came due while another was in flight goes out once the worker is free
+        if self._in_flight is None and self._due_t > self._requested_t:
+            received = self._upload(env, observations)
+            s = self._build_htn_state(t, env, received, agent_memory, keep_prev_action)
+            self._in_flight = (t, self._worker.submit(s, agent_ids))
+            self._requested_t = self._due_t = t
+            self.stats.replans += 1
+            self.stats.messages += 2 * len(agent_ids)
+            if self.debug:
+                print(f"[COMM] t={t}: REPLAN requested (mode={self.mode}, pipeline={self.pipeline}, event={event_triggered})")
+        elif self._due_t == t and self.debug:
+            print(f"[COMM] t={t}: REPLAN deferred, plan from t={self._in_flight[0]} still in flight")
+
+        # Nothing to act on before the first plan: wait for it
+        if self._cached_actions is None:
+            self._take_plan()
+
+        staleness = self._due_t - self._plan_t
+        if staleness:
+            self.stats.stale_plans += 1
+            self.stats.staleness_steps += staleness
+        if self.debug:
+            print(f"[COMM] t={t}: act on plan from t={self._plan_t} -> actions = {self._cached_actions}")
+        return self._cached_actions
+
+    def close(self):
+        """Wait for any plan still in flight and release the pipeline worker."""
+        if self._worker is not None:
+            self._worker.close()
+            self._worker = None
+        self._in_flight = None
@@ -26,4 +26,6 @@ ACTION_NAMES = {
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 FIG_DIR = os.path.join(ROOT, "figs")
-os.makedirs(FIG_DIR, exist_ok=True)
\ No newline at end of file
+os.makedirs(FIG_DIR, exist_ok=True)
+CACHE_DIR = os.path.join(ROOT, ".cache")  # on-disk caches (episode results, ...)
+RESOURCES_DIR = os.path.join(ROOT, "resources")  # vendored predator_prey env
@@ -0,0 +1,117 @@
+import atexit
+import sys
+
+from constants import RESOURCES_DIR
+
+# posggym (and the wrappers built on it) is imported by the functions that
+# build envs, so importing this module for ENV_POOL costs nothing until the
+# first episode
+
+# Predator-Prey implementations make_env can build:
+# - 'vendored': resources/predator_prey.py, with the padded-raster
+#   observations, per-grid cell tables and incremental observation updates;
+#   same episodes as posggym's (benchmarks/run_benchmarks.py --check)
+# - 'posggym': the installed posggym PredatorPrey-v0
+ENV_IDS = {
+    "vendored": "PredatorPreyVendored-v0",
+    "posggym": "PredatorPrey-v0",
+}
+
+
+def vendored_env_module():
+    """resources/predator_prey.py, imported as `predator_prey`."""
+    if RESOURCES_DIR not in sys.path:
+        sys.path.append(RESOURCES_DIR)
+    import predator_prey
+    return predator_prey
+
+
+def env_kwargs():
+    """PredatorPrey-v0 default kwargs; make_env keeps cooperative, prey_strength and obs_dim at these."""
+    import posggym
+    return dict(posggym.envs.registry[ENV_IDS["posggym"]].kwargs)
+
+
+def _register_vendored_env():
+    """Register resources/predator_prey.py with posggym."""
+    import posggym
+    if ENV_IDS["vendored"] in posggym.envs.registry:
+        return
+    vendored_env_module()
+    spec = posggym.envs.registry[ENV_IDS["posggym"]]
+    posggym.register(
+        id=ENV_IDS["vendored"],
+        entry_point="predator_prey:PredatorPreyEnv",
+        max_episode_steps=spec.max_episode_steps,
+        kwargs=dict(spec.kwargs),
+    )
+
+
+def make_env(grid="10x10", num_predators=2, num_prey=1, time_horizon=200, render_mode=None, debug=False, env_impl="vendored"):
+    """
+    Create POSGGym Predator-Prey environment wrapped with ActionLoggingWrapper.
+
+    env_impl picks the implementation (see ENV_IDS).
+
+    Note: if time_horizon is > max_episode_steps, env will terminate early at max_episode_steps
+    """
+    import posggym
+    from wrappers import ActionLoggingWrapper
+
+    assert env_impl in ENV_IDS, f"Unknown env_impl: {env_impl}"
+    if env_impl == "vendored":
+        _register_vendored_env()
+    env = posggym.make(
+        ENV_IDS[env_impl],
+        max_episode_steps=time_horizon,  # keep aligned with horizon
+        grid=grid,
+        num_predators=num_predators,
+        num_prey=num_prey,
+        render_mode=render_mode,
+    )
+    # Instantiate environment with action logging wrapper that has more detailed logging
+    return ActionLoggingWrapper(env, debug=debug)
+
+
+class EnvPool:
+    """
+    Pool of already-built environments, keyed by
+    (grid, num_predators, num_prey, time_horizon, render_mode, env_impl).
+
+    acquire() hands out an idle env for the key (building one only if none is
+    idle) and release() gives it back for the next episode, so back-to-back
+    episodes only pay for env.reset(seed=...) instead of posggym.make + close.
+    Every process has its own pool, so sweep workers keep their envs warm
+    across tasks.
+    """
+
+    def __init__(self):
+        self._idle = {}     # key -> list of idle envs
+        self._in_use = {}   # id(env) -> key
+
+    def acquire(self, grid="10x10", num_predators=2, num_prey=1, time_horizon=200, render_mode=None, debug=False, env_impl="vendored"):
+        key = (grid, num_predators, num_prey, time_horizon, render_mode, env_impl)
+        idle = self._idle.get(key)
+        if idle:
+            env = idle.pop()
+            env.debug = debug
+        else:
+            env = make_env(grid, num_predators, num_prey, time_horizon, render_mode, debug=debug, env_impl=env_impl)
+        self._in_use[id(env)] = key
+        return env
+
+    def release(self, env):
+        key = self._in_use.pop(id(env))
+        self._idle.setdefault(key, []).append(env)
+
+    def close(self):
+        """Close every idle env in the pool."""
+        for envs in self._idle.values():
+            for env in envs:
+                env.close()
+        self._idle.clear()
+
+
+# Default per-process pool used by run_demo.run_single_episode
+ENV_POOL = EnvPool()
+atexit.register(ENV_POOL.close)
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+from comm_module import CommStats
+from constants import ROOT, CACHE_DIR
+from replay import ActionLog
+from result_sink import CONFIG_DEFAULTS, episode_record
+
+# Task fields that decide an episode's outcome. planner is left out on purpose:
+# every backend produces the same plans, so results are shared between them;
+# so is env_impl, whose implementations play out the same episodes.
+# record_actions is not part of the key either: an entry with an action log
+# serves both kinds of task, one without only tasks that don't need the log.
+# Entries hold no trajectory, so tasks writing to a trajectory_store always run.
+KEY_FIELDS = ("grid", "num_predators", "num_prey", "comm_mode", "k_sync",
+              "keep_prev_action", "time_horizon", "pipeline", "belief",
+              "paths", "helper_pursuit")
+
+# Code that can change an episode's outcome
+SOURCE_DIRS = ("src", "resources")
+
+
+@lru_cache(maxsize=None)
+def source_digest(root=ROOT, dirs=SOURCE_DIRS):
+    """SHA-256 over the paths and contents of every .py file under root/dirs."""
+    h = hashlib.sha256()
+    for d in dirs:
+        base = os.path.join(root, d)
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames[:] = sorted(n for n in dirnames if n != "__pycache__")
+            for name in sorted(filenames):
+                if not name.endswith(".py"):
+                    continue
+                path = os.path.join(dirpath, name)
+                h.update(os.path.relpath(path, root).replace(os.sep, "/").encode())
+                h.update(b"\0")
+                with open(path, "rb") as f:
+                    h.update(f.read())
+                h.update(b"\0")
+    return h.hexdigest()
+
+
+def episode_key(task, digest):
+    """Content address of one episode: hash of its config, seed and the source digest."""
+    fields = {f: task.get(f, CONFIG_DEFAULTS[f]) for f in KEY_FIELDS}
+    fields["seed"] = task["seed"]
+    fields["source"] = digest
+    blob = json.dumps(fields, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def stats_from_record(record):
+    """Rebuild the CommStats run_single_episode returned from a stored record."""
+    stats = CommStats()
+    stats.messages = record["messages"]
+    stats.replans = record["replans"]
+    stats.bytes_up = record.get("bytes_up", 0)
+    stats.bytes_down = record.get("bytes_down", 0)
+    stats.wall_time_sec = record["wall_time_sec"]
+    stats.capture_events = record["capture_events"]
+    stats.stale_plans = record.get("stale_plans", 0)
+    stats.staleness_steps = record.get("staleness_steps", 0)
+    if "action_log" in record:
+        stats.action_log = ActionLog.from_dict(record["action_log"])
+    return stats
+
+
+class EpisodeCache:
+    """
+    Persistent, content-addressed store of finished episodes.
+
+    Each episode lives in root/<key[:2]>/<key>.json, where the key comes from
+    episode_key(), so a change to anything under src/ or resources/ starts a
+    fresh keyspace, and stale entries are just never read again. Entries are
+    written atomically as soon as an episode finishes, so an interrupted sweep
+    resumes from where it stopped.
+    """
+
+    def __init__(self, root=os.path.join(CACHE_DIR, "episodes"), digest=None):
+        self.root = root
+        self.digest = digest if digest is not None else source_digest()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def get(self, task):
+        """
+        Cached (captured, steps, CommStats) for task, or None. An entry stored
+        without an action log is a miss for a record_actions task, which then
+        reruns and overwrites it with the logged episode. A task with a
+        trajectory_store is always a miss: its row would stay empty otherwise.
+        """
+        if task.get("trajectory_store") is not None:
+            self.misses += 1
+            return None
+        path = self._path(episode_key(task, self.digest))
+        try:
+            with open(path, encoding="utf-8") as f:
+                record = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        if task.get("record_actions") and "action_log" not in record:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return record["captured"], record["steps"], stats_from_record(record)
+
+    def put(self, task, result):
+        path = self._path(episode_key(task, self.digest))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(episode_record(task, *result), f, separators=(",", ":"))
+        os.replace(tmp, path)
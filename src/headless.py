@@ -0,0 +1,156 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import gtpyhop.main
+
+from comm_module import HTNCommModule, init_agent_memory
+from env_pool import ENV_POOL
+
+# Defaults for every key an episode config may set. They match
+# run_single_episode's (and result_sink.CONFIG_DEFAULTS) except planner:
+# "direct" makes the same plans as "gtpyhop" without its overhead, so results
+# agree either way, and EpisodeResult.config records the planner used.
+DEFAULT_CONFIG = dict(
+    grid="10x10",
+    num_predators=2,
+    num_prey=1,
+    time_horizon=200,
+    comm_mode="full",
+    k_sync=5,
+    keep_prev_action=True,
+    planner="direct",
+    pipeline=None,
+    belief=False,
+    paths=False,
+    helper_pursuit=False,
+    env_impl="vendored",
+)
+
+
+class EpisodeResult(NamedTuple):
+    """Outcome of one headless episode."""
+    config: Dict[str, Any]         # full config, DEFAULT_CONFIG filled in
+    seed: int
+    captured: bool
+    steps: Optional[int]           # steps to capture, None if not captured
+    messages: int
+    replans: int
+    bytes_up: int                  # encoded observation bytes (comm_module message layer)
+    bytes_down: int                # encoded action bytes
+    wall_time_sec: float
+    capture_events: List[dict]     # ActionLoggingWrapper.capture_events
+
+
+def run_episode(config, seed, env_pool=ENV_POOL):
+    """
+    Run one episode with no observer, no wrapper logging and no printing.
+
+    Same episode as run_demo.run_single_episode for the same config and seed,
+    minus everything that only exists for a human watching (rendering,
+    trajectories, INFO lines, per-step debug strings). Without a "planner"
+    key it plans with "direct" rather than "gtpyhop" (see DEFAULT_CONFIG).
+    """
+    cfg = {**DEFAULT_CONFIG, **config}
+    time_horizon = cfg["time_horizon"]
+    env_config = dict(
+        grid=cfg["grid"],
+        num_predators=cfg["num_predators"],
+        num_prey=cfg["num_prey"],
+        time_horizon=time_horizon,
+        debug=False,
+        env_impl=cfg["env_impl"],
+    )
+
+    # find_plan prints at gtpyhop's default verbosity; set_verbose_level()
+    # itself prints, so flip the flag find_plan reads (gtpyhop.main.verbose;
+    # the package-level gtpyhop.verbose is only a copy)
+    prev_verbose = gtpyhop.main.verbose
+    gtpyhop.main.verbose = 0
+    env = env_pool.acquire(**env_config)
+    controller = None
+    try:
+        t0 = time.perf_counter()
+        observations, _ = env.reset(seed=seed)
+        agent_ids = list(env.agents)
+        agent_memory = init_agent_memory(agent_ids, seed)
+        controller = HTNCommModule(
+            mode=cfg["comm_mode"], k_sync=cfg["k_sync"], planner=cfg["planner"], pipeline=cfg["pipeline"],
+            belief=cfg["belief"], paths=cfg["paths"], helper_pursuit=cfg["helper_pursuit"],
+        )
+        keep_prev_action = cfg["keep_prev_action"]
+
+        captured = False
+        steps = None
+        all_done = False
+        terminations = {}
+        for t in range(time_horizon):
+            actions = controller.decide_actions(
+                t=t,
+                env=env,
+                observations=observations,
+                agent_memory=agent_memory,
+                keep_prev_action=keep_prev_action,
+            )
+            observations, _, terminations, _, all_done, _ = env.step(actions)
+            for aid in agent_ids:
+                agent_memory[aid]["prev_action"] = actions[aid]
+            if all_done:
+                if any(terminations.values()):
+                    captured = True
+                    steps = t + 1
+                break
+
+        if not all_done and any(terminations.values()):
+            captured = True
+            steps = time_horizon
+        controller.close()
+
+        return EpisodeResult(
+            config=cfg,
+            seed=seed,
+            captured=captured,
+            steps=steps,
+            messages=controller.stats.messages,
+            replans=controller.stats.replans,
+            bytes_up=controller.stats.bytes_up,
+            bytes_down=controller.stats.bytes_down,
+            wall_time_sec=time.perf_counter() - t0,
+            capture_events=list(env.capture_events),
+        )
+    finally:
+        if controller is not None:
+            controller.close()  # no-op when already closed
+        env_pool.release(env)
+        gtpyhop.main.verbose = prev_verbose
+
+
+def _run_episode_job(job):
+    return run_episode(*job)
+
+
+def run_episodes(configs, seeds, num_workers=1):
+    """
+    Run every config against every seed and return the results.
+
+    Args:
+        configs: list of config dicts (keys from DEFAULT_CONFIG; missing keys
+                 take the defaults)
+        seeds: list of env seeds
+        num_workers: worker processes (None = one per CPU, 1 = in this process)
+
+    Returns:
+        list of EpisodeResult, config-major: results[i * len(seeds) + j] is
+        configs[i] with seeds[j]
+    """
+    jobs = [(config, seed) for config in configs for seed in seeds]
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    num_workers = min(num_workers, len(jobs))
+
+    if num_workers <= 1:
+        return [_run_episode_job(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=num_workers) as pool:
+        return list(pool.map(_run_episode_job, jobs, chunksize=1))
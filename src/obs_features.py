@@ -0,0 +1,60 @@
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+from constants import WALL, PRED, PREY, DIRS, ORDERED_DIRS
+
+Offset = Tuple[int, int]
+
+
+class ObsFeatures(NamedTuple):
+    """
+    Everything the planner, comm module and observer read from one agent's
+    local observation window.
+
+    Offsets are (dx, dy) relative to the observing agent:
+    +x = right, -x = left, +y = down, -y = up.
+    """
+    prey_offsets: Tuple[Offset, ...]      # visible prey, closest first (ties keep scan order)
+    legal_moves: Tuple[int, ...]          # non-WALL moves, in ORDERED_DIRS order
+    predator_offsets: Tuple[Offset, ...]  # other visible predators (self excluded)
+
+    @property
+    def nearest_prey(self) -> Optional[Offset]:
+        return self.prey_offsets[0] if self.prey_offsets else None
+
+
+@lru_cache(maxsize=4096)
+def obs_features(obs, obs_dim) -> ObsFeatures:
+    """
+    Decode a local observation into ObsFeatures.
+
+    Memoized on (obs, obs_dim), so all consumers of the same observation in a
+    step share one decode instead of each rescanning the window.
+    """
+    size = 2 * obs_dim + 1
+    center = obs_dim
+
+    prey_offsets = []
+    predator_offsets = []
+    for k, v in enumerate(obs):
+        if v != PREY and v != PRED:
+            continue
+        r, c = divmod(k, size)
+        offset = (c - center, r - center)
+        if v == PREY:
+            prey_offsets.append(offset)
+        elif offset != (0, 0):
+            predator_offsets.append(offset)
+    # stable sort, so the first prey found at the minimum distance stays first
+    prey_offsets.sort(key=lambda o: abs(o[0]) + abs(o[1]))
+
+    legal_moves = []
+    for a in ORDERED_DIRS:
+        dx, dy = DIRS[a]
+        nx, ny = center + dx, center + dy
+        if not (0 <= nx < size and 0 <= ny < size):
+            continue
+        if obs[ny * size + nx] != WALL:
+            legal_moves.append(a)
+
+    return ObsFeatures(tuple(prey_offsets), tuple(legal_moves), tuple(predator_offsets))
@@ -1,6 +1,8 @@
 
 from typing import Dict, Tuple, Any
 
+from obs_features import obs_features
+
 # cell codes in Predator-Prey
 EMPTY, WALL, PREDATOR, PREY = 0, 1, 2, 3
 
@@ -34,7 +36,9 @@ class MinimalObserver:
     def on_step(self, t: int, observations: Dict[str, Tuple[int, ...]], rewards, terminations, truncations, infos):
         """Call once per tick with the latest observations and signals."""
         self.step = t
-        self._print_obs_summary(observations)
+        # the summary only prints in debug/pretty mode, so skip decoding otherwise
+        if self.debug or self.pretty:
+            self._print_obs_summary(observations)
 
     def on_episode_end(self, reason: str):
         """Call when episode finishes."""
@@ -45,11 +49,12 @@ class MinimalObserver:
     def _print_obs_summary(self, observations: Dict[str, Tuple[int, ...]]):
         size = 2 * self.obs_dim + 1
         for aid, obs in observations.items():
+            features = obs_features(obs, self.obs_dim)
             # count visible entities
-            n_prey = sum(1 for v in obs if v == PREY)
-            n_pred = sum(1 for v in obs if v == PREDATOR) - 1  # minus self at center
-            # compute relative offsets to any visible prey
-            prey_offsets = self._prey_offsets(obs, size)
+            n_prey = len(features.prey_offsets)
+            n_pred = len(features.predator_offsets)  # self at center not counted
+            # relative offsets to any visible prey
+            prey_offsets = list(features.prey_offsets)
             if self.debug:
                 print(f"[observer | run_idx={self.run_idx}:t={self.step:02d}] agent={aid} sees prey={n_prey} pred_others={n_pred} prey_offsets={prey_offsets}")
 
@@ -58,15 +63,8 @@ class MinimalObserver:
 
     @staticmethod
     def _prey_offsets(obs: Tuple[int, ...], size: int):
-        # center index for egocentric window
-        center = size // 2
-        offs = []
-        for k, v in enumerate(obs):
-            if v == PREY:
-                r, c = divmod(k, size)
-                dx, dy = (c - center), (r - center)  # +x = right, -x = left, +y down, -y = up
-                offs.append((dx, dy))
-        return offs
+        # offsets to visible prey, closest first
+        return list(obs_features(obs, size // 2).prey_offsets)
 
     @staticmethod
     def _pretty_obs(obs: Tuple[int, ...], size: int) -> str:
@@ -0,0 +1,200 @@
+from functools import lru_cache
+
+import numpy as np
+
+from constants import DIRS, ORDERED_DIRS
+from obs_features import ObsFeatures
+
+# Cells per uint64 word in the array form
+CELLS_PER_WORD = 32
+
+
+def pack_obs(obs):
+    """Pack an observation tuple (cell codes 0..3) into an int, 2 bits per cell (cell k at bits 2k, 2k+1)."""
+    packed = 0
+    for v in reversed(obs):
+        packed = (packed << 2) | v
+    return packed
+
+
+def unpack_obs(packed, n):
+    """Inverse of pack_obs for an n-cell window."""
+    return tuple((packed >> s) & 3 for s in range(0, 2 * n, 2))
+
+
+class ObsMasks:
+    """
+    Bit masks for packed windows of one obs_dim, built once per obs_dim (see
+    obs_masks). Masks select the low bit of each 2-bit cell, so with
+    low = low_bits:
+      PREY (3)  cells: bits & (bits >> 1) & low
+      WALL (1)  cells: bits & ~(bits >> 1) & low
+      PRED (2)  cells: (bits >> 1) & ~bits & low
+    """
+
+    def __init__(self, obs_dim):
+        size = 2 * obs_dim + 1
+        self.obs_dim = obs_dim
+        self.size = size
+        self.n = size * size
+        self.low_bits = int("01" * self.n, 2)
+        self.full_mask = (1 << (2 * self.n)) - 1
+        self.center_bit = 1 << (2 * (obs_dim * size + obs_dim))
+
+        # neighbour cell of the center per move
+        self.move_bits = {a: 1 << (2 * ((obs_dim + DIRS[a][1]) * size + obs_dim + DIRS[a][0]))
+                          for a in ORDERED_DIRS}
+        self.neighbour_bits = sum(self.move_bits.values())
+        # legal moves for every combination of walled neighbours, keyed by the
+        # walled-neighbour bits themselves
+        self.legal_moves = {}
+        for subset in range(1 << len(ORDERED_DIRS)):
+            walled = sum(self.move_bits[a] for i, a in enumerate(ORDERED_DIRS) if subset >> i & 1)
+            self.legal_moves[walled] = tuple(a for a in ORDERED_DIRS if not walled & self.move_bits[a])
+
+        # cells at each Manhattan distance from the center
+        self.rings = [0] * (2 * obs_dim + 1)
+        for k in range(self.n):
+            r, c = divmod(k, size)
+            self.rings[abs(r - obs_dim) + abs(c - obs_dim)] |= 1 << (2 * k)
+
+    def offset(self, bit):
+        """(dx, dy) of the cell whose low bit is `bit`."""
+        r, c = divmod((bit.bit_length() - 1) >> 1, self.size)
+        return (c - self.obs_dim, r - self.obs_dim)
+
+    def offsets(self, bits):
+        """(dx, dy) of every cell selected by bits, in scan order."""
+        out = []
+        while bits:
+            low = bits & -bits
+            out.append(self.offset(low))
+            bits ^= low
+        return out
+
+
+@lru_cache(maxsize=None)
+def obs_masks(obs_dim):
+    return ObsMasks(obs_dim)
+
+
+class PackedObs:
+    """
+    One observation window packed 2 bits per cell into a Python int.
+
+    Converts losslessly to and from the tuple form (from_obs / to_obs), and
+    answers the planner's questions with a few bitwise operations on
+    precomputed ObsMasks instead of scanning the cells. Results match
+    obs_features() on the tuple form.
+    """
+
+    __slots__ = ("bits", "obs_dim", "_m")
+
+    def __init__(self, bits, obs_dim):
+        self.bits = bits
+        self.obs_dim = obs_dim
+        self._m = obs_masks(obs_dim)
+
+    @classmethod
+    def from_obs(cls, obs, obs_dim):
+        return cls(pack_obs(obs), obs_dim)
+
+    def to_obs(self):
+        return unpack_obs(self.bits, self._m.n)
+
+    @classmethod
+    def from_words(cls, words, obs_dim):
+        """From one row of pack_obs_array output."""
+        bits = 0
+        for i, w in enumerate(words):
+            bits |= int(w) << (64 * i)
+        return cls(bits, obs_dim)
+
+    def __eq__(self, other):
+        return isinstance(other, PackedObs) and self.bits == other.bits and self.obs_dim == other.obs_dim
+
+    def __hash__(self):
+        return hash((self.bits, self.obs_dim))
+
+    def __repr__(self):
+        return f"PackedObs({self.bits:#x}, obs_dim={self.obs_dim})"
+
+    @property
+    def prey_bits(self):
+        b = self.bits
+        return b & (b >> 1) & self._m.low_bits
+
+    @property
+    def wall_bits(self):
+        b = self.bits
+        return b & ~(b >> 1) & self._m.low_bits
+
+    @property
+    def predator_bits(self):
+        b = self.bits
+        return (b >> 1) & ~b & self._m.low_bits
+
+    def has_prey(self):
+        b = self.bits
+        return bool(b & (b >> 1) & self._m.low_bits)
+
+    def legal_moves(self):
+        """Non-WALL moves, in ORDERED_DIRS order."""
+        m = self._m
+        return m.legal_moves[self.wall_bits & m.neighbour_bits]
+
+    def nearest_prey(self):
+        """(dx, dy) of the closest prey (first in scan order on ties), or None."""
+        prey = self.prey_bits
+        if not prey:
+            return None
+        m = self._m
+        for ring in m.rings:
+            hit = prey & ring
+            if hit:
+                return m.offset(hit & -hit)
+
+    def prey_offsets(self):
+        """Visible prey, closest first (ties in scan order)."""
+        prey = self.prey_bits
+        out = []
+        if prey:
+            for ring in self._m.rings:
+                hit = prey & ring
+                if hit:
+                    out.extend(self._m.offsets(hit))
+        return tuple(out)
+
+    def features(self):
+        """Same ObsFeatures as obs_features(self.to_obs(), self.obs_dim)."""
+        m = self._m
+        return ObsFeatures(
+            self.prey_offsets(),
+            self.legal_moves(),
+            tuple(m.offsets(self.predator_bits & ~m.center_bit)),
+        )
+
+
+def pack_obs_array(obs):
+    """
+    Pack observations stored as (..., n) cell codes into (..., ceil(n / 32))
+    uint64 words, 2 bits per cell: a quarter of the uint8 size, rounded up
+    to whole words.
+    """
+    obs = np.asarray(obs, dtype=np.uint64)
+    n = obs.shape[-1]
+    words = -(-n // CELLS_PER_WORD)
+    pad = words * CELLS_PER_WORD - n
+    if pad:
+        obs = np.concatenate([obs, np.zeros(obs.shape[:-1] + (pad,), dtype=np.uint64)], axis=-1)
+    obs = obs.reshape(obs.shape[:-1] + (words, CELLS_PER_WORD))
+    shifts = np.arange(0, 2 * CELLS_PER_WORD, 2, dtype=np.uint64)
+    return np.bitwise_or.reduce(obs << shifts, axis=-1)
+
+
+def unpack_obs_array(packed, n):
+    """Inverse of pack_obs_array: (..., words) uint64 -> (..., n) uint8 cell codes."""
+    packed = np.asarray(packed, dtype=np.uint64)
+    shifts = np.arange(0, 2 * CELLS_PER_WORD, 2, dtype=np.uint64)
+    cells = (packed[..., None] >> shifts) & np.uint64(3)
+    return cells.reshape(packed.shape[:-1] + (-1,))[..., :n].astype(np.uint8)
@@ -0,0 +1,144 @@
+import hashlib
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from constants import CACHE_DIR, DIRS, ORDERED_DIRS
+
+PATHS_DIR = os.path.join(CACHE_DIR, "paths")
+
+# Shortest-path moves are stored as a bitmask, bit i for ORDERED_DIRS[i];
+# MASK_MOVES[mask] lists them in ORDERED_DIRS order
+MASK_MOVES = tuple(
+    tuple(a for i, a in enumerate(ORDERED_DIRS) if mask >> i & 1)
+    for mask in range(1 << len(ORDERED_DIRS))
+)
+
+
+def layout_key(width, height, block_coords):
+    """Short stable name for a grid layout, used for the cache file name."""
+    blocks = ",".join(f"{x}.{y}" for x, y in sorted(block_coords))
+    digest = hashlib.sha256(f"{width}x{height}:{blocks}".encode()).hexdigest()[:16]
+    return f"{width}x{height}-{digest}"
+
+
+def compute_tables(width, height, block_coords):
+    """
+    All-pairs BFS over the free cells of a 4-connected grid.
+
+    Every source is expanded at once: each round grows all frontiers by one
+    step with a few (cells x cells x 4) array operations, so the number of
+    rounds is the grid's longest shortest path, not the number of cells.
+
+    Returns:
+        dist: (N, N) int16, moves from cell u to cell v (cell = y * width + x),
+              -1 when either is blocked or v cannot be reached
+        moves: (N, N) uint8 bitmask of the moves out of u that start a
+               shortest path to v (0 when u == v or unreachable)
+    """
+    n = width * height
+    free = np.ones(n, dtype=bool)
+    for x, y in block_coords:
+        free[y * width + x] = False
+
+    # neighbour of every cell per move, n (a padding slot that is never
+    # reached) where the move leaves the grid or hits a block
+    ys, xs = np.divmod(np.arange(n), width)
+    nbr = np.full((n, len(ORDERED_DIRS)), n)
+    for i, a in enumerate(ORDERED_DIRS):
+        dx, dy = DIRS[a]
+        nx, ny = xs + dx, ys + dy
+        ok = (0 <= nx) & (nx < width) & (0 <= ny) & (ny < height)
+        cell = np.where(ok, ny * width + nx, n)
+        ok &= free[np.minimum(cell, n - 1)]
+        nbr[:, i] = np.where(ok & free, cell, n)
+
+    dist = np.full((n, n + 1), -1, dtype=np.int16)
+    frontier = np.zeros((n, n + 1), dtype=bool)
+    frontier[np.flatnonzero(free), np.flatnonzero(free)] = True
+    dist[frontier] = 0
+    d = 0
+    while frontier.any():
+        d += 1
+        # v joins source u's next frontier when a neighbour of v is on it
+        reached = frontier[:, nbr].any(axis=2)
+        reached &= dist[:, :n] < 0
+        frontier[:, :n] = reached
+        dist[:, :n][reached] = d
+    dist = dist[:, :n]
+
+    # a move from u is on a shortest path to v when it lands one step closer
+    padded = np.vstack([dist, np.full((1, n), -1, dtype=np.int16)])
+    moves = np.zeros((n, n), dtype=np.uint8)
+    for i in range(len(ORDERED_DIRS)):
+        closer = (padded[nbr[:, i]] == dist - 1) & (dist > 0)
+        moves |= closer.astype(np.uint8) << i
+    return dist, moves
+
+
+class PathTable:
+    """
+    Shortest paths between every pair of cells of one grid layout.
+
+    distance() and moves() are O(1) table lookups. Tables come from
+    path_table(), which computes each layout once per machine and keeps it
+    under .cache/paths. Pickling ships only the layout, so a planner state
+    holding a table stays cheap to send to a planner process.
+    """
+
+    def __init__(self, width, height, block_coords, dist, moves):
+        self.width = width
+        self.height = height
+        self.block_coords = frozenset(map(tuple, block_coords))
+        self.dist = dist
+        self.next_moves = moves
+
+    def __reduce__(self):
+        return (path_table, (self.width, self.height, tuple(sorted(self.block_coords))))
+
+    def distance(self, a, b):
+        """Moves on a shortest path from (x, y) a to b, or -1 if there is none."""
+        w = self.width
+        return int(self.dist[a[1] * w + a[0], b[1] * w + b[0]])
+
+    def moves(self, a, b):
+        """Actions out of a that start a shortest path to b, in ORDERED_DIRS order."""
+        w = self.width
+        return MASK_MOVES[self.next_moves[a[1] * w + a[0], b[1] * w + b[0]]]
+
+
+@lru_cache(maxsize=None)
+def _cached_path_table(width, height, block_coords):
+    path = os.path.join(PATHS_DIR, layout_key(width, height, block_coords) + ".npz")
+    try:
+        with np.load(path) as f:
+            dist, moves = f["dist"], f["moves"]
+    except (FileNotFoundError, OSError, KeyError, ValueError):
+        dist, moves = compute_tables(width, height, block_coords)
+        os.makedirs(PATHS_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, dist=dist, moves=moves)
+        os.replace(tmp, path)
+    return PathTable(width, height, block_coords, dist, moves)
+
+
+def path_table(width, height, block_coords=()):
+    """PathTable for a layout: from this process's cache, the disk cache, or computed and stored."""
+    return _cached_path_table(width, height, tuple(sorted(map(tuple, block_coords))))
+
+
+def path_table_for_grid(grid):
+    """PathTable for a posggym Grid (width, height, block_coords)."""
+    return path_table(grid.width, grid.height, grid.block_coords)
+
+
+def precompute_supported_grids():
+    """Build (or load) the tables of every posggym PredatorPrey SUPPORTED_GRIDS layout."""
+    from posggym.envs.grid_world.predator_prey import SUPPORTED_GRIDS
+    return {name: path_table_for_grid(make_grid()) for name, (make_grid, _) in SUPPORTED_GRIDS.items()}
+
+
+if __name__ == "__main__":
+    for name, table in precompute_supported_grids().items():
+        print(f"{name}: {table.width}x{table.height}, {len(table.block_coords)} blocks")
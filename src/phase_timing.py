@@ -0,0 +1,125 @@
+import time
+
+# Phases of one step of the run_single_episode loop, in loop order
+PHASES = ("decide", "log", "env_step", "record", "observer", "render")
+
+# Histogram bucket b holds latencies in [2**b, 2**(b+1)) ns; the last bucket
+# also takes everything slower (2**39 ns is ~9 minutes)
+NUM_BUCKETS = 40
+
+
+class PhaseTimings:
+    """
+    Per-phase latency histograms for one episode or a whole sweep.
+
+    Every sample goes into a log2-spaced bucket, so memory stays fixed no matter
+    how many steps are recorded and episodes can be merged into a per-sweep
+    view by adding counts. Totals and maxima are exact; percentiles are read
+    off the histogram and reported as the upper edge of their bucket.
+    """
+
+    def __init__(self):
+        self.counts = {p: [0] * NUM_BUCKETS for p in PHASES}
+        self.total_ns = {p: 0 for p in PHASES}
+        self.max_ns = {p: 0 for p in PHASES}
+
+    def add(self, phase, ns):
+        b = min(max(ns, 1).bit_length() - 1, NUM_BUCKETS - 1)
+        self.counts[phase][b] += 1
+        self.total_ns[phase] += ns
+        if ns > self.max_ns[phase]:
+            self.max_ns[phase] = ns
+
+    def merge(self, other):
+        """Add another PhaseTimings into this one (e.g. an episode into a sweep total)."""
+        for p in PHASES:
+            counts = self.counts[p]
+            for b, c in enumerate(other.counts[p]):
+                counts[b] += c
+            self.total_ns[p] += other.total_ns[p]
+            self.max_ns[p] = max(self.max_ns[p], other.max_ns[p])
+        return self
+
+    def count(self, phase):
+        return sum(self.counts[phase])
+
+    def percentile_ns(self, phase, q):
+        """Upper bucket edge below which q percent of the phase's samples fall."""
+        n = self.count(phase)
+        if n == 0:
+            return None
+        target = q / 100.0 * n
+        seen = 0
+        for b, c in enumerate(self.counts[phase]):
+            seen += c
+            if c and seen >= target:
+                return min(2 ** (b + 1), self.max_ns[phase])
+        return self.max_ns[phase]
+
+    def histogram(self, phase):
+        """Non-empty buckets as (lower_ns, upper_ns, count)."""
+        return [(2 ** b, 2 ** (b + 1), c) for b, c in enumerate(self.counts[phase]) if c]
+
+    def summary(self):
+        """Plain-dict view per phase (times in microseconds), skipping phases never hit."""
+        grand_total = sum(self.total_ns.values()) or 1
+        out = {}
+        for p in PHASES:
+            n = self.count(p)
+            if n == 0:
+                continue
+            out[p] = {
+                "count": n,
+                "total_ms": self.total_ns[p] / 1e6,
+                "share": self.total_ns[p] / grand_total,
+                "mean_us": self.total_ns[p] / n / 1e3,
+                "p50_us": self.percentile_ns(p, 50) / 1e3,
+                "p90_us": self.percentile_ns(p, 90) / 1e3,
+                "p99_us": self.percentile_ns(p, 99) / 1e3,
+                "max_us": self.max_ns[p] / 1e3,
+            }
+        return out
+
+    def format(self):
+        lines = [f"{'phase':<10} {'count':>8} {'total ms':>10} {'share':>6} "
+                 f"{'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'max us':>9}"]
+        for p, s in self.summary().items():
+            lines.append(
+                f"{p:<10} {s['count']:>8} {s['total_ms']:>10.1f} {s['share']:>6.1%} "
+                f"{s['mean_us']:>9.1f} {s['p50_us']:>9.1f} {s['p99_us']:>9.1f} {s['max_us']:>9.1f}"
+            )
+        return "\n".join(lines)
+
+
+class StepTimer:
+    """
+    Lap timer over time.perf_counter_ns (monotonic).
+
+    start() sets the mark; each lap(phase) charges the time since the previous
+    mark to phase and moves the mark, so consecutive laps tile the step.
+    """
+
+    def __init__(self, timings):
+        self.timings = timings
+        self._mark = 0
+
+    def start(self):
+        self._mark = time.perf_counter_ns()
+
+    def lap(self, phase):
+        now = time.perf_counter_ns()
+        self.timings.add(phase, now - self._mark)
+        self._mark = now
+
+
+class _NullTimer:
+    """Stand-in for StepTimer when timing is off."""
+
+    def start(self):
+        pass
+
+    def lap(self, phase):
+        pass
+
+
+NULL_TIMER = _NullTimer()
@@ -0,0 +1,171 @@
+import atexit
+import itertools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+import gtpyhop.main
+
+from plan_utils import find_joint_plan, joint_plan_to_actions
+
+# Where a pipelined controller runs its planner
+PIPELINES = ("thread", "process")
+
+# One planner process per interpreter, shared by every episode it runs:
+# (Process, Connection) once started
+_process_worker = None
+# Ids tagging plan requests to the planner process, unique per interpreter
+_request_ids = itertools.count()
+
+
+def _plan(s, agent_ids, planner):
+    return joint_plan_to_actions(find_joint_plan(s, agent_ids, planner), agent_ids)
+
+
+def _worker_main(conn):
+    """
+    Planner process loop. Messages are ('reset', rngs, verbose) at the start of
+    an episode and ('plan', request_id, s, agent_ids, planner) for each
+    replan, answered with (request_id, ok, actions or exception); None stops
+    the loop.
+    """
+    rngs = None
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            break
+        if msg[0] == "reset":
+            _, rngs, gtpyhop.main.verbose = msg
+            continue
+        _, request_id, s, agent_ids, planner = msg
+        s.rngs = rngs
+        try:
+            conn.send((request_id, True, _plan(s, agent_ids, planner)))
+        except Exception as e:
+            conn.send((request_id, False, e))
+
+
+def _stop_process_worker():
+    global _process_worker
+    if _process_worker is not None:
+        process, conn = _process_worker
+        conn.send(None)
+        process.join(timeout=5)
+        _process_worker = None
+
+
+def _get_process_worker():
+    global _process_worker
+    if _process_worker is None:
+        conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        process.start()
+        _process_worker = (process, conn)
+        atexit.register(_stop_process_worker)
+    return _process_worker[1]
+
+
+def _drain_stale_replies(conn):
+    """Discard replies already waiting in the pipe (left by an aborted episode)."""
+    while conn.poll():
+        conn.recv()
+
+
+class _PipeResult:
+    """
+    Future-like handle on the planner process's answer to one request.
+
+    Replies with another request id are stale answers to requests an aborted
+    episode left in flight (the process answers in order, so they arrive
+    first) and are skipped.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, conn, request_id):
+        self._conn = conn
+        self._request_id = request_id
+        self._value = self._MISSING
+
+    def _read_one(self):
+        """Read one reply; keep it if it is ours."""
+        request_id, ok, value = self._conn.recv()
+        if request_id == self._request_id:
+            self._value = (ok, value)
+
+    def done(self):
+        # a stale reply in the pipe does not mean ours is ready
+        while self._value is self._MISSING and self._conn.poll():
+            self._read_one()
+        return self._value is not self._MISSING
+
+    def result(self):
+        while self._value is self._MISSING:
+            self._read_one()
+        ok, value = self._value
+        if not ok:
+            raise value
+        return value
+
+
+class PlanWorker:
+    """
+    Runs one controller's joint planning off the episode loop.
+
+    kind='thread' plans on a background thread with the agents' own RNGs.
+    Planner and env are both pure Python and share the GIL, so this mostly
+    models a remote planner's one-step delay rather than saving time.
+
+    kind='process' plans in a separate process that gets a copy of the
+    agents' RNGs at reset(), so planning really runs while the env steps.
+    The process is started once per interpreter and reused by later
+    episodes over a pipe, so only one pipelined episode per process may run
+    at a time. Both kinds consume the RNGs in the same order and give the
+    same plans.
+
+    Requests run one at a time, in submission order; submit() returns a
+    Future-like object (done() / result()).
+    """
+
+    def __init__(self, kind, planner="gtpyhop"):
+        assert kind in PIPELINES, f"Unknown pipeline: {kind}"
+        self.kind = kind
+        self.planner = planner
+        if kind == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        else:
+            self._conn = _get_process_worker()
+        self._pending = None
+
+    def reset(self, rngs):
+        """Start an episode planned with these per-agent RNGs."""
+        if self.kind == "process":
+            _drain_stale_replies(self._conn)
+            self._conn.send(("reset", rngs, gtpyhop.main.verbose))
+
+    def submit(self, s, agent_ids):
+        """Plan on planner state s in the background."""
+        agent_ids = list(agent_ids)
+        if self.kind == "thread":
+            self._pending = self._executor.submit(_plan, s, agent_ids, self.planner)
+        else:
+            # the planner process holds the RNGs, so don't ship them every step
+            s.rngs = None
+            request_id = next(_request_ids)
+            self._conn.send(("plan", request_id, s, agent_ids, self.planner))
+            self._pending = _PipeResult(self._conn, request_id)
+        return self._pending
+
+    def close(self):
+        """
+        Wait for the last request; the planner process stays up for the next
+        episode. Safe to call more than once, and from a finally block: an
+        error from a request nobody is waiting for any more is dropped.
+        """
+        if self._pending is not None:
+            try:
+                self._pending.result()
+            except Exception:
+                pass
+            self._pending = None
+        if self.kind == "thread":
+            self._executor.shutdown()
@@ -1,6 +1,8 @@
 import gtpyhop
 
 from constants import DO_NOTHING
+from path_tables import path_table_for_grid
+from pp_htn import find_plan_direct
 
 
 def plan_to_actions(plan):
@@ -36,10 +38,53 @@ def joint_plan_to_actions(plan, agent_ids):
     return actions
 
 
-def build_planner_state(env, observations):
-    """Build a GTPyhop state from the current environment observations."""
+def build_planner_state(env, observations, paths=False):
+    """
+    Build a GTPyhop state from the current environment observations.
+
+    With paths=True the grid's shortest-path table (path_tables) goes into
+    s.paths so the chase policies step around blocks; otherwise s.paths is
+    None and they chase greedily.
+    """
     s = gtpyhop.State("tick")
     s.obs = {agent_id: observations[agent_id] for agent_id in env.agents }
-    s.obs_dim = env.unwrapped.model.obs_dim
-    
+    model = env.unwrapped.model
+    s.obs_dim = model.obs_dim
+    # Global predator positions let the planner tell apart prey seen by
+    # different agents; prey themselves are only known through the obs
+    s.agent_coords = dict(zip(model.possible_agents, env.unwrapped.state.predator_coords))
+    s.prey_strength = model.prey_strength
+    s.num_prey = model.num_prey
+    # Shortest paths around blocks for the chase policies (pp_behavior.path_moves)
+    s.paths = path_table_for_grid(model.grid) if paths else None
+
     return s
+
+
+def find_joint_plan(s, agent_ids, planner="gtpyhop"):
+    """
+    Plan the 'choose_joint_action' task for agent_ids on planner state s.
+
+    planner is 'gtpyhop' (gtpyhop.find_plan), 'direct' (pp_htn.find_plan_direct,
+    same plans with less overhead) or 'verify' (run both from the same RNG
+    states and raise if they disagree).
+    """
+    todo_list = [("choose_joint_action", tuple(agent_ids))]
+    if planner == "gtpyhop":
+        return gtpyhop.find_plan(s, todo_list)
+    if planner == "direct":
+        return find_plan_direct(s, todo_list)
+
+    # 'verify': both planners must give the same plan and leave the RNGs
+    # in the same state
+    rng_states = {aid: rng.getstate() for aid, rng in s.rngs.items()}
+    plan = find_plan_direct(s, todo_list)
+    direct_rng_states = {aid: rng.getstate() for aid, rng in s.rngs.items()}
+    for aid, rng in s.rngs.items():
+        rng.setstate(rng_states[aid])
+    expected = gtpyhop.find_plan(s, todo_list)
+    if plan != expected:
+        raise AssertionError(f"find_plan_direct plan {plan} != gtpyhop plan {expected}")
+    if any(rng.getstate() != direct_rng_states[aid] for aid, rng in s.rngs.items()):
+        raise AssertionError("find_plan_direct consumed agent RNGs differently from gtpyhop")
+    return expected
@@ -2,95 +2,68 @@ import os
 import matplotlib.pyplot as plt
 import matplotlib.cm as cm
 import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgb
 from constants import FIG_DIR
 
 
-def record_positions(env, position_history, init=False):
-    """
-    Extract predator and prey positions from the POSGGym Predator-Prey env state.
-
-    Args:
-        env: POSGGym environment (with .unwrapped.state as a 3-tuple)
-        position_history (dict): {"predators": {...}, "prey": {...}}
-        init (bool): True to initialize new lists; False to append to existing ones
-    """
-    state = env.unwrapped.state
-    preds = tuple(state[0])
-    preys = tuple(state[1])
-
-    if init:
-        # Initialize with the starting positions
-        for i, pos in enumerate(preds):
-            position_history["predators"][i] = [tuple(pos)]
-        for i, pos in enumerate(preys):
-            position_history["prey"][i] = [tuple(pos)]
-    else:
-        # Append positions to existing lists
-        for i, pos in enumerate(preds):
-            position_history["predators"][i].append(tuple(pos))
-        for i, pos in enumerate(preys):
-            position_history["prey"][i].append(tuple(pos))
-
-
-def plot_trajectories(position_history, grid_size=(10, 10), save_path="figures/final_positions.png"):
+def plot_trajectories(positions, grid_size=(10, 10), save_path="figures/final_positions.png", num_predators=2):
     """
     Plot predator and prey trajectories with fixed colors:
         Predator 0 -> green
         Predator 1 -> blue
+        Predators 2+ -> from the tab10 colormap (no green, blue or red)
         Prey -> red
 
     Final positions are highlighted with large markers.
+
+    Args:
+        positions: (steps, n_entities, 2) array of (x, y) coords, predators
+                   first, e.g. TrajectoryRecorder.positions or
+                   TrajectoryStore.episode(i)
+        num_predators: how many of the entities are predators
     """
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
     width, height = grid_size
     plt.figure(figsize=(6, 6))
 
-    predator_ids = list(position_history["predators"].keys())
-    prey_ids = list(position_history["prey"].keys())
+    positions = np.asarray(positions)
+    predator_ids = range(num_predators)
+    prey_ids = range(positions.shape[1] - num_predators)
 
     # ----- Explicit color assignment -----
-    predator_colors = ["green", "blue"]   # supports 2 predators
+    predator_colors = ["green", "blue"]
     prey_color = "red"
 
-    # Fallback for unusual counts
-    if len(predator_ids) > len(predator_colors):
-        predator_colors = predator_colors + ["cyan", "purple", "orange"][:len(predator_ids)-2]
-
-    # ----- Plot predators -----
-    for idx, pid in enumerate(predator_ids):
-        coords = position_history["predators"][pid]
-        xs, ys = zip(*coords)
-        color = predator_colors[idx]
+    # Larger teams: cycle through tab10, skipping the colours taken above
+    # (tab10 indices 0 blue, 2 green, 3 red)
+    extra = [plt.get_cmap("tab10")(i) for i in (1, 4, 5, 6, 7, 8, 9)]
+    while len(predator_colors) < num_predators:
+        predator_colors.append(extra[(len(predator_colors) - 2) % len(extra)])
 
+    def plot_entity(xs, ys, color, label, final_marker, tag):
         # Trajectory line
-        plt.plot(xs, ys, "-", color=color, label=f"Predator {pid}")
+        plt.plot(xs, ys, "-", color=color, label=label)
 
         # Normal markers for each step
         plt.plot(xs, ys, "o", color=color, markersize=4)
 
         # Highlight final position
-        plt.plot(xs[-1], ys[-1], marker="*", color=color, markersize=14, markeredgecolor="black")
+        plt.plot(xs[-1], ys[-1], marker=final_marker, color=color, markersize=14, markeredgecolor="black")
 
         # Label near final position
-        plt.text(xs[-1] + 0.1, ys[-1] - 0.1, f"P{pid}", color=color, fontsize=9, weight="bold")
+        plt.text(xs[-1] + 0.1, ys[-1] - 0.1, tag, color=color, fontsize=9, weight="bold")
+
+    # ----- Plot predators -----
+    for pid in predator_ids:
+        xs, ys = positions[:, pid, 0], positions[:, pid, 1]
+        plot_entity(xs, ys, predator_colors[pid], f"Predator {pid}", "*", f"P{pid}")
 
     # ----- Plot prey -----
     for rid in prey_ids:
-        coords = position_history["prey"][rid]
-        xs, ys = zip(*coords)
-        color = prey_color
-
-        # Trajectory line
-        plt.plot(xs, ys, "-", color=color, label=f"Prey {rid}")
-
-        # Normal markers
-        plt.plot(xs, ys, "o", color=color, markersize=4)
-
-        # Highlight final position
-        plt.plot(xs[-1], ys[-1], marker="X", color=color, markersize=14, markeredgecolor="black")
-
-        # Label near final position
-        plt.text(xs[-1] + 0.1, ys[-1] - 0.1, f"R{rid}", color=color, fontsize=9, weight="bold")
+        col = num_predators + rid
+        xs, ys = positions[:, col, 0], positions[:, col, 1]
+        plot_entity(xs, ys, prey_color, f"Prey {rid}", "X", f"R{rid}")
 
     # ----- Format grid -----
     plt.xlim(-0.5, width - 0.5)
@@ -296,9 +269,10 @@ def plot_comm_modes_success_rates(results, save_path="figs/comm_modes_vs_success
 
 def plot_k_vs_costs(results, save_path_prefix="figs/k_vs"):
     """
-    Plot two separate bar plots:
+    Plot separate bar plots:
     - Avg Replans per Episode vs k_sync
     - Avg Messages per Episode vs k_sync
+    - Avg encoded Bytes per Episode vs k_sync (when results have "avg_bytes")
 
     Args:
         results: dict {k: {"avg_steps", "avg_replans", "avg_messages", ...}}
@@ -342,3 +316,113 @@ def plot_k_vs_costs(results, save_path_prefix="figs/k_vs"):
     print(f"[INFO] Saved messages plot to {path_msgs}")
     plt.close()
 
+    if not all("avg_bytes" in results[k] for k in ks):
+        return
+
+    # --- Plot bytes ---
+    nbytes = [results[k]["avg_bytes"] for k in ks]
+    plt.figure(figsize=(5.5, 4))
+    plt.bar(ks, nbytes, color="darkorange")
+    for i, val in enumerate(nbytes):
+        plt.text(ks[i], val + 1, f"{val:.0f}", ha='center', fontsize=8)
+    plt.xlabel("k_sync (communication interval)")
+    plt.ylabel("Avg Bytes per Episode")
+    plt.title("Bandwidth vs Communication Frequency")
+    plt.ylim(0, max(nbytes) * 1.2)
+    plt.grid(axis="y")
+    plt.tight_layout()
+    path_bytes = f"{save_path_prefix}_bytes.png"
+    plt.savefig(path_bytes, bbox_inches="tight")
+    print(f"[INFO] Saved bytes plot to {path_bytes}")
+    plt.close()
+
+
+def plot_occupancy_heatmaps(heatmaps, save_path="figs/occupancy_heatmaps.png", labels=None, label_name="config"):
+    """
+    One row per configuration: predator visits, prey visits and captures per
+    episode, each as a single imshow of the aggregated grid.
+
+    Args:
+        heatmaps: heatmaps.OccupancyHeatmaps
+        labels: which of heatmaps.labels to draw (default all)
+        label_name: row title prefix, e.g. "k_sync"
+    """
+    from heatmaps import PREDATOR, PREY
+
+    labels = heatmaps.labels if labels is None else list(labels)
+    rows = [heatmaps.labels.index(label) for label in labels]
+    panels = [
+        ("Predator visits / episode", heatmaps.visit_rates(PREDATOR), "Greens"),
+        ("Prey visits / episode", heatmaps.visit_rates(PREY), "Reds"),
+        ("Captures / episode", heatmaps.capture_rates(), "Purples"),
+    ]
+
+    fig, axes = plt.subplots(len(rows), len(panels), figsize=(3.2 * len(panels), 3 * len(rows)), squeeze=False)
+    for col, (title, rates, cmap) in enumerate(panels):
+        # one colour scale per column so the rows compare directly
+        vmax = max(float(rates[rows].max()), 1e-9)
+        for row, idx in enumerate(rows):
+            ax = axes[row, col]
+            image = ax.imshow(rates[idx], cmap=cmap, vmin=0, vmax=vmax, origin="upper")
+            ax.set_xticks([])
+            ax.set_yticks([])
+            if row == 0:
+                ax.set_title(title, fontsize=9)
+            if col == 0:
+                ax.set_ylabel(f"{label_name}={labels[row]}\n({heatmaps.episodes[idx]} episodes)", fontsize=8)
+        fig.colorbar(image, ax=axes[:, col].tolist(), shrink=0.8)
+
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    plt.savefig(save_path, bbox_inches="tight")
+    plt.close(fig)
+    print(f"[INFO] Saved occupancy heatmaps to {save_path}")
+
+
+def plot_trajectory_overlay(heatmaps, label, save_path="figs/trajectory_overlay.png", label_name="config"):
+    """
+    Every trajectory of one configuration overlaid on the grid: each role's
+    moves are one LineCollection of the grid edges it used, line width and
+    opacity growing with how often, and captures are one scatter over the
+    capture cells. The number of artists and segments is bounded by the grid,
+    not by the number of episodes. label_name is the title's label prefix,
+    e.g. "k_sync".
+    """
+    from heatmaps import PREDATOR, PREY
+
+    idx = heatmaps.labels.index(label)
+    episodes = max(int(heatmaps.episodes[idx]), 1)
+    fig, ax = plt.subplots(figsize=(6, 6))
+
+    for role, color, name in ((PREDATOR, "green", "Predators"), (PREY, "red", "Prey")):
+        segments, counts = heatmaps.edge_segments(label, role)
+        if not len(counts):
+            continue
+        rate = counts / episodes
+        weight = rate / rate.max()
+        rgba = np.zeros((len(counts), 4))
+        rgba[:, :3] = to_rgb(color)
+        rgba[:, 3] = 0.15 + 0.85 * weight
+        # offset the roles slightly so shared edges stay visible
+        shift = -0.08 if role == PREDATOR else 0.08
+        ax.add_collection(LineCollection(segments + shift, colors=rgba, linewidths=0.5 + 4.5 * weight, label=name))
+
+    captures = heatmaps.captures[idx]
+    ys, xs = np.nonzero(captures)
+    if len(xs):
+        sizes = 30 + 270 * captures[ys, xs] / captures.max()
+        ax.scatter(xs, ys, s=sizes, marker="X", color="purple", edgecolors="black", label="Captures", zorder=3)
+
+    ax.set_xlim(-0.5, heatmaps.width - 0.5)
+    ax.set_ylim(heatmaps.height - 0.5, -0.5)
+    ax.grid(True, color="black", linewidth=0.5)
+    ax.set_aspect("equal", adjustable="box")
+    ax.set_title(f"Trajectories of {heatmaps.episodes[idx]} episodes ({label_name}={label})")
+    ax.set_xlabel("X position")
+    ax.set_ylabel("Y position")
+    ax.legend(loc="upper right", fontsize=8)
+
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    plt.tight_layout()
+    plt.savefig(save_path)
+    plt.close(fig)
+    print(f"[INFO] Saved trajectory overlay to {save_path}")
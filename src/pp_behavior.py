@@ -5,63 +5,73 @@ from constants import (
     EMPTY, WALL, PRED, PREY,
     DIRS, ORDERED_DIRS
 )
+from obs_features import obs_features
+
+def step_toward(dx, dy):
+    """
+    Moves that shrink the Manhattan distance to offset (dx, dy), preferred
+    first: the longer axis leads and ties go horizontal.
+    """
+    x_move = RIGHT if dx > 0 else LEFT if dx < 0 else None
+    y_move = DOWN if dy > 0 else UP if dy < 0 else None
+    if abs(dx) >= abs(dy):
+        moves = (x_move, y_move)
+    else:
+        moves = (y_move, x_move)
+    return tuple(a for a in moves if a is not None)
+
 
 def action_from_obs(obs, obs_dim):
     """
     Greedy chase if any PREY cells visible in local obs window.
     """
-    size = 2 * obs_dim + 1
-    center = obs_dim
-
-    prey_idxs = [k for k, v in enumerate(obs) if v == PREY]
-    if not prey_idxs:
+    nearest = obs_features(obs, obs_dim).nearest_prey
+    if nearest is None:
         return DO_NOTHING
 
-    best_md = 10**9
-    best_dx = 0
-    best_dy = 0
-    for k in prey_idxs:
-        r, c = divmod(k, size)
-        dx = c - center         # +x = right
-        dy = r - center         # +y = down
-        md = abs(dx) + abs(dy)
-        if md < best_md:
-            best_md = md
-            best_dx, best_dy = dx, dy
+    # move greedily to reduce distance; break ties horizontally
+    moves = step_toward(*nearest)
+    return moves[0] if moves else DO_NOTHING
 
-    dx, dy = best_dx, best_dy
 
-    # move greedily to reduce distance; break ties horizontally
-    if abs(dx) >= abs(dy):
-        if dx > 0:  return RIGHT
-        if dx < 0:  return LEFT
-        if dy > 0:  return DOWN
-        if dy < 0:  return UP
-        return DO_NOTHING
-    else:
-        if dy > 0:  return DOWN
-        if dy < 0:  return UP
-        if dx > 0:  return RIGHT
-        if dx < 0:  return LEFT
+def path_moves(state, agent_id, dx, dy):
+    """
+    Moves toward offset (dx, dy) from agent_id, preferred first.
+
+    With a path table in the planner state (state.paths, see path_tables)
+    these are the moves that start a shortest path around blocks, in
+    step_toward order where it has them; without one, or when the target is
+    off the grid or cut off, the greedy step_toward moves. On a grid with no
+    blocks both give the same moves.
+    """
+    paths = getattr(state, "paths", None)
+    if paths is not None:
+        x, y = state.agent_coords[agent_id]
+        tx, ty = x + dx, y + dy
+        if 0 <= tx < paths.width and 0 <= ty < paths.height and paths.distance((x, y), (tx, ty)) > 0:
+            shortest = paths.moves((x, y), (tx, ty))
+            greedy = step_toward(dx, dy)
+            return tuple(a for a in greedy if a in shortest) + tuple(a for a in shortest if a not in greedy)
+    return step_toward(dx, dy)
+
+
+def chase_action(state, agent_id):
+    """
+    Step agent_id toward the nearest prey in its window along a shortest
+    path (path_moves); action_from_obs with pathing.
+    """
+    nearest = obs_features(state.obs[agent_id], state.obs_dim).nearest_prey
+    if nearest is None:
         return DO_NOTHING
+    moves = path_moves(state, agent_id, *nearest)
+    return moves[0] if moves else DO_NOTHING
 
 
 def legal_moves_from_obs(obs, obs_dim):
     """
     Given local obs, return list of legal move action_ids (no WALL).
     """
-    size = 2 * obs_dim + 1
-    center = obs_dim
-    legal_moves = []
-    for a in ORDERED_DIRS:
-        dx, dy = DIRS[a]
-        nx, ny = center + dx, center + dy
-        if not (0 <= nx < size and 0 <= ny < size):
-            continue
-        idx = ny * size + nx
-        if obs[idx] != WALL:
-            legal_moves.append(a)
-    return legal_moves
+    return list(obs_features(obs, obs_dim).legal_moves)
 
 
 def find_global_leader(obs_dict, agent_ids, obs_dim):
@@ -77,39 +87,32 @@ def find_global_leader(obs_dict, agent_ids, obs_dim):
     best_dx = 0
     best_dy = 0
 
-    size = 2 * obs_dim + 1
-    center = obs_dim
-
     for aid in agent_ids:
-        obs = obs_dict[aid]
-        for k, v in enumerate(obs):
-            if v != PREY:
-                continue
-            r, c = divmod(k, size)
-            dx = c - center
-            dy = r - center
-            md = abs(dx) + abs(dy)
-            if md < best_md:
-                best_md = md
-                best_agent = aid
-                best_dx, best_dy = dx, dy
+        nearest = obs_features(obs_dict[aid], obs_dim).nearest_prey
+        if nearest is None:
+            continue
+        dx, dy = nearest
+        md = abs(dx) + abs(dy)
+        if md < best_md:
+            best_md = md
+            best_agent = aid
+            best_dx, best_dy = dx, dy
 
     return best_agent, best_dx, best_dy
 
 
 def choose_leader_action(state, leader_id):
-    obs = state.obs[leader_id]
-    action = action_from_obs(obs, state.obs_dim)
-    if action is None:
-        action = DO_NOTHING
-    return action
+    return chase_action(state, leader_id)
 
 
-def choose_helper_action(state, helper_id, leader_action):
+def choose_helper_action(state, helper_id, leader_action, prey_coord=None):
     """
     Helper policy given:
       - its own local obs
       - the leader's chosen action
+      - where the leader's prey is (global (x, y)), if known; with
+        state.helper_pursuit set a helper that can't see the prey heads
+        there instead of copying the leader's move
     """
     obs_dim = state.obs_dim
     obs = state.obs[helper_id]
@@ -121,13 +124,18 @@ def choose_helper_action(state, helper_id, leader_action):
     rngs = getattr(state, "rngs", {})
     rng = rngs.get(helper_id, random)
 
-    # If helper also sees prey, chase greedily.
-    if PREY in obs:
-        a = action_from_obs(obs, obs_dim)
+    # If helper also sees prey, chase it.
+    if obs_features(obs, obs_dim).prey_offsets:
+        a = chase_action(state, helper_id)
         if a in legal_moves:
             return a
         return rng.choice(legal_moves)
 
+    # Otherwise head for the leader's prey (path_moves: around blocks when
+    # the state has a path table), when the planner asked for it
+    if prey_coord is not None and getattr(state, "helper_pursuit", False):
+        return choose_pursuit_action(state, helper_id, prey_coord)
+
     # Otherwise, try to align with leader.
     if leader_action in legal_moves and leader_action != DO_NOTHING:
         return leader_action
@@ -175,4 +183,159 @@ def choose_patrol_action(state, agent_id):
     if keep_prev and prev in legal_moves and prev != DO_NOTHING:
         return prev
 
-    return rng.choice(legal_moves)
\ No newline at end of file
+    return rng.choice(legal_moves)
+
+# ----------------------------------------------------------------------
+# Multi-prey team behaviour (global coords from the planner state)
+# ----------------------------------------------------------------------
+def _manhattan(a, b):
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def visible_prey(state, agent_ids):
+    """
+    Every prey at least one predator can see, in global (x, y) coords.
+
+    Returns:
+        dict prey_coord -> (spotter_id, dx, dy), in first-sighting order, where
+        (dx, dy) is the prey's offset in the window of the closest spotter.
+    """
+    obs_dim = state.obs_dim
+    agent_coords = state.agent_coords
+    seen = {}
+    for aid in agent_ids:
+        x, y = agent_coords[aid]
+        for dx, dy in obs_features(state.obs[aid], obs_dim).prey_offsets:
+            prey = (x + dx, y + dy)
+            best = seen.get(prey)
+            if best is None or abs(dx) + abs(dy) < abs(best[1]) + abs(best[2]):
+                seen[prey] = (aid, dx, dy)
+    return seen
+
+
+def capture_cells(state, prey_coord, spotter):
+    """
+    Cells next to prey_coord a predator could stand on to help capture it.
+
+    Cells the spotter's window shows as WALL (or off the grid) are dropped;
+    cells outside its window are kept, since nothing is known about them.
+    """
+    obs_dim = state.obs_dim
+    size = 2 * obs_dim + 1
+    aid, dx, dy = spotter
+    obs = state.obs[aid]
+    cells = []
+    for a in ORDERED_DIRS:
+        ox, oy = DIRS[a]
+        cx, cy = obs_dim + dx + ox, obs_dim + dy + oy
+        if 0 <= cx < size and 0 <= cy < size and obs[cy * size + cx] == WALL:
+            continue
+        cells.append((prey_coord[0] + ox, prey_coord[1] + oy))
+    return cells
+
+
+def assign_predators_to_prey(agent_coords, prey_coords, prey_strength):
+    """
+    Split the team into groups of prey_strength predators, one group per prey.
+
+    Each prey is scored by the summed distance of its prey_strength nearest
+    predators; prey are then served cheapest first, each taking the nearest
+    predators that are still free, until too few are left for another full
+    group. With P predators and Q prey this is O(Q * P log P).
+
+    Args:
+        agent_coords: dict agent_id -> (x, y)
+        prey_coords: list of (x, y)
+        prey_strength: predators needed next to a prey to capture it
+
+    Returns:
+        dict agent_id -> index into prey_coords. Predators left over (fewer
+        than a full group) are not in it.
+    """
+    if not prey_coords or not agent_coords:
+        return {}
+    need = min(prey_strength, len(agent_coords))
+
+    ranked = []
+    costs = []
+    for prey in prey_coords:
+        dist = {aid: _manhattan(coord, prey) for aid, coord in agent_coords.items()}
+        order = sorted(dist, key=dist.__getitem__)  # stable: ties keep agent order
+        ranked.append(order)
+        costs.append(sum(dist[aid] for aid in order[:need]))
+
+    assignment = {}
+    free = len(agent_coords)
+    for j in sorted(range(len(prey_coords)), key=costs.__getitem__):
+        if free < need:
+            break
+        taken = 0
+        for aid in ranked[j]:
+            if aid in assignment:
+                continue
+            assignment[aid] = j
+            taken += 1
+            if taken == need:
+                break
+        free -= need
+    return assignment
+
+
+def assign_capture_cells(agent_coords, group, prey_coord, cells):
+    """
+    Give each predator of a group its own cell around prey_coord.
+
+    Predators closest to the prey pick first and take the nearest cell still
+    free; once the cells run out, the rest head for the nearest cell anyway.
+    Returns dict agent_id -> target (x, y).
+    """
+    cells = cells or [prey_coord]
+    free = list(cells)
+    targets = {}
+    for aid in sorted(group, key=lambda a: _manhattan(agent_coords[a], prey_coord)):
+        coord = agent_coords[aid]
+        cell = min(free or cells, key=lambda c: _manhattan(c, coord))
+        if free:
+            free.remove(cell)
+        targets[aid] = cell
+    return targets
+
+
+def choose_pursuit_action(state, agent_id, target):
+    """
+    Step agent_id toward the global cell target.
+
+    Takes the first move along a shortest path (path_moves: longer axis first
+    where it can) that is not a wall or another agent; stays put on the
+    target, and sidesteps randomly when every closing move is blocked.
+    """
+    x, y = state.agent_coords[agent_id]
+    dx, dy = target[0] - x, target[1] - y
+    if dx == 0 and dy == 0:
+        return DO_NOTHING
+
+    feats = obs_features(state.obs[agent_id], state.obs_dim)
+    occupied = set(feats.prey_offsets) | set(feats.predator_offsets)
+    free_moves = [a for a in feats.legal_moves if DIRS[a] not in occupied]
+    if not free_moves:
+        return DO_NOTHING
+
+    for a in path_moves(state, agent_id, dx, dy):
+        if a in free_moves:
+            return a
+
+    rngs = getattr(state, "rngs", {})
+    rng = rngs.get(agent_id, random)
+    return rng.choice(free_moves)
+
+
+def choose_search_action(state, agent_id):
+    """
+    Action for a predator with no prey in sight: head for the most likely
+    prey cell of the team's belief (state.belief_target, see prey_belief),
+    or patrol when there is no belief or the agent already stands on it.
+    """
+    target = getattr(state, "belief_target", None)
+    if target is None or target == state.agent_coords[agent_id]:
+        return choose_patrol_action(state, agent_id)
+    return choose_pursuit_action(state, agent_id, target)
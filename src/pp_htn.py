@@ -16,6 +16,12 @@ from pp_behavior import (
     choose_leader_action,
     choose_helper_action,
     choose_patrol_action,
+    visible_prey,
+    capture_cells,
+    assign_predators_to_prey,
+    assign_capture_cells,
+    choose_pursuit_action,
+    choose_search_action,
 )
 
 DEBUG = False
@@ -76,7 +82,7 @@ def m_patrol_if_not_visible(state, agent_id):
     return [("do", agent_id, action)]
 
 # ----------------------------------------------------------------------
-# Joint HTN method (this is what we actually use)
+# Joint HTN methods (this is what we actually use)
 # ----------------------------------------------------------------------
 def m_choose_joint_action(state, agent_ids):
     """
@@ -86,7 +92,8 @@ def m_choose_joint_action(state, agent_ids):
           * leader chases
           * helpers coordinate based on leader
       - Else:
-          * everyone patrols using shared patrol logic.
+          * everyone searches: heads for the belief's most likely prey
+            cell, or patrols without one (choose_search_action).
     """
     obs_dict = state.obs
     obs_dim = state.obs_dim
@@ -101,20 +108,102 @@ def m_choose_joint_action(state, agent_ids):
         leader_action = choose_leader_action(state, leader)
         subtasks.append(("do", leader, leader_action))
 
+        lx, ly = state.agent_coords[leader]
+        prey_coord = (lx + dx, ly + dy)
         for aid in agent_ids:
             if aid == leader:
                 continue
-            helper_action = choose_helper_action(state, aid, leader_action)
+            helper_action = choose_helper_action(state, aid, leader_action, prey_coord)
             subtasks.append(("do", aid, helper_action))
 
     else:
-        # No prey visible: each agent patrols
+        # No prey visible: each agent searches
         for aid in agent_ids:
-            a = choose_patrol_action(state, aid)
+            a = choose_search_action(state, aid)
             subtasks.append(("do", aid, a))
 
     return subtasks
 
+def m_assign_joint_action(state, agent_ids):
+    """
+    Joint HTN method for larger teams and several prey:
+      - collect every prey any predator sees, in global coords
+      - split the predators into groups of prey_strength, one per prey
+        (assign_predators_to_prey)
+      - each group member heads for its own free cell next to its prey
+      - predators left without a prey search (choose_search_action).
+    Not applicable to the 2-predator, 1-prey setup, which keeps the
+    leader/helper m_choose_joint_action.
+    """
+    if len(agent_ids) <= 2 and state.num_prey <= 1:
+        return False
+
+    agent_coords = state.agent_coords
+    prey = visible_prey(state, agent_ids)
+    prey_coords = list(prey)
+    assignment = assign_predators_to_prey(
+        {aid: agent_coords[aid] for aid in agent_ids}, prey_coords, state.prey_strength
+    )
+
+    groups = {}
+    for aid in agent_ids:
+        if aid in assignment:
+            groups.setdefault(assignment[aid], []).append(aid)
+    targets = {}
+    for j, group in groups.items():
+        prey_coord = prey_coords[j]
+        cells = capture_cells(state, prey_coord, prey[prey_coord])
+        targets.update(assign_capture_cells(agent_coords, group, prey_coord, cells))
+
+    subtasks = []
+    for aid in agent_ids:
+        if aid in targets:
+            a = choose_pursuit_action(state, aid, targets[aid])
+        else:
+            a = choose_search_action(state, aid)
+        subtasks.append(("do", aid, a))
+    return subtasks
+
+# ----------------------------------------------------------------------
+# Direct-dispatch planner (fast path for gtpyhop.find_plan)
+# ----------------------------------------------------------------------
+# Task methods of the domain, declared to GTPyhop below and dispatched
+# directly by find_plan_direct.
+TASK_METHODS = {
+    "choose_joint_action": [m_assign_joint_action, m_choose_joint_action],
+}
+
+def find_plan_direct(state, todo_list):
+    """
+    Drop-in replacement for gtpyhop.find_plan(state, todo_list) on this domain.
+
+    Every method here expands straight into primitive 'do' actions, and 'do'
+    always succeeds, so the plan is just the subtasks of the first applicable
+    method for each task, in order. This skips find_plan's search stack, the
+    deep copy of the state (including the agents' RNGs) made for every action,
+    and its verbosity checks. Methods are called on the same state object, in
+    the same order, so they consume the agents' RNGs exactly as find_plan does.
+
+    Returns False if a task has no applicable method.
+    """
+    plan = []
+    for task in todo_list:
+        name, args = task[0], task[1:]
+        if name == "do":
+            plan.append(task)
+            continue
+        for method in TASK_METHODS[name]:
+            subtasks = method(state, *args)
+            if subtasks is not False and subtasks is not None:
+                break
+        else:
+            return False
+        subplan = find_plan_direct(state, subtasks)
+        if subplan is False:
+            return False
+        plan.extend(subplan)
+    return plan
+
 # ----------------------------------------------------------------------
 # Domain registration
 # ----------------------------------------------------------------------
@@ -131,4 +220,4 @@ gtpyhop.declare_actions(do)
 
 # Progress Report 2: Joint actions
 # Joint planner API (this is what run_demo should call):
-gtpyhop.declare_task_methods( "choose_joint_action", m_choose_joint_action)
+gtpyhop.declare_task_methods("choose_joint_action", *TASK_METHODS["choose_joint_action"])
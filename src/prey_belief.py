@@ -0,0 +1,209 @@
+import numpy as np
+
+from obs_features import obs_features
+
+# Prey moves in the order posggym breaks ties when fleeing: neighbours are
+# sorted by (distance, (x, y)) and the last one wins, so among cells equally
+# far from the predator the largest x, then the largest y, is taken. np.argmax
+# keeps the first maximum, hence E, S, stay, N, W.
+FLEE_MOVES = ((1, 0), (0, 1), (0, 0), (0, -1), (-1, 0))
+STAY = FLEE_MOVES.index((0, 0))
+# Grid.get_neighbours order: N, E, S, W
+NEIGHBOUR_ORDER = ((0, -1), (1, 0), (0, 1), (-1, 0))
+
+
+def _shifted(a, dx, dy, fill):
+    """Array whose [y, x] is a[y + dy, x + dx] (fill off the grid)."""
+    out = np.full_like(a, fill)
+    h, w = a.shape
+    out[max(-dy, 0):h + min(-dy, 0), max(-dx, 0):w + min(-dx, 0)] = \
+        a[max(dy, 0):h + min(dy, 0), max(dx, 0):w + min(dx, 0)]
+    return out
+
+
+class PreyBelief:
+    """
+    Team belief over where the prey is, as a (height, width) probability grid.
+
+    predict() pushes the belief through one prey move of
+    PredatorPreyModel._get_next_prey_state: a prey with its closest predator
+    (ties split evenly) within obs_dim on either axis flees to the free
+    neighbour (or stays) furthest from it, with posggym's tie order; any
+    other prey moves to a uniformly random non-wall neighbour. Prey-on-prey
+    avoidance and occupancy by other prey are not modelled. update() zeroes
+    every cell inside a predator's window, or collapses the belief onto the
+    prey in view. Both are whole-array NumPy operations over predators x
+    cells.
+
+    With several prey the grid is the belief over "some uncaught prey is
+    here", normalised to 1.
+    """
+
+    def __init__(self, width, height, block_coords, obs_dim, prey_strength, start_coords=None):
+        self.width = width
+        self.height = height
+        self.obs_dim = obs_dim
+        self.prey_strength = prey_strength
+        ys, xs = np.mgrid[0:height, 0:width].astype(np.int16)
+        self.xs, self.ys = xs, ys
+
+        free = np.ones((height, width), dtype=bool)
+        for x, y in block_coords:
+            free[y, x] = False
+        self.free = free
+        # non-wall neighbours of every cell
+        self.neighbour_count = sum(_shifted(free, dx, dy, False).astype(np.int8) for dx, dy in NEIGHBOUR_ORDER)
+
+        # random move: uniform over non-wall neighbours, stay if there is none
+        n = np.maximum(self.neighbour_count, 1)
+        self.random_probs = np.stack([
+            (self.neighbour_count == 0).astype(np.float64) if (dx, dy) == (0, 0)
+            else _shifted(free, dx, dy, False) / n
+            for dx, dy in FLEE_MOVES
+        ])
+
+        # Everything about a flee target that does not depend on the
+        # predators, indexed [move, (neighbour,) y, x] by the prey's cell:
+        # cell indices into the grid padded by 2 (so every target and its
+        # neighbours are in range), whether the target is free, its non-wall
+        # neighbour count, which of its neighbours exist, and which one is
+        # the prey's own cell.
+        pw = width + 4
+        moves = np.array(FLEE_MOVES, dtype=np.int16)[:, :, None, None]
+        nbrs = np.array(NEIGHBOUR_ORDER, dtype=np.int16)[None, :, :, None, None]
+        self._target_idx = (ys + 2 + moves[:, 1]) * pw + xs + 2 + moves[:, 0]
+        self._target_nbr_idx = (self._target_idx[:, None]
+                                + nbrs[:, :, 1] * pw + nbrs[:, :, 0])
+        padded_free = np.pad(free, 2).ravel()
+        padded_count = np.pad(self.neighbour_count, 2).ravel()
+        self._target_free = padded_free[self._target_idx]
+        self._target_count = padded_count[self._target_idx]
+        self._target_nbr_free = padded_free[self._target_nbr_idx]
+        self._nbr_is_origin = (np.array(NEIGHBOUR_ORDER)[None, :] == -np.array(FLEE_MOVES)[:, None]).all(axis=-1)
+        self._xs_after = xs + moves[:, 0, None]                         # (5, 1, H, W)
+        self._ys_after = ys + moves[:, 1, None]
+
+        self.prior = np.zeros((height, width))
+        if start_coords:
+            for x, y in start_coords:
+                self.prior[y, x] = 1.0
+        else:
+            self.prior[free] = 1.0
+        self.prior /= self.prior.sum()
+        self.reset()
+
+    @classmethod
+    def from_model(cls, model):
+        """Belief for a posggym PredatorPreyModel, starting on its prey start cells."""
+        grid = model.grid
+        return cls(grid.width, grid.height, grid.block_coords, model.obs_dim,
+                   model.prey_strength, grid.prey_start_coords)
+
+    def reset(self):
+        self.belief = self.prior.copy()
+        self._predator_coords = None  # where the predators were at the last update
+        self._probs_for = None        # predator coords _probs was computed for
+        self._probs = None
+
+    def _allowed_moves(self, predators):
+        """
+        (5, H, W) mask of the flee moves a prey on each cell may take
+        (PredatorPreyModel._coord_available_for_prey; staying is always
+        allowed): the target is free and not occupied, and keeps at least
+        prey_strength neighbours once occupied ones, the prey's own cell
+        included, are dropped. The model drops them from the list it is
+        iterating over, which skips the neighbour after each one dropped;
+        that is reproduced here, neighbours in Grid.get_neighbours' N, E, S,
+        W order.
+        """
+        padded = np.zeros((self.height + 4) * (self.width + 4), dtype=bool)
+        padded[(predators[:, 1] + 2) * (self.width + 4) + predators[:, 0] + 2] = True
+        nbr_occ = padded[self._target_nbr_idx] | self._nbr_is_origin[:, :, None, None]
+        present = self._target_nbr_free
+        skip = np.zeros(self._target_free.shape, dtype=bool)
+        dropped = np.zeros(self._target_free.shape, dtype=np.int8)
+        for d in range(len(NEIGHBOUR_ORDER)):
+            drop = present[:, d] & ~skip & nbr_occ[:, d]
+            dropped += drop
+            skip = np.where(present[:, d], drop, skip)
+        ok = (self._target_free & ~padded[self._target_idx]
+              & (self._target_count - dropped >= self.prey_strength))
+        ok[STAY] = True
+        return ok
+
+    def _move_probs(self, coords):
+        """(5, H, W) probability of each FLEE_MOVES move from each cell, with predators at coords."""
+        p = np.asarray(coords, dtype=np.int16)
+        px = p[:, 0, None, None]
+        py = p[:, 1, None, None]
+        adx = np.abs(self.xs - px)
+        ady = np.abs(self.ys - py)
+        dist = adx + ady                                                  # (P, H, W)
+
+        # closest predator, ties split evenly, and whether it makes the prey flee
+        closest = dist == dist.min(axis=0)
+        flee_w = closest / closest.sum(axis=0) * ((adx <= self.obs_dim) | (ady <= self.obs_dim))
+        random_w = 1.0 - flee_w.sum(axis=0)
+
+        allowed = self._allowed_moves(p)
+
+        # distance from each predator after each move, -1 where the move is
+        # not allowed; the flee move is the first maximum in FLEE_MOVES order
+        cand = np.abs(self._xs_after - px) + np.abs(self._ys_after - py)  # (5, P, H, W)
+        cand = np.where(allowed[:, None], cand, -1)
+        best = cand.argmax(axis=0)                                        # (P, H, W)
+        chosen = best == np.arange(len(FLEE_MOVES))[:, None, None, None]
+        return (chosen * flee_w).sum(axis=1) + random_w * self.random_probs
+
+    def predict(self, predator_coords=None):
+        """Advance the belief by one prey move, fleeing from predator_coords (default: last update's)."""
+        coords = self._predator_coords if predator_coords is None else tuple(map(tuple, predator_coords))
+        if coords is None:
+            return
+        # several predictions between updates run against the same predators
+        if self._probs_for != coords:
+            self._probs = self._move_probs(coords)
+            self._probs_for = coords
+        probs = self._probs
+
+        # every (cell, move) mass lands on its target; impossible moves carry none
+        moved = np.bincount(self._target_idx.ravel(), weights=(self.belief * probs).ravel(),
+                            minlength=(self.height + 4) * (self.width + 4))
+        self.belief = moved.reshape(self.height + 4, self.width + 4)[2:-2, 2:-2].copy()
+
+    def update(self, predator_coords, prey_coords=()):
+        """
+        Condition on the team's observations: predator_coords are the
+        observers' (x, y) and prey_coords the prey they see.
+        """
+        self._predator_coords = tuple(map(tuple, predator_coords))
+        if prey_coords:
+            b = np.zeros_like(self.belief)
+            for x, y in prey_coords:
+                b[y, x] += 1.0
+            self.belief = b / b.sum()
+            return
+
+        p = np.asarray(predator_coords)
+        seen = ((np.abs(self.xs - p[:, 0, None, None]) <= self.obs_dim)
+                & (np.abs(self.ys - p[:, 1, None, None]) <= self.obs_dim)).any(axis=0)
+        b = np.where(seen, 0.0, self.belief)
+        total = b.sum()
+        if total <= 0:
+            # the prey slipped past the model: start over on every unseen free cell
+            b = (self.free & ~seen).astype(np.float64)
+            total = b.sum()
+        self.belief = b / total if total > 0 else self.prior.copy()
+
+    def update_from_obs(self, agent_coords, observations):
+        """update() from each agent's (x, y) and local observation window."""
+        prey = set()
+        for aid, (x, y) in agent_coords.items():
+            for dx, dy in obs_features(observations[aid], self.obs_dim).prey_offsets:
+                prey.add((x + dx, y + dy))
+        self.update(list(agent_coords.values()), sorted(prey))
+
+    def mode(self):
+        """(x, y) of the most likely prey cell."""
+        y, x = np.unravel_index(int(self.belief.argmax()), self.belief.shape)
+        return (int(x), int(y))
@@ -0,0 +1,184 @@
+import base64
+
+import numpy as np
+import posggym.envs.grid_world.predator_prey as pp
+
+from trajectory import TrajectoryRecorder
+
+# Every action (0..4) fits in 3 bits
+ACTION_BITS = 3
+
+
+def pack_actions(actions):
+    """Bit-pack a (steps, num_agents) array of actions at ACTION_BITS bits each."""
+    actions = np.asarray(actions, dtype=np.uint8)
+    bits = np.unpackbits(actions[..., None], axis=-1, bitorder="little")[..., :ACTION_BITS]
+    return np.packbits(bits.ravel(), bitorder="little").tobytes()
+
+
+def unpack_actions(packed, num_steps, num_agents):
+    """Inverse of pack_actions."""
+    n = num_steps * num_agents
+    bits = np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=n * ACTION_BITS, bitorder="little")
+    bits = bits.reshape(num_steps, num_agents, ACTION_BITS)
+    weights = (1 << np.arange(ACTION_BITS)).astype(np.uint8)
+    return (bits * weights).sum(axis=-1, dtype=np.uint8)
+
+
+class ActionLog:
+    """
+    Everything needed to replay one episode without the planner: the env
+    config, the env seed, the initial PPState and the joint action stream
+    bit-packed at ACTION_BITS bits per agent per step.
+    """
+
+    def __init__(self, config, seed, initial_state, num_steps, packed_actions):
+        self.config = config                # PredatorPreyModel kwargs (grid name, counts, ...)
+        self.seed = seed
+        self.initial_state = initial_state  # PPState
+        self.num_steps = num_steps
+        self.packed_actions = packed_actions
+
+    @property
+    def num_agents(self):
+        return self.config["num_predators"]
+
+    def actions(self):
+        """(num_steps, num_agents) uint8 array of joint actions."""
+        return unpack_actions(self.packed_actions, self.num_steps, self.num_agents)
+
+    def to_dict(self):
+        """JSON-able form (actions base64-encoded)."""
+        s = self.initial_state
+        return {
+            "config": self.config,
+            "seed": self.seed,
+            "initial_state": {
+                "predator_coords": [list(c) for c in s.predator_coords],
+                "prey_coords": [list(c) for c in s.prey_coords],
+                "prey_caught": list(s.prey_caught),
+            },
+            "num_steps": self.num_steps,
+            "actions": base64.b64encode(self.packed_actions).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        s = d["initial_state"]
+        initial_state = pp.PPState(
+            tuple(tuple(c) for c in s["predator_coords"]),
+            tuple(tuple(c) for c in s["prey_coords"]),
+            tuple(s["prey_caught"]),
+        )
+        return cls(d["config"], d["seed"], initial_state, d["num_steps"], base64.b64decode(d["actions"]))
+
+
+class ActionLogRecorder:
+    """Collects one episode's joint actions into a preallocated (horizon, num_agents) array."""
+
+    def __init__(self, horizon, agent_ids):
+        self.agent_ids = list(agent_ids)
+        self.buffer = np.zeros((horizon, len(self.agent_ids)), dtype=np.uint8)
+        self.length = 0
+        self._seed = None
+        self._initial_state = None
+        self._config = None
+
+    def reset(self, env, seed, grid):
+        model = env.unwrapped.model
+        self._seed = seed
+        self._initial_state = env.unwrapped.state
+        self._config = dict(
+            grid=grid,
+            num_predators=model.num_predators,
+            num_prey=model.num_prey,
+            cooperative=model.cooperative,
+            prey_strength=model.prey_strength,
+            obs_dim=model.obs_dim,
+        )
+        self.length = 0
+
+    def record(self, actions):
+        row = self.buffer[self.length]
+        for i, aid in enumerate(self.agent_ids):
+            row[i] = actions[aid]
+        self.length += 1
+
+    def finish(self):
+        return ActionLog(
+            self._config, self._seed, self._initial_state, self.length,
+            pack_actions(self.buffer[:self.length]),
+        )
+
+
+class ReplayEngine:
+    """
+    Rebuilds an episode from its ActionLog by driving PredatorPreyModel.step.
+
+    The model is seeded with the episode's env seed and samples its initial
+    state exactly as env.reset(seed=...) does, so prey moves consume the same
+    RNG draws as in the original run. No planner, observer or wrapper runs.
+    """
+
+    def __init__(self, log):
+        self.log = log
+        c = log.config
+        self.model = pp.PredatorPreyModel(
+            c["grid"], c["num_predators"], c["num_prey"], c["cooperative"], c["prey_strength"], c["obs_dim"]
+        )
+        self._actions = log.actions()
+
+    def timesteps(self, num_steps=None):
+        """
+        Yield (state, JointTimestep) for each replayed step, where state is the
+        state the step was taken from.
+        """
+        model = self.model
+        model.seed(self.log.seed)
+        state = model.sample_initial_state()
+        if state != self.log.initial_state:
+            raise ValueError(
+                f"Seed {self.log.seed} gives initial state {state}, "
+                f"but the log recorded {self.log.initial_state}"
+            )
+        agent_ids = model.possible_agents
+        n = self.log.num_steps if num_steps is None else min(num_steps, self.log.num_steps)
+        for t in range(n):
+            actions = {aid: int(a) for aid, a in zip(agent_ids, self._actions[t])}
+            timestep = model.step(state, actions)
+            yield state, timestep
+            state = timestep.state
+
+    def state_at(self, t):
+        """State after t steps (t=0 is the initial state)."""
+        if not 0 <= t <= self.log.num_steps:
+            raise IndexError(f"step {t} outside 0..{self.log.num_steps}")
+        if t == 0:
+            return self.log.initial_state
+        for _, timestep in self.timesteps(t):
+            pass
+        return timestep.state
+
+    def states(self):
+        """Every state of the episode, initial state first."""
+        states = [self.log.initial_state]
+        states.extend(timestep.state for _, timestep in self.timesteps())
+        return states
+
+    def trajectory(self):
+        """(num_steps + 1, n_entities, 2) positions, ready for plot_utils.plot_trajectories."""
+        c = self.log.config
+        recorder = TrajectoryRecorder(self.log.num_steps, c["num_predators"], c["num_prey"])
+        recorder.record_state(self.log.initial_state)
+        for _, timestep in self.timesteps():
+            recorder.record_state(timestep.state)
+        return recorder.positions
+
+
+def load_action_logs(path):
+    """Yield (record, ActionLog) for every record with an action log in a JSON Lines results file."""
+    from result_sink import read_jsonl
+
+    for record in read_jsonl(path):
+        if "action_log" in record:
+            yield record, ActionLog.from_dict(record["action_log"])
@@ -0,0 +1,300 @@
+import json
+import os
+
+import numpy as np
+
+# Config fields copied from a run_single_episode task into every record
+CONFIG_FIELDS = ("grid", "num_predators", "num_prey", "time_horizon", "comm_mode",
+                 "k_sync", "keep_prev_action", "planner", "pipeline", "belief",
+                 "paths", "helper_pursuit", "env_impl")
+
+# Defaults for config fields a task may leave out (run_single_episode defaults)
+CONFIG_DEFAULTS = dict(grid="10x10", num_predators=2, num_prey=1, time_horizon=200,
+                       comm_mode="full", k_sync=5, keep_prev_action=True, planner="gtpyhop",
+                       pipeline=None, belief=False, paths=False, helper_pursuit=False,
+                       env_impl="vendored")
+
+
+def episode_record(task, captured, steps, stats):
+    """
+    Flatten one finished episode into a plain, JSON-able record.
+
+    Args:
+        task: run_single_episode kwargs for the episode
+        captured, steps, stats: what run_single_episode returned
+    """
+    config = {f: task.get(f, CONFIG_DEFAULTS[f]) for f in CONFIG_FIELDS}
+    return {
+        "seed": task["seed"],
+        "config": config,
+        "captured": bool(captured),
+        "steps": steps,
+        "messages": stats.messages,
+        "replans": stats.replans,
+        "bytes_up": stats.bytes_up,
+        "bytes_down": stats.bytes_down,
+        "wall_time_sec": stats.wall_time_sec,
+        "stale_plans": stats.stale_plans,
+        "staleness_steps": stats.staleness_steps,
+        "capture_events": [
+            {
+                "step": ev["step"],
+                "wall_time_sec": ev["wall_time_sec"],
+                "prey_index": ev["prey_index"],
+                "prey_coord": [int(c) for c in ev["prey_coord"]],
+                "involved_predators": list(ev["involved_predators"]),
+                "num_adjacent": ev["num_adjacent"],
+                "prey_strength": ev["prey_strength"],
+                "rewards_this_step": {str(a): float(r) for a, r in ev["rewards_this_step"].items()},
+            }
+            for ev in stats.capture_events
+        ],
+        # only present for episodes run with record_actions=True (JSON Lines only)
+        **({"action_log": stats.action_log.to_dict()} if stats.action_log is not None else {}),
+    }
+
+
+class JsonlResultSink:
+    """
+    Append-only JSON Lines writer: one record per line.
+
+    Records are written as they arrive and the file is flushed every
+    flush_every records (and on close), so memory use does not grow with the
+    sweep and a crash loses at most the last unflushed batch. Opening an
+    existing file appends to it.
+    """
+
+    def __init__(self, path, flush_every=100):
+        self.path = path
+        self.flush_every = flush_every
+        self._f = open(path, "a", encoding="utf-8")
+        self._pending = 0
+
+    def write(self, record):
+        self._f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._pending = 0
+
+    def close(self):
+        if not self._f.closed:
+            self.flush()
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_jsonl(path):
+    """Yield the records of a JSON Lines results file (skips a torn last line)."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # partially written line left by a crash
+                continue
+
+
+# Columnar layout: one raw little-endian file per column under the sink
+# directory, plus schema.json. String columns are stored as int16 codes into
+# schema["categories"][column]. Capture events go into their own table.
+EPISODE_COLUMNS = {
+    "seed": "<i8",
+    "grid": "<i2",
+    "num_predators": "<i2",
+    "num_prey": "<i2",
+    "time_horizon": "<i4",
+    "comm_mode": "<i2",
+    "k_sync": "<i4",
+    "keep_prev_action": "|b1",
+    "planner": "<i2",
+    "pipeline": "<i2",
+    "belief": "|b1",
+    "paths": "|b1",
+    "helper_pursuit": "|b1",
+    "env_impl": "<i2",
+    "captured": "|b1",
+    "steps": "<i4",          # -1 when not captured
+    "messages": "<i8",
+    "replans": "<i8",
+    "bytes_up": "<i8",
+    "bytes_down": "<i8",
+    "wall_time_sec": "<f8",
+    "stale_plans": "<i8",
+    "staleness_steps": "<i8",
+}
+EVENT_COLUMNS = {
+    "episode": "<i8",        # row index into the episode table
+    "step": "<i4",
+    "wall_time_sec": "<f8",
+    "prey_index": "<i2",
+    "prey_x": "<i2",
+    "prey_y": "<i2",
+    "num_adjacent": "<i2",
+    "prey_strength": "<i2",
+}
+CATEGORICAL_COLUMNS = ("grid", "comm_mode", "planner", "pipeline", "env_impl")
+
+
+class ColumnarResultSink:
+    """
+    Append-only columnar binary writer.
+
+    Rows are buffered in small per-column numpy arrays and appended to the
+    column files every flush_every records, so memory stays bounded at one
+    batch. Each column file can be loaded independently with np.fromfile (see
+    read_columnar). Reopening an existing directory continues appending.
+    """
+
+    def __init__(self, path, flush_every=1000):
+        self.path = path
+        self.flush_every = flush_every
+        os.makedirs(path, exist_ok=True)
+        self._schema_path = os.path.join(path, "schema.json")
+        if os.path.exists(self._schema_path):
+            with open(self._schema_path, encoding="utf-8") as f:
+                self._schema = json.load(f)
+        else:
+            self._schema = {
+                "episodes": EPISODE_COLUMNS,
+                "events": EVENT_COLUMNS,
+                "categories": {c: [] for c in CATEGORICAL_COLUMNS},
+                "num_episodes": 0,
+                "num_events": 0,
+            }
+        self._codes = {c: {v: i for i, v in enumerate(vals)}
+                       for c, vals in self._schema["categories"].items()}
+        self._episodes = self._new_buffer(EPISODE_COLUMNS, flush_every)
+        self._events = {c: [] for c in EVENT_COLUMNS}
+        self._n = 0
+
+    @staticmethod
+    def _new_buffer(columns, n):
+        return {c: np.zeros(n, dtype=dt) for c, dt in columns.items()}
+
+    def _code(self, column, value):
+        codes = self._codes[column]
+        if value not in codes:
+            codes[value] = len(codes)
+            self._schema["categories"][column].append(value)
+        return codes[value]
+
+    def write(self, record):
+        row = self._n
+        episode = self._schema["num_episodes"] + row
+        config = record["config"]
+        buf = self._episodes
+        buf["seed"][row] = record["seed"]
+        for c in CONFIG_FIELDS:
+            buf[c][row] = self._code(c, config[c]) if c in CATEGORICAL_COLUMNS else config[c]
+        buf["captured"][row] = record["captured"]
+        buf["steps"][row] = -1 if record["steps"] is None else record["steps"]
+        buf["messages"][row] = record["messages"]
+        buf["replans"][row] = record["replans"]
+        buf["bytes_up"][row] = record["bytes_up"]
+        buf["bytes_down"][row] = record["bytes_down"]
+        buf["wall_time_sec"][row] = np.nan if record["wall_time_sec"] is None else record["wall_time_sec"]
+        buf["stale_plans"][row] = record["stale_plans"]
+        buf["staleness_steps"][row] = record["staleness_steps"]
+
+        ev_cols = self._events
+        for ev in record["capture_events"]:
+            ev_cols["episode"].append(episode)
+            ev_cols["step"].append(ev["step"])
+            ev_cols["wall_time_sec"].append(np.nan if ev["wall_time_sec"] is None else ev["wall_time_sec"])
+            ev_cols["prey_index"].append(ev["prey_index"])
+            ev_cols["prey_x"].append(ev["prey_coord"][0])
+            ev_cols["prey_y"].append(ev["prey_coord"][1])
+            ev_cols["num_adjacent"].append(ev["num_adjacent"])
+            ev_cols["prey_strength"].append(ev["prey_strength"])
+
+        self._n += 1
+        if self._n >= self.flush_every:
+            self.flush()
+
+    def _append(self, table, column, values):
+        with open(os.path.join(self.path, f"{table}.{column}.bin"), "ab") as f:
+            values.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def flush(self):
+        n = self._n
+        if n:
+            for c, values in self._episodes.items():
+                self._append("episodes", c, values[:n])
+        num_events = len(self._events["episode"])
+        if num_events:
+            for c, dt in EVENT_COLUMNS.items():
+                self._append("events", c, np.asarray(self._events[c], dtype=dt))
+                self._events[c].clear()
+        self._schema["num_episodes"] += n
+        self._schema["num_events"] += num_events
+        self._n = 0
+        # schema last, so its row counts never run ahead of the column files
+        tmp = self._schema_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._schema, f, indent=2)
+        os.replace(tmp, self._schema_path)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_columnar(path, decode_categories=True):
+    """
+    Load a ColumnarResultSink directory.
+
+    Returns:
+        (episodes, events): dicts of column name -> numpy array. Categorical
+        episode columns are decoded to object arrays of strings unless
+        decode_categories=False. Rows past the schema's counts (from a flush
+        interrupted by a crash) are dropped.
+    """
+    with open(os.path.join(path, "schema.json"), encoding="utf-8") as f:
+        schema = json.load(f)
+
+    def load(table, columns, count):
+        out = {}
+        for c, dt in columns.items():
+            file = os.path.join(path, f"{table}.{c}.bin")
+            arr = np.fromfile(file, dtype=dt, count=count) if count else np.zeros(0, dtype=dt)
+            if decode_categories and c in schema["categories"]:
+                arr = np.asarray(schema["categories"][c], dtype=object)[arr]
+            out[c] = arr
+        return out
+
+    episodes = load("episodes", schema["episodes"], schema["num_episodes"])
+    events = load("events", schema["events"], schema["num_events"])
+    return episodes, events
+
+
+def open_result_sink(path, fmt=None, flush_every=None):
+    """
+    Open a result sink for path.
+
+    fmt is 'jsonl' or 'columnar'; if None it is 'jsonl' for *.jsonl paths and
+    'columnar' otherwise (path is then a directory).
+    """
+    if fmt is None:
+        fmt = "jsonl" if path.endswith(".jsonl") else "columnar"
+    if fmt == "jsonl":
+        return JsonlResultSink(path, **({"flush_every": flush_every} if flush_every else {}))
+    if fmt == "columnar":
+        return ColumnarResultSink(path, **({"flush_every": flush_every} if flush_every else {}))
+    raise ValueError(f"Unknown result sink format: {fmt}")
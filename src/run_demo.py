@@ -1,46 +1,24 @@
-
 import time
-import inspect
-from pprint import pprint
 import argparse
 import random
 import os
-import posggym
+import sys
 # actions: 0=STAY, 1=UP, 2=DOWN, 3=LEFT, 4=RIGHT (per this env)
 # obs cells: 0=EMPTY, 1=WALL, 2=PREDATOR, 3=PREY
 
 # seed = 42 for 
 
-import posggym.envs.grid_world.predator_prey as pp
-
-from gymnasium.wrappers import RecordVideo
-
-from wrappers import ActionLoggingWrapper
+# Only light modules are imported here. posggym (env_pool builds envs on
+# demand), gtpyhop, the planner and NumPy-backed recorders are imported by
+# run_single_episode, result sinks by run_main, and matplotlib (plot_utils),
+# the sweep helpers and video recording where they are used, so
+# `run_demo.py plot` and --help never load the simulator.
 from observers import MinimalObserver
+from env_pool import ENV_POOL
 
-from plan_utils import (
-    plan_to_actions,
-    joint_plan_to_actions,
-    build_planner_state,
-)
-
-
-import pp_htn
-
-import gtpyhop
+from constants import ACTION_NAMES, FIG_DIR
 
-from constants import (
-    DO_NOTHING, UP, DOWN, LEFT, RIGHT,
-    EMPTY, WALL, PRED, PREY,
-    DIRS, ORDERED_DIRS, ACTION_NAMES, FIG_DIR
-)
-
-from plot_utils import plot_trajectories, record_positions, plot_capture_statistics, plot_avg_steps_for_k, plot_k_vs_steps, plot_comm_modes_comparison, plot_comm_modes_success_rates, plot_k_vs_costs
-import matplotlib.pyplot as plt
-
-from comm_module import HTNCommModule, CommStats
-
-from sweep_utils import sweep_k_sync, sweep_comm_modes
+from phase_timing import PhaseTimings, StepTimer, NULL_TIMER
 
 #print(pp.__file__)
 
@@ -55,12 +33,61 @@ def run_single_episode (
     keep_prev_action: bool = True,
     render: bool = False,
     comm_mode: str = "full",
-    k_sync: int = 5):
+    k_sync: int = 5,
+    env_pool=ENV_POOL,
+    planner: str = "gtpyhop",
+    timing: bool = False,
+    trajectory_store=None,
+    trajectory_index: int = None,
+    record_actions: bool = False,
+    grid: str = "10x10",
+    num_predators: int = 2,
+    num_prey: int = 1,
+    pipeline: str = None,
+    belief: bool = False,
+    paths: bool = False,
+    helper_pursuit: bool = False,
+    env_impl: str = "vendored"):
     """
     Run one Predator-Prey episode and return:
         captured (bool): whether prey was captured
         steps_to_capture (int or None): number of env steps until capture
                                         (None if not captured within horizon)
+
+    The environment is taken from env_pool and handed back at the end of the
+    episode; pass env_pool=None to build a fresh env and close it afterwards.
+
+    With timing=True every step of the loop is split into phases (decide,
+    log, env_step, record, observer, render) and their latencies are
+    collected in stats.timings (a phase_timing.PhaseTimings).
+
+    Positions are recorded into a preallocated array; with trajectory_store
+    set they go straight into row trajectory_index of the sweep's memory-mapped
+    trajectory file.
+
+    With record_actions=True the env seed, initial state and bit-packed joint
+    actions are kept in stats.action_log, which replay.ReplayEngine can step
+    through again without the planner.
+
+    grid, num_predators and num_prey set the env config; any team bigger than
+    2 predators and 1 prey is planned with pp_htn.m_assign_joint_action.
+
+    pipeline='thread' or 'process' plans each step on a background worker
+    while the env steps, so agents act on one-step-old plans (see
+    HTNCommModule); the plan's lag behind the latest replan due is counted
+    in stats.stale_plans.
+
+    belief=True makes the planner track a prey_belief.PreyBelief and send
+    predators with no prey in sight toward its most likely cell instead of
+    patrolling (off by default).
+
+    paths=True chases around blocks along the grid's shortest-path table
+    (path_tables); helper_pursuit=True sends helpers that can't see the prey
+    toward the leader's prey instead of copying its move.
+
+    env_impl picks the Predator-Prey implementation (env_pool.ENV_IDS): the
+    vendored copy in resources/ (default, faster) or the installed posggym
+    one; both give the same episodes.
     """
     TARGET_FPS = 5
     SLEEP = 1.0 / TARGET_FPS
@@ -73,169 +100,258 @@ def run_single_episode (
     
     Note: if time_horizon is > max_episode_steps, env will terminate early at max_episode_steps
     """
+    import gtpyhop
+
+    from comm_module import HTNCommModule, init_agent_memory
+    from env_pool import make_env
+    from replay import ActionLogRecorder
+    from trajectory import TrajectoryRecorder
+
+    # one figure per episode is slow; for sweeps, record a TrajectoryStore and
+    # plot heatmaps.OccupancyHeatmaps instead (see the preset at the bottom)
     save_plot_trajectories_each_episode = False
-    env = posggym.make (
-        "PredatorPrey-v0",
-        max_episode_steps=time_horizon,  # keep aligned with horizon
-        grid="10x10",
-        num_predators=2,
-        num_prey=1,
+    env_config = dict(
+        grid=grid,
+        num_predators=num_predators,
+        num_prey=num_prey,
+        time_horizon=time_horizon,
         render_mode="human" if render else None,
+        debug=debug,
+        env_impl=env_impl,
     )
-    # Instantiate environment with action logging wrapper that has more detailed logging
-    env = ActionLoggingWrapper(env, debug=debug)
-    #env = RecordVideo(env, video_folder="./videos/", name_prefix="pred_prey", episode_trigger=lambda x: True)
-   
-    if debug:
-        print(f"Run POSGGym Predator-Prey with GTPyhop HTN planner. [DEBUG MODE]")
-        print(f"[DEBUG | Run_IDX={run_idx}] Printing GTPyhop Domain")
-        gtpyhop.print_domain()
-    
-    # seed = 42 for reproducible run where the prey is captured around cell (10,9)
-    # seed = 43 is a run where the agents get stuck in the top right and don't move
-    observations, infos = env.reset(seed=seed)
-    captured = False
-    steps_to_capture = None
-    all_done = False
-    
-    position_history = {"predators" : {}, "prey" : {} }
-    record_positions(env, position_history, init=True)
-    
-        
-    # Per-agent persistent memory lives OUTSIDE GTPyhop/state
-    agent_ids = list(env.agents)
-    agent_memory = {
-        aid: {
-            "rng": random.Random(seed * 1000 + i),
-            "prev_action": DO_NOTHING,
-            "last_seen_prey": None,
-        }
-        for i, aid in enumerate(agent_ids)
-    }
-    
-    controller = HTNCommModule(mode=comm_mode, k_sync=k_sync, debug=debug)
-    
-    if debug:
-        print("=========================")
-        print(f"[DEBUG | Run_IDX={run_idx}] Starting episode with agents: {env.agents}")
-        print("[DEBUG] env.agents:", list(env.agents))
-        print("[DEBUG] obs keys:  ", list(observations.keys()))
-        for aid in env.agents:
-            print(aid, "action space:", env.action_spaces[aid])
-        print("=========================")
-        
-        
-    observer = MinimalObserver(pretty=False, debug=debug, run_idx=run_idx)
-    observer.on_reset(env, observations,infos)
-    
-    
-    
+    if env_pool is not None:
+        env = env_pool.acquire(**env_config)
+    else:
+        env = make_env(**env_config)
+    # the env goes back to the pool (or is closed) and the controller's
+    # planning pipeline is shut down even if the episode raises
+    controller = None
+    try:
+        #env = RecordVideo(env, video_folder="./videos/", name_prefix="pred_prey", episode_trigger=lambda x: True)
 
-    for t in range(time_horizon):
-        # Ask comm module to handle communication + planning + joint action
-        actions = controller.decide_actions(
-            t=t,
-            env=env,
-            observations=observations,
-            agent_memory=agent_memory,
-            keep_prev_action=keep_prev_action,
-        )
-        
-       
-        
         if debug:
-            readable = {aid: f"{act} ({ACTION_NAMES[act]})" for aid, act in actions.items()}
-            print("[DEBUG] Actions:", readable)
-       
+            print(f"Run POSGGym Predator-Prey with GTPyhop HTN planner. [DEBUG MODE]")
+            print(f"[DEBUG | Run_IDX={run_idx}] Printing GTPyhop Domain")
+            gtpyhop.print_domain()
+
+        # seed = 42 for reproducible run where the prey is captured around cell (10,9)
+        # seed = 43 gets the agents stuck in the top right; with --belief it
+        # captures in 8 steps
+        episode_t0 = time.perf_counter()
+        observations, infos = env.reset(seed=seed)
+        captured = False
+        steps_to_capture = None
+        all_done = False
+
+        if trajectory_store is not None:
+            trajectory = trajectory_store.recorder(trajectory_index)
+        else:
+            trajectory = TrajectoryRecorder(time_horizon, env_config["num_predators"], env_config["num_prey"])
+        trajectory.reset(env)
+        if record_actions:
+            action_log = ActionLogRecorder(time_horizon, env.agents)
+            action_log.reset(env, seed, env_config["grid"])
+
+
+        # Per-agent persistent memory lives OUTSIDE GTPyhop/state
+        agent_ids = list(env.agents)
+        agent_memory = init_agent_memory(agent_ids, seed)
+
+        controller = HTNCommModule(mode=comm_mode, k_sync=k_sync, debug=debug, planner=planner, pipeline=pipeline, belief=belief,
+                                   paths=paths, helper_pursuit=helper_pursuit)
+        if timing:
+            controller.stats.timings = PhaseTimings()
+            timer = StepTimer(controller.stats.timings)
+        else:
+            timer = NULL_TIMER
 
-        # step environment
-        observations, rewards, terminations, truncations, all_done, infos = env.step(actions)
-        
-        # Record all positions for prey and predators for plotting
-        record_positions(env, position_history)
-        
-        observer.on_step(t, observations, rewards, terminations, truncations, infos)
-        
-        # Persist last executed action
-        for aid in env.agents:
-            agent_memory[aid]["prev_action"] = actions[aid]
-        
-        
-        # 4) compact tick summary
         if debug:
-            print(f"[DEBUG] [t={t}] | done={all_done} | term={terminations} | trunc={truncations}")
-        
-        if render:
-            env.render()
-            time.sleep(SLEEP)
+            print("=========================")
+            print(f"[DEBUG | Run_IDX={run_idx}] Starting episode with agents: {env.agents}")
+            print("[DEBUG] env.agents:", list(env.agents))
+            print("[DEBUG] obs keys:  ", list(observations.keys()))
+            for aid in env.agents:
+                print(aid, "action space:", env.action_spaces[aid])
+            print("=========================")
+
+
+        observer = MinimalObserver(pretty=False, debug=debug, run_idx=run_idx)
+        observer.on_reset(env, observations,infos)
+
 
-        if all_done:
-            # Heuristic: capture => at least one True in terminations
+
+
+        for t in range(time_horizon):
+            timer.start()
+            # Ask comm module to handle communication + planning + joint action
+            actions = controller.decide_actions(
+                t=t,
+                env=env,
+                observations=observations,
+                agent_memory=agent_memory,
+                keep_prev_action=keep_prev_action,
+            )
+            timer.lap("decide")
+
+
+
+            if debug:
+                readable = {aid: f"{act} ({ACTION_NAMES[act]})" for aid, act in actions.items()}
+                print("[DEBUG] Actions:", readable)
+                timer.lap("log")
+
+
+            # step environment
+            if record_actions:
+                action_log.record(actions)
+            observations, rewards, terminations, truncations, all_done, infos = env.step(actions)
+            timer.lap("env_step")
+
+            # Record all positions for prey and predators for plotting
+            trajectory.record(env)
+            timer.lap("record")
+
+            observer.on_step(t, observations, rewards, terminations, truncations, infos)
+
+            # Persist last executed action
+            for aid in env.agents:
+                agent_memory[aid]["prev_action"] = actions[aid]
+            timer.lap("observer")
+
+
+            # 4) compact tick summary
+            if debug:
+                print(f"[DEBUG] [t={t}] | done={all_done} | term={terminations} | trunc={truncations}")
+                timer.lap("log")
+
+            if render:
+                env.render()
+                time.sleep(SLEEP)
+                timer.lap("render")
+
+            if all_done:
+                # Heuristic: capture => at least one True in terminations
+                if any(terminations.values()):
+                    captured = True
+                    # t is 0-based index of this step, so steps taken = t+1
+                    steps_to_capture = t + 1
+                    reason = "task_solved"
+                else:
+                    reason = "time_limit"
+                observer.on_episode_end(reason)
+                break
+
+        if not all_done:
+            # Horizon hit without env signalling all_done
             if any(terminations.values()):
                 captured = True
-                # t is 0-based index of this step, so steps taken = t+1
-                steps_to_capture = t + 1
-                reason = "task_solved"
+                steps_to_capture = time_horizon
             else:
-                reason = "time_limit"
-            observer.on_episode_end(reason)
-            break
-        
-    if not all_done:
-        # Horizon hit without env signalling all_done
-        if any(terminations.values()):
-            captured = True
-            steps_to_capture = time_horizon
+                captured = False
+                steps_to_capture = None   
+
+        print(f"[INFO] Episode finished after {t} steps: [SEED={seed}]")
+        print(f"[INFO] Comm stats: messages={controller.stats.messages}, replans={controller.stats.replans}, "
+              f"bytes_up={controller.stats.bytes_up}, bytes_down={controller.stats.bytes_down}")
+        if pipeline is not None:
+            print(f"[INFO] Pipeline stats: stale_plans={controller.stats.stale_plans}, staleness_steps={controller.stats.staleness_steps}")
+
+
+        controller.close()
+        controller.stats.wall_time_sec = time.perf_counter() - episode_t0
+        if trajectory_store is not None:
+            trajectory_store.finish(trajectory_index, trajectory)
+        if record_actions:
+            controller.stats.action_log = action_log.finish()
+        controller.stats.capture_events = list(env.capture_events)
+
+        grid_size = env.unwrapped.model.grid_size if hasattr(env.unwrapped.model, "grid_size") else (10, 10)
+    finally:
+        if controller is not None:
+            controller.close()  # no-op when already closed
+        if env_pool is not None:
+            env_pool.release(env)
         else:
-            captured = False
-            steps_to_capture = None   
-
-    print(f"[INFO] Episode finished after {t} steps: [SEED={seed}]")
-    print(f"[INFO] Comm stats: messages={controller.stats.messages}, replans={controller.stats.replans}")
+            env.close()
 
-    
-    grid_size = env.unwrapped.model.grid_size if hasattr(env.unwrapped.model, "grid_size") else (10, 10)
-    env.close()
-    
     plot_path = os.path.join(FIG_DIR, f"trajectories_seed_{seed}.png")
     if save_plot_trajectories_each_episode:
-        plot_trajectories(position_history, grid_size, save_path=plot_path)
+        from plot_utils import plot_trajectories
+        plot_trajectories(trajectory.positions, grid_size, save_path=plot_path, num_predators=trajectory.num_predators)
         print("[INFO] Saved trajectory plot to figures/trajectories_seed_{seed}.png")
     
     
-    #plot_trajectories(position_history, grid_size, save_path=plot_path)
+    #plot_trajectories(trajectory.positions, grid_size, save_path=plot_path, num_predators=trajectory.num_predators)
     
     
     return captured, steps_to_capture, controller.stats
     
 
-def main():
+def build_parser():
+    """CLI: `run` (default) simulates episodes; `plot` makes figures from saved results."""
+    parser = argparse.ArgumentParser(description="Run POSGGym Predator-Prey with GTPyhop HTN planner.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run = subparsers.add_parser("run", help="Run episodes and report capture statistics (default).")
+    run.add_argument("--debug", action="store_true", help="Enable debug mode with verbose logging.")
+    run.add_argument("--keep-prev-action", dest="keep_prev_action", action="store_true",
+                     help="When patrolling, allow repeating the previous action.")
+    run.add_argument("--no-keep-prev-action", dest="keep_prev_action", action="store_false",
+                     help="When patrolling, exclude the previous action if alternatives exist.")
+    run.add_argument("--grid", type=str, default="10x10", help="Grid name (e.g. 10x10, 15x15, 20x20).")
+    run.add_argument("--num-predators", type=int, default=2, help="Number of predators (2-8).")
+    run.add_argument("--num-prey", type=int, default=1, help="Number of prey.")
+    run.add_argument("--time-horizon", type=int, default=200, help="Maximum number of steps per episode.")
+    run.add_argument("--num-episodes", type=int, default=1, help="Number of episodes to run.")
+    run.add_argument("--render-last", action="store_false", help="Render the last episode visually.")
+    run.add_argument("--seed", type=int, default=None, help="Global experiment seed (optional). If not set, seeds vary per episode.")
+    run.add_argument("--rerun-seed", type=int, default=None, help="Run exactly one episode with this seed (overrides num-episodes and base seed).")
+    run.add_argument("--comm-mode", type=str, default="full", choices=["full", "periodic", "event", "none"], help="Communication mode between agents and planner.")
+    run.add_argument("--k-sync", type=int, default=5, help="Synchronization interval for periodic communication (comm-mode=periodic).")
+    run.add_argument("--planner", type=str, default="gtpyhop", choices=["gtpyhop", "direct", "verify"], help="Joint planner backend: GTPyhop, direct dispatch, or both cross-checked.")
+    run.add_argument("--pipeline", type=str, default=None, choices=["thread", "process"], help="Plan on a background worker while the env steps (agents act on one-step-old plans).")
+    run.add_argument("--belief", action="store_true", help="Search the planner's prey belief instead of patrolling when no prey is visible.")
+    run.add_argument("--env-impl", type=str, default="vendored", choices=["vendored", "posggym"], help="Predator-Prey implementation: the faster vendored copy in resources/ or the installed posggym one (same episodes).")
+    run.add_argument("--paths", action="store_true", help="Chase and search around blocks along cached shortest-path tables.")
+    run.add_argument("--helper-pursuit", action="store_true", help="Helpers that can't see the prey head for the leader's prey instead of copying its move.")
+    run.add_argument("--timing", action="store_true", help="Record per-phase step latencies and print a breakdown at the end.")
+    run.add_argument("--results", type=str, default=None, help="Append one record per episode to this file (.jsonl) or columnar directory.")
+    run.add_argument("--record-actions", action="store_true", help="Store each episode's seed, initial state and packed actions in its --results record for replay.")
+    run.add_argument("--results-format", type=str, default=None, choices=["jsonl", "columnar"], help="Format for --results (default: from the path).")
+    run.add_argument("--plot", action="store_true", help="Also save the capture statistics figures at the end of the run.")
+    run.set_defaults(keep_prev_action=True)
+
+    plot = subparsers.add_parser("plot", help="Plot capture statistics (and replayed trajectories) from a --results file.")
+    plot.add_argument("results", type=str, help="Results written by `run --results` (.jsonl file or columnar directory).")
+    plot.add_argument("--trajectories", type=int, default=0,
+                      help="Also replay and plot the trajectories of the first N episodes recorded with --record-actions.")
+    return parser
+
+
+def main(argv=None):
+    """
+    Entry point. Without a subcommand the arguments are treated as `run`
+    arguments, so `run_demo.py --comm-mode full` keeps working.
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in ("run", "plot", "-h", "--help"):
+        argv = ["run"] + argv
+    args = build_parser().parse_args(argv)
+    if args.command == "plot":
+        return plot_main(args)
+    return run_main(args)
+
+
+def run_main(args):
     """
     Run multiple POSGGym Predator-Prey episodes with GTPyhop HTN planner,
-    report average capture time, and plot per-run capture time.
+    report average capture time, and (with --plot) plot per-run capture time.
     
     Capture Criteria:
     Prey are captured when at least prey_strength predators are in adjacent cells, 
     where 1 <= prey_strength <= min(4, num_predators).
     """
-    # Parse command line arguments
-    parser = argparse.ArgumentParser(description="Run POSGGym Predator-Prey with GTPyhop HTN planner.")
-    parser.add_argument("--debug", action="store_true", help="Enable debug mode with verbose logging.")
-    parser.add_argument("--keep-prev-action", dest="keep_prev_action", action="store_true",
-                        help="When patrolling, allow repeating the previous action.")
-    parser.add_argument("--no-keep-prev-action", dest="keep_prev_action", action="store_false",
-                        help="When patrolling, exclude the previous action if alternatives exist.")
-    parser.add_argument("--time-horizon", type=int, default=200, help="Maximum number of steps per episode.")
-    parser.add_argument("--num-episodes", type=int, default=1, help="Number of episodes to run.")
-    parser.add_argument("--render-last", action="store_false", help="Render the last episode visually.")
-    parser.add_argument("--seed", type=int, default=None, help="Global experiment seed (optional). If not set, seeds vary per episode.")
-    parser.add_argument("--rerun-seed", type=int, default=None, help="Run exactly one episode with this seed (overrides num-episodes and base seed).")
-    parser.add_argument("--comm-mode", type=str, default="full", choices=["full", "periodic", "event", "none"], help="Communication mode between agents and planner.")
-    parser.add_argument("--k-sync", type=int, default=5, help="Synchronization interval for periodic communication (comm-mode=periodic).")
-    
-    
-    parser.set_defaults(keep_prev_action=True)
-    args = parser.parse_args()
+    from result_sink import episode_record, open_result_sink
     
     debug = args.debug
     keep_prev_action = args.keep_prev_action
@@ -243,33 +359,45 @@ def main():
     num_episodes=args.num_episodes
     comm_mode = args.comm_mode
     k_sync = args.k_sync
+    planner = args.planner
+    timing = args.timing
     
     # Data structures for metrics
     capture_times = []
     all_times = []
     successes=0
     total_messages = 0
+    total_bytes = 0
     total_replans = 0
+    total_timings = PhaseTimings() if timing else None
     
     # ---- Print configuration summary ----
     print("\n================ RUN CONFIG ================")
     print(f"Episodes:              {num_episodes}")
     print(f"Time horizon:          {time_horizon}")
-    print(f"Grid:                  10x10")            # fixed 
-    print(f"Predators:             2")                # fixed
-    print(f"Prey:                  1")                # fixed
+    print(f"Grid:                  {args.grid}")
+    print(f"Predators:             {args.num_predators}")
+    print(f"Prey:                  {args.num_prey}")
     print(f"Planner:               Joint HTN (choose_joint_action)")
     print(f"Keep previous action:  {keep_prev_action}")
     print(f"Debug mode:            {debug}")
     print(f"Render last episode:   {args.render_last}")
     print(f"Comm mode:            {comm_mode}")
     print(f"k_sync (periodic):    {k_sync}")
+    print(f"Planner backend:      {planner}")
+    print(f"Planning pipeline:    {args.pipeline}")
+    print(f"Prey belief search:   {args.belief}")
+    print(f"Shortest-path chase:  {args.paths}")
+    print(f"Helper pursuit:       {args.helper_pursuit}")
+    print(f"Env implementation:   {args.env_impl}")
+    print(f"Phase timing:         {timing}")
+    print(f"Results sink:         {args.results}")
     print("============================================\n")
     
     # If rerun-seed is given, do that and exit early.
     if args.rerun_seed is not None:
         print(f"[INFO] Re-running single episode with seed {args.rerun_seed}")
-        run_single_episode(
+        _, _, stats = run_single_episode(
             run_idx=0,
             seed=args.rerun_seed,
             time_horizon=time_horizon,
@@ -277,8 +405,20 @@ def main():
             keep_prev_action=keep_prev_action,
             render=True,
             comm_mode=comm_mode,
-            k_sync=k_sync
+            k_sync=k_sync,
+            planner=planner,
+            timing=timing,
+            grid=args.grid,
+            num_predators=args.num_predators,
+            num_prey=args.num_prey,
+            pipeline=args.pipeline,
+            belief=args.belief,
+            paths=args.paths,
+            helper_pursuit=args.helper_pursuit,
+            env_impl=args.env_impl,
         )
+        if timing:
+            print(stats.timings.format())
         return
 
     # Otherwise, normal multi-episode run: set up base_seed
@@ -289,6 +429,8 @@ def main():
         base_seed = random.randint(0, 10**6)
         print(f"[INFO] No seed provided. Using random base seed: {base_seed}")
     
+    sink = open_result_sink(args.results, args.results_format) if args.results else None
+
     for run_idx in range(num_episodes):
         #seed = 42 + run_idx  # different seed per run
         seed = base_seed + run_idx
@@ -298,7 +440,7 @@ def main():
         if debug:
             print(f"\n[INFO] === Run {run_idx+1}/{num_episodes}, seed={seed} ===")
 
-        captured, steps, stats = run_single_episode(
+        task = dict(
             run_idx=run_idx,
             seed=seed,
             time_horizon=time_horizon,
@@ -307,9 +449,26 @@ def main():
             render=render,
             k_sync=k_sync,
             comm_mode=comm_mode,
+            planner=planner,
+            timing=timing,
+            record_actions=args.record_actions,
+            grid=args.grid,
+            num_predators=args.num_predators,
+            num_prey=args.num_prey,
+            pipeline=args.pipeline,
+            belief=args.belief,
+            paths=args.paths,
+            helper_pursuit=args.helper_pursuit,
+            env_impl=args.env_impl,
         )
+        captured, steps, stats = run_single_episode(**task)
+        if sink is not None:
+            sink.write(episode_record(task, captured, steps, stats))
         total_messages += stats.messages
+        total_bytes += stats.bytes_up + stats.bytes_down
         total_replans += stats.replans
+        if timing:
+            total_timings.merge(stats.timings)
         
         if captured:
             successes += 1
@@ -317,6 +476,10 @@ def main():
         # For all_times, treat failures as horizon
         all_times.append(steps if steps is not None else time_horizon)
 
+    if sink is not None:
+        sink.close()
+        print(f"[INFO] Appended {num_episodes} episode records to {args.results}")
+
     # ---- Print stats ----
     print("\n================ RESULTS ================")
     print(f"Total runs:           {num_episodes}")
@@ -335,13 +498,24 @@ def main():
     avg_replans = total_replans / num_episodes
     print(f"Avg steps per episode (including failures):      {avg_steps_all:.2f}")
     print(f"Avg messages per episode:  {avg_messages:.2f}")
+    print(f"Avg bytes per episode:     {total_bytes / num_episodes:.2f}")
     print(f"Avg replans per episode:   {avg_replans:.2f}")
     print("=========================================\n")
+
+    if timing:
+        print("============= PHASE TIMINGS =============")
+        print(total_timings.format())
+        print("=========================================\n")
     
+    if args.plot:
+        _plot_capture_summary(all_times, capture_times, avg_capture_time, avg_steps_all, comm_mode, k_sync)
+
+
+def _plot_capture_summary(all_times, capture_times, avg_capture_time, avg_steps_all, comm_mode, k_sync):
+    # matplotlib is only imported when something is actually plotted
+    from plot_utils import plot_capture_statistics, plot_avg_steps_for_k
+
     # ---- Call the centralized plotting function ----
-    ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    fig_dir = os.path.join(ROOT, "figs")
-    os.makedirs(fig_dir, exist_ok=True)
     plot_capture_statistics(
         all_times=all_times,
         capture_times=capture_times,
@@ -352,11 +526,66 @@ def main():
     
     if comm_mode == "periodic":
         plot_avg_steps_for_k(avg_capture_time, k_sync, save_dir=FIG_DIR)
-    
-    
+
+
+def plot_main(args):
+    """Rebuild the run summary figures from saved per-episode results, without re-simulating."""
+    from result_sink import read_jsonl, read_columnar
+
+    if os.path.isdir(args.results):
+        episodes, _ = read_columnar(args.results)
+        captured = episodes["captured"].tolist()
+        steps = [int(x) if x >= 0 else None for x in episodes["steps"]]
+        horizons = episodes["time_horizon"].tolist()
+        comm_modes = episodes["comm_mode"].tolist()
+        k_syncs = episodes["k_sync"].tolist()
+    else:
+        records = list(read_jsonl(args.results))
+        captured = [r["captured"] for r in records]
+        steps = [r["steps"] for r in records]
+        horizons = [r["config"]["time_horizon"] for r in records]
+        comm_modes = [r["config"]["comm_mode"] for r in records]
+        k_syncs = [r["config"]["k_sync"] for r in records]
+    if not captured:
+        print(f"[INFO] No episodes in {args.results}")
+        return
+
+    capture_times = [st for c, st in zip(captured, steps) if c]
+    all_times = [st if st is not None else h for st, h in zip(steps, horizons)]
+    avg_capture_time = sum(capture_times) / len(capture_times) if capture_times else None
+    avg_steps_all = sum(all_times) / len(all_times)
+    print(f"[INFO] {len(all_times)} episodes, {len(capture_times)} captures")
+
+    # per-k figure only makes sense for a single periodic config
+    single_config = len(set(zip(comm_modes, k_syncs))) == 1
+    comm_mode = comm_modes[0] if single_config else None
+    _plot_capture_summary(all_times, capture_times, avg_capture_time, avg_steps_all, comm_mode, k_syncs[0])
+
+    if args.trajectories and not os.path.isdir(args.results):
+        from plot_utils import plot_trajectories
+        from replay import load_action_logs, ReplayEngine
+
+        plotted = 0
+        for record, log in load_action_logs(args.results):
+            if plotted >= args.trajectories:
+                break
+            engine = ReplayEngine(log)
+            grid_size = (engine.model.grid.width, engine.model.grid.height)
+            save_path = os.path.join(FIG_DIR, f"trajectories_seed_{record['seed']}.png")
+            plot_trajectories(engine.trajectory(), grid_size, save_path=save_path, num_predators=log.config["num_predators"])
+            print(f"[INFO] Saved trajectory plot to {save_path}")
+            plotted += 1
+        if plotted < args.trajectories:
+            print(f"[WARN] Only {plotted} of the {len(all_times)} episodes in {args.results} have an action log "
+                  f"(run with --record-actions); plotted {plotted} of the {args.trajectories} requested trajectories")
 
 
 if __name__ == "__main__":
+    # The sweep presets below need:
+    # from sweep_utils import sweep_k_sync, sweep_comm_modes, search_k_sync, StoppingRule
+    # from episode_cache import EpisodeCache
+    # from plot_utils import plot_k_vs_steps, plot_comm_modes_comparison, plot_comm_modes_success_rates, plot_k_vs_costs
+
     # UNCOMMENT TO DO K-SWEEP DIRECTLY FROM THIS FILE
     # k_values = [1, 5, 10, 20, 50]
     # results = sweep_k_sync(
@@ -366,8 +595,14 @@ if __name__ == "__main__":
     #     time_horizon=200,
     #     debug=False,
     #     keep_prev_action=True,
+    #     num_workers=None,  # one worker process per CPU
+    #     cache=EpisodeCache(),  # reuse episodes from earlier runs of the same code
+    #     # num_envs=64,  # step 64 episodes at a time in lockstep in each worker
+    #     # belief=True, paths=True, helper_pursuit=True,  # opt-in planner options, see --belief / --paths / --helper-pursuit
     # )
     
+    # # or search 1..50 for the cheapest k instead of a fixed list:
+    # # results = search_k_sync(seed=123456, k_max=50, w_messages=0.1, num_workers=None)["evaluations"]
     # plot_path = os.path.join(FIG_DIR, "k_vs_steps.png")
     # plot_k_vs_steps(results, save_path=plot_path, line=True)
     #***************************************************************
@@ -379,13 +614,33 @@ if __name__ == "__main__":
     #     time_horizon=200,
     #     debug=False,
     #     keep_prev_action=True,
-    #     k_sync=10
+    #     k_sync=10,
+    #     num_workers=None,  # one worker process per CPU
+    #     cache=EpisodeCache(),  # reuse episodes from earlier runs of the same code
+    #     # stopping=StoppingRule(),  # adaptive: num_episodes becomes a cap, see results[mode]["episodes"]
     # )
     # plot_path = os.path.join(FIG_DIR, "comm_modes_vs_steps.png")
     # plot_comm_modes_comparison(results, save_path=plot_path)
     # plot_comm_modes_success_rates(results, save_path=os.path.join(FIG_DIR, "comm_modes_success_rates.png"))
     #***************************************************************
     
+    # UNCOMMENT TO PLOT AGGREGATED HEATMAPS OF A K-SWEEP (cost does not grow with episodes)
+    # import numpy as np
+    # from heatmaps import OccupancyHeatmaps
+    # from plot_utils import plot_occupancy_heatmaps, plot_trajectory_overlay
+    # from result_sink import open_result_sink, read_columnar
+    # from trajectory import TrajectoryStore
+    # k_values, num_episodes = [1, 5, 10, 20, 50], 100
+    # with open_result_sink(".cache/heatmap_sweep") as sink:
+    #     sweep_k_sync(seed=123456, k_values=k_values, num_episodes=num_episodes, time_horizon=200, debug=False,
+    #                  keep_prev_action=True, num_workers=None, sink=sink, trajectory_path=".cache/heatmap_sweep.npy")
+    # heatmaps = OccupancyHeatmaps(10, 10, k_values)
+    # heatmaps.add_store(TrajectoryStore.open(".cache/heatmap_sweep.npy", num_predators=2), np.repeat(k_values, num_episodes))
+    # heatmaps.add_columnar(*read_columnar(".cache/heatmap_sweep"), "k_sync")
+    # plot_occupancy_heatmaps(heatmaps, save_path=os.path.join(FIG_DIR, "k_heatmaps.png"), label_name="k_sync")
+    # plot_trajectory_overlay(heatmaps, 10, save_path=os.path.join(FIG_DIR, "k10_overlay.png"), label_name="k_sync")
+    #***************************************************************
+
     # UNCOMMENT TO PLOT K-SWEEP VS COST
     # k_values = [1, 5, 10, 20, 50]
     # results = sweep_k_sync(
@@ -395,6 +650,8 @@ if __name__ == "__main__":
     #     time_horizon=200,
     #     debug=False,
     #     keep_prev_action=True,
+    #     num_workers=None,  # one worker process per CPU
+    #     cache=EpisodeCache(),  # reuse episodes from earlier runs of the same code
     # )
     # plot_path = os.path.join(FIG_DIR, "k_vs")
     # plot_k_vs_costs(results, save_path_prefix=plot_path)
@@ -1,87 +1,538 @@
+import math
+import os
 import random
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from statistics import NormalDist
 
 from comm_module import CommStats
+from phase_timing import PhaseTimings
+from result_sink import episode_record
+from trajectory import TrajectoryStore
 
-def sweep_k_sync(seed, k_values, num_episodes, time_horizon, debug, keep_prev_action):
+
+# Lockstep chunks hold this many tasks per slot, so slots freed by short
+# episodes get refilled while results still stream out chunk by chunk
+BATCH_CHUNK_ROUNDS = 4
+
+
+def _run_episode_task(task):
     from run_demo import run_single_episode
-    results = {}
-    base_seed = seed if seed is not None else random.randint(0, 10**6)
+    return run_single_episode(**task)
 
-    for k in k_values:
-        capture_times = []
-        stats = CommStats()  # or reset after each run, depending on how you're tracking
-
-        for ep in range(num_episodes):
-            run_seed = base_seed + ep
-
-            captured, steps, episode_stats = run_single_episode(
-                run_idx=ep,
-                seed=run_seed,
-                time_horizon=time_horizon,
-                debug=debug,
-                keep_prev_action=keep_prev_action,
-                render=False,
-                comm_mode="periodic",
-                k_sync=k,
-            )
 
-            if captured:
-                capture_times.append(steps)
+def _run_batched_chunk(tasks, num_envs):
+    from batched_episodes import run_tasks_batched
+    return run_tasks_batched(tasks, num_envs)
+
+
+@contextmanager
+def _episode_pool(num_workers):
+    """
+    A ProcessPoolExecutor for num_workers (None = one per CPU) that outlives
+    single iter_episode_tasks calls, so adaptive sweeps that run many short
+    rounds start their workers once; None when episodes run in this process.
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    if num_workers <= 1:
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=num_workers) as pool:
+        yield pool
+
+
+def _map_jobs(fn, jobs, num_workers, pool):
+    """fn over jobs, in order: on pool, on a new pool of num_workers, or in this process."""
+    if pool is not None:
+        yield from pool.map(fn, jobs, chunksize=1)
+        return
+
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    num_workers = min(num_workers, len(jobs))
+
+    if num_workers <= 1:
+        for job in jobs:
+            yield fn(job)
+        return
+
+    with ProcessPoolExecutor(max_workers=num_workers) as pool:
+        yield from pool.map(fn, jobs, chunksize=1)
+
+
+def iter_episode_tasks(tasks, num_workers=1, pool=None, num_envs=None):
+    """
+    Run a list of episodes and yield their results in task order as they finish.
+
+    Args:
+        tasks: list of run_single_episode kwargs dicts, one per (config, seed)
+        num_workers: number of worker processes (None = one per CPU).
+                     1 runs every episode in this process.
+        pool: executor to run on instead of a new one (see _episode_pool);
+              num_workers is then ignored
+        num_envs: if set, step episodes num_envs at a time in lockstep on a
+                  BatchedPredatorPreyModel (batched_episodes.run_tasks_batched)
+                  instead of one by one; same results
+
+    Yields:
+        (captured, steps_to_capture, CommStats), one per task
+
+    Workers pull one task at a time, so a worker that finishes a short episode
+    picks up the next one straight away instead of waiting on a fixed chunk.
+    With num_envs they pull chunks of num_envs * BATCH_CHUNK_ROUNDS tasks.
+    """
+    if num_envs is None:
+        yield from _map_jobs(_run_episode_task, tasks, num_workers, pool)
+        return
+
+    size = num_envs * BATCH_CHUNK_ROUNDS
+    chunks = [tasks[i:i + size] for i in range(0, len(tasks), size)]
+    for results in _map_jobs(partial(_run_batched_chunk, num_envs=num_envs), chunks, num_workers, pool):
+        yield from results
+
+
+def run_episode_tasks(tasks, num_workers=1, num_envs=None):
+    """Like iter_episode_tasks, but return all results as a list."""
+    return list(iter_episode_tasks(tasks, num_workers=num_workers, num_envs=num_envs))
+
+
+def _stream_results(tasks, num_workers, sink, cache=None, pool=None, num_envs=None):
+    """
+    Yield (task, result) pairs, writing each episode to sink (if given) first.
+
+    With a cache, episodes already in it are served from disk and only the
+    missing ones are simulated; each simulated episode is stored as soon as
+    it finishes. Cached episodes come first, so pairs are not in task order.
+    """
+    if cache is not None:
+        pending = []
+        for task in tasks:
+            result = cache.get(task)
+            if result is None:
+                pending.append(task)
+                continue
+            if sink is not None:
+                sink.write(episode_record(task, *result))
+            yield task, result
+        tasks = pending
+
+    for task, result in zip(tasks, iter_episode_tasks(tasks, num_workers=num_workers, pool=pool, num_envs=num_envs)):
+        if cache is not None:
+            cache.put(task, result)
+        if sink is not None:
+            sink.write(episode_record(task, *result))
+        yield task, result
+
+
+def _attach_trajectory_store(tasks, trajectory_path, time_horizon, num_predators=2, num_prey=1):
+    """
+    Create a TrajectoryStore at trajectory_path with one row per task (in task
+    order) and point every task at its row. The cache never serves these
+    tasks (EpisodeCache.get), so every row is filled by a real run.
+    """
+    if trajectory_path is None:
+        return None
+    store = TrajectoryStore.create(trajectory_path, len(tasks), time_horizon, num_predators=num_predators, num_prey=num_prey)
+    for i, task in enumerate(tasks):
+        task["trajectory_store"] = store
+        task["trajectory_index"] = i
+    return store
+
+
+def _new_totals(timing):
+    """Running totals for one sweep config; constant size however many episodes run."""
+    return {
+        "episodes": 0,
+        "captures": 0,
+        "capture_steps": 0,
+        "capture_steps_sq": 0,
+        "stats": CommStats(),
+        "timings": PhaseTimings() if timing else None,
+    }
+
+
+def _accumulate(totals, result):
+    captured, steps, episode_stats = result
+    totals["episodes"] += 1
+    if captured:
+        totals["captures"] += 1
+        totals["capture_steps"] += steps
+        totals["capture_steps_sq"] += steps * steps
+    totals["stats"].messages += episode_stats.messages
+    totals["stats"].replans += episode_stats.replans
+    totals["stats"].bytes_up += episode_stats.bytes_up
+    totals["stats"].bytes_down += episode_stats.bytes_down
+    # cached episodes carry no timings
+    if totals["timings"] is not None and episode_stats.timings is not None:
+        totals["timings"].merge(episode_stats.timings)
+
+
+def _summarize_totals(totals, stopping=None):
+    num_episodes = totals["episodes"]
+    captures = totals["captures"]
+    summary = {
+        "avg_steps": totals["capture_steps"] / captures if captures else None,
+        "success_rate": captures / num_episodes,
+        "avg_messages": totals["stats"].messages / num_episodes,
+        "avg_replans": totals["stats"].replans / num_episodes,
+        "avg_bytes": (totals["stats"].bytes_up + totals["stats"].bytes_down) / num_episodes,
+        "episodes": num_episodes,
+    }
+    if stopping is not None:
+        summary["success_ci"] = stopping.success_interval(totals)
+        summary["steps_ci"] = stopping.steps_interval(totals)
+    if totals["timings"] is not None:
+        summary["phase_timings"] = totals["timings"]
+    return summary
+
+
+class StoppingRule:
+    """
+    Sequential early stopping for the sweeps.
+
+    Every config still running gets batch_size more episodes per round; a
+    config stops once it has min_episodes and either
+      - its success-rate interval (Wilson) is at most success_width wide and
+        its mean steps-to-capture interval (normal approximation) at most
+        steps_width steps wide (a config with fewer than 2 captures has no
+        steps estimate to narrow, so only the success rate counts), or
+      - it is separated from every other config (and there is at least
+        one): against each one, the success-rate or the steps interval does
+        not overlap,
+    or when it reaches the sweep's num_episodes. Intervals are at the given
+    confidence level. Episode i of a config always uses the same seed as in a
+    fixed-size sweep, so an adaptive sweep runs a prefix of the fixed one
+    (and shares its EpisodeCache entries).
+    """
 
-            # Accumulate stats
-            stats.messages += episode_stats.messages
-            stats.replans += episode_stats.replans
+    def __init__(self, batch_size=10, min_episodes=20, success_width=0.2, steps_width=20.0, confidence=0.95):
+        self.batch_size = batch_size
+        self.min_episodes = min_episodes
+        self.success_width = success_width
+        self.steps_width = steps_width
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
 
-        avg_steps = sum(capture_times) / len(capture_times) if capture_times else None
-        success_rate = len(capture_times) / num_episodes
-        avg_replans = stats.replans / num_episodes
-        avg_messages = stats.messages / num_episodes
+    def success_interval(self, totals):
+        """Wilson score interval for the capture rate."""
+        n = totals["episodes"]
+        if n == 0:
+            return (0.0, 1.0)
+        p = totals["captures"] / n
+        z2 = self.z * self.z
+        center = (p + z2 / (2 * n)) / (1 + z2 / n)
+        half = self.z * math.sqrt(p * (1 - p) / n + z2 / (4 * n * n)) / (1 + z2 / n)
+        return (max(0.0, center - half), min(1.0, center + half))
 
-        results[k] = {
-            "avg_steps": avg_steps,
-            "success_rate": success_rate,
-            "avg_replans": avg_replans,
-            "avg_messages": avg_messages,
-        }
+    def steps_interval(self, totals):
+        """Normal-approximation interval for the mean steps to capture, None below 2 captures."""
+        c = totals["captures"]
+        if c < 2:
+            return None
+        mean = totals["capture_steps"] / c
+        var = max(0.0, (totals["capture_steps_sq"] - c * mean * mean) / (c - 1))
+        half = self.z * math.sqrt(var / c)
+        return (mean - half, mean + half)
+
+    def _settled(self, totals):
+        lo, hi = self.success_interval(totals)
+        if hi - lo > self.success_width:
+            return False
+        steps = self.steps_interval(totals)
+        # under 2 captures there is no steps estimate to narrow
+        return steps is None or steps[1] - steps[0] <= self.steps_width
+
+    def _separated(self, totals, others):
+        # a lone config has nothing to be separated from; only _settled stops it
+        if not others:
+            return False
+
+        def disjoint(a, b):
+            return a is not None and b is not None and (a[1] < b[0] or b[1] < a[0])
+        success = self.success_interval(totals)
+        steps = self.steps_interval(totals)
+        return all(
+            disjoint(success, self.success_interval(o)) or disjoint(steps, self.steps_interval(o))
+            for o in others
+        )
+
+    def should_stop(self, totals, others):
+        """Whether a config with these totals is done, given the totals of the other configs."""
+        if totals["episodes"] < self.min_episodes:
+            return False
+        return self._settled(totals) or self._separated(totals, others)
+
+
+def _run_sweep(tasks, config_of, configs, num_episodes, num_workers, sink, cache, timing, stopping, num_envs=None):
+    """
+    Run a sweep's tasks (config-major, num_episodes per config) and return
+    the running totals per config.
+
+    Without a stopping rule every task runs. With one, tasks run in rounds of
+    stopping.batch_size episodes per config still going, in task order, and a
+    config drops out as soon as stopping.should_stop says so.
+    """
+    totals = {c: _new_totals(timing) for c in configs}
+    if stopping is None:
+        for task, result in _stream_results(tasks, num_workers, sink, cache, num_envs=num_envs):
+            _accumulate(totals[config_of(task)], result)
+        return totals
+
+    queues = {c: [t for t in tasks if config_of(t) == c] for c in configs}
+    active = [c for c in configs if queues[c]]
+    with _episode_pool(num_workers) as pool:
+        while active:
+            batch = []
+            for c in active:
+                done = totals[c]["episodes"]
+                batch.extend(queues[c][done:done + stopping.batch_size])
+            for task, result in _stream_results(batch, num_workers, sink, cache, pool, num_envs):
+                _accumulate(totals[config_of(task)], result)
+            active = [
+                c for c in active
+                if totals[c]["episodes"] < num_episodes
+                and not stopping.should_stop(totals[c], [totals[o] for o in configs if o != c])
+            ]
+    return totals
+
+
+def sweep_k_sync(seed, k_values, num_episodes, time_horizon, debug, keep_prev_action, num_workers=1, planner="gtpyhop", timing=False, sink=None, cache=None, trajectory_path=None, record_actions=False, stopping=None, grid="10x10", num_predators=2, num_prey=1, num_envs=None, belief=False, paths=False, helper_pursuit=False):
+    """
+    Periodic comm mode at every k in k_values, num_episodes each (at most
+    num_episodes with a StoppingRule as stopping), on the given grid and
+    team size. With num_envs, each worker steps that many episodes at a time
+    in lockstep (see iter_episode_tasks); belief, paths and helper_pursuit
+    are passed to run_single_episode. Returns {k: summary}.
+    """
+    results = {}
+    base_seed = seed if seed is not None else random.randint(0, 10**6)
+
+    tasks = [
+        dict(
+            run_idx=ep,
+            seed=base_seed + ep,
+            time_horizon=time_horizon,
+            debug=debug,
+            keep_prev_action=keep_prev_action,
+            render=False,
+            comm_mode="periodic",
+            k_sync=k,
+            planner=planner,
+            timing=timing,
+            record_actions=record_actions,
+            grid=grid,
+            num_predators=num_predators,
+            num_prey=num_prey,
+            belief=belief,
+            paths=paths,
+            helper_pursuit=helper_pursuit,
+        )
+        for k in k_values
+        for ep in range(num_episodes)
+    ]
+    _attach_trajectory_store(tasks, trajectory_path, time_horizon, num_predators, num_prey)
+    totals = _run_sweep(tasks, lambda task: task["k_sync"], k_values, num_episodes,
+                        num_workers, sink, cache, timing, stopping, num_envs)
+
+    for k in k_values:
+        results[k] = _summarize_totals(totals[k], stopping)
 
     return results
 
-def sweep_comm_modes(seed, num_episodes, time_horizon, debug, keep_prev_action, k_sync=10):
-    from run_demo import run_single_episode
+def sweep_comm_modes(seed, num_episodes, time_horizon, debug, keep_prev_action, k_sync=10, num_workers=1, planner="gtpyhop", timing=False, sink=None, cache=None, trajectory_path=None, record_actions=False, stopping=None, grid="10x10", num_predators=2, num_prey=1, num_envs=None, belief=False, paths=False, helper_pursuit=False):
+    """
+    Every comm mode, num_episodes each (at most num_episodes with a
+    StoppingRule as stopping), on the given grid and team size. With
+    num_envs, each worker steps that many episodes at a time in lockstep
+    (see iter_episode_tasks); belief, paths and helper_pursuit are passed
+    to run_single_episode. Returns {mode: summary}.
+    """
     comm_modes = ["full", "periodic", "event", "none"]
     results = {}
 
+    tasks = [
+        dict(
+            run_idx=i,
+            seed=seed + i,
+            time_horizon=time_horizon,
+            debug=debug,
+            keep_prev_action=keep_prev_action,
+            render=False,
+            comm_mode=mode,
+            k_sync=k_sync,
+            planner=planner,
+            timing=timing,
+            record_actions=record_actions,
+            grid=grid,
+            num_predators=num_predators,
+            num_prey=num_prey,
+            belief=belief,
+            paths=paths,
+            helper_pursuit=helper_pursuit,
+        )
+        for mode in comm_modes
+        for i in range(num_episodes)
+    ]
+    _attach_trajectory_store(tasks, trajectory_path, time_horizon, num_predators, num_prey)
+    totals = _run_sweep(tasks, lambda task: task["comm_mode"], comm_modes, num_episodes,
+                        num_workers, sink, cache, timing, stopping, num_envs)
+
     for mode in comm_modes:
-        capture_times = []
-        total_msgs = 0
-        total_replans = 0
-        successes = 0
-
-        for i in range(num_episodes):
-            run_seed = seed + i
-            captured, steps, stats = run_single_episode(
-                run_idx=i,
-                seed=run_seed,
-                time_horizon=time_horizon,
-                debug=debug,
-                keep_prev_action=keep_prev_action,
-                render=False,
-                comm_mode=mode,
-                k_sync=10,
-            )
-            if captured:
-                capture_times.append(steps)
-                successes += 1
-            total_msgs += stats.messages
-            total_replans += stats.replans
-
-        avg_steps = sum(capture_times) / len(capture_times) if capture_times else None
-        success_rate = successes / num_episodes
-        results[mode] = {
-            "avg_steps": avg_steps,
-            "success_rate": success_rate,
-            "avg_messages": total_msgs / num_episodes,
-            "avg_replans": total_replans / num_episodes,
-        }
+        results[mode] = _summarize_totals(totals[mode], stopping)
 
     return results
+
+
+def _pareto(points):
+    """Keys of the non-dominated entries of {key: (objective, ...)}, all minimised."""
+    front = []
+    for k, p in points.items():
+        dominated = any(
+            all(a <= b for a, b in zip(q, p)) and any(a < b for a, b in zip(q, p))
+            for j, q in points.items() if j != k
+        )
+        if not dominated:
+            front.append(k)
+    return sorted(front)
+
+
+def search_k_sync(seed, k_min=1, k_max=50, num_episodes=60, time_horizon=200, debug=False, keep_prev_action=True,
+                  w_steps=1.0, w_messages=0.1, w_replans=0.0, batch_size=10, min_episodes=20, max_total_episodes=None,
+                  confidence=0.95, num_workers=1, planner="gtpyhop", sink=None, cache=None,
+                  grid="10x10", num_predators=2, num_prey=1, num_envs=None, belief=False, paths=False, helper_pursuit=False):
+    """
+    Search the integer k_sync range [k_min, k_max] of periodic mode (on
+    grid, with num_predators and num_prey; num_envs, belief, paths and
+    helper_pursuit as in sweep_k_sync) for
+    the lowest weighted cost per episode,
+
+        w_steps * steps + w_messages * messages + w_replans * replans,
+
+    where steps is the steps to capture, or time_horizon for a miss.
+
+    Episode i of every k uses seed + i, so two ks are compared on their
+    per-seed cost differences, which vary far less than the costs
+    themselves. The search starts from k_min, k_max and the powers of two in
+    between (min_episodes each), then in rounds, the candidates being the
+    best k (lowest mean cost) and every k whose paired difference to it is
+    not significantly above zero:
+      - while several candidates remain and some have fewer than
+        num_episodes, each gets batch_size more episodes, which drops the
+        ones that are clearly worse;
+      - otherwise the gaps between each candidate and its evaluated
+        neighbours are bisected and the midpoints evaluated (min_episodes
+        each);
+    until no candidate has an unevaluated neighbour or max_total_episodes
+    have run.
+
+    Returns:
+        dict with
+          best_k: k with the lowest mean cost
+          pareto: ks not dominated on (mean steps incl. misses, avg messages)
+          evaluations: {k: sweep summary + "cost", "cost_ci", "avg_steps_all"}
+                       (cost_ci is the unpaired interval of the mean cost)
+          episodes: episodes run in total
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    totals = {}
+    costs = {}  # k -> {episode index: cost}
+    steps_all = {}  # k -> summed steps, misses counted as time_horizon
+
+    def run(k_counts):
+        tasks = []
+        for k, extra in k_counts.items():
+            if k not in totals:
+                totals[k] = _new_totals(False)
+                costs[k] = {}
+                steps_all[k] = 0
+            start = totals[k]["episodes"]
+            tasks.extend(
+                dict(
+                    run_idx=ep,
+                    seed=seed + ep,
+                    time_horizon=time_horizon,
+                    debug=debug,
+                    keep_prev_action=keep_prev_action,
+                    render=False,
+                    comm_mode="periodic",
+                    k_sync=k,
+                    planner=planner,
+                    grid=grid,
+                    num_predators=num_predators,
+                    num_prey=num_prey,
+                    belief=belief,
+                    paths=paths,
+                    helper_pursuit=helper_pursuit,
+                )
+                for ep in range(start, min(start + extra, num_episodes))
+            )
+        for task, result in _stream_results(tasks, num_workers, sink, cache, pool, num_envs):
+            k = task["k_sync"]
+            _accumulate(totals[k], result)
+            captured, steps, stats = result
+            episode_steps = steps if captured else time_horizon
+            costs[k][task["run_idx"]] = w_steps * episode_steps + w_messages * stats.messages + w_replans * stats.replans
+            steps_all[k] += episode_steps
+        return len(tasks)
+
+    def interval(values):
+        n = len(values)
+        mean = sum(values) / n
+        var = sum((v - mean) ** 2 for v in values) / (n - 1) if n > 1 else float("inf")
+        half = z * math.sqrt(var / n)
+        return mean, mean - half, mean + half
+
+    def mean_cost(k):
+        return sum(costs[k].values()) / len(costs[k])
+
+    def tied_with(k, best):
+        """Whether k's cost is not significantly above best's on the seeds both ran."""
+        common = costs[k].keys() & costs[best].keys()
+        return interval([costs[k][ep] - costs[best][ep] for ep in common])[1] <= 0
+
+    initial = {k_min, k_max}
+    p = 1
+    while p < k_max:
+        if p > k_min:
+            initial.add(p)
+        p *= 2
+    # one worker pool for every round
+    with _episode_pool(num_workers) as pool:
+        used = run({k: min_episodes for k in sorted(initial)})
+
+        while max_total_episodes is None or used < max_total_episodes:
+            ks = sorted(totals)
+            best = min(ks, key=mean_cost)
+            candidates = [k for k in ks if k == best or tied_with(k, best)]
+
+            more = {k: batch_size for k in candidates if totals[k]["episodes"] < num_episodes}
+            if len(candidates) > 1 and more:
+                used += run(more)
+                continue
+
+            midpoints = set()
+            for k in candidates:
+                i = ks.index(k)
+                for j in (i - 1, i + 1):
+                    if 0 <= j < len(ks) and abs(ks[j] - k) > 1:
+                        midpoints.add((ks[j] + k) // 2)
+            if not midpoints:
+                break
+            used += run({k: min_episodes for k in sorted(midpoints)})
+
+    evaluations = {}
+    for k in sorted(totals):
+        summary = _summarize_totals(totals[k])
+        mean, lo, hi = interval(list(costs[k].values()))
+        summary["cost"] = mean
+        summary["cost_ci"] = (lo, hi)
+        summary["avg_steps_all"] = steps_all[k] / totals[k]["episodes"]
+        evaluations[k] = summary
+
+    return {
+        "best_k": min(evaluations, key=lambda k: evaluations[k]["cost"]),
+        "pareto": _pareto({k: (e["avg_steps_all"], e["avg_messages"]) for k, e in evaluations.items()}),
+        "evaluations": evaluations,
+        "episodes": used,
+    }
@@ -0,0 +1,127 @@
+import os
+
+import numpy as np
+
+# Positions are (x, y) grid coords; every supported grid fits in int16
+POS_DTYPE = np.int16
+
+
+class TrajectoryRecorder:
+    """
+    Records one episode's predator and prey positions into a preallocated
+    (horizon + 1, num_predators + num_prey, 2) array.
+
+    Entities are predators first, then prey, in env state order. Row 0 is the
+    state after reset and row t the state after step t, so nothing is
+    allocated while the episode runs.
+
+    Args:
+        horizon: max steps in the episode
+        num_predators, num_prey: entity counts
+        out: optional (horizon + 1, n_entities, 2) array to write into, e.g. one
+             episode's slice of a TrajectoryStore
+    """
+
+    def __init__(self, horizon, num_predators, num_prey, out=None):
+        shape = (horizon + 1, num_predators + num_prey, 2)
+        if out is None:
+            out = np.zeros(shape, dtype=POS_DTYPE)
+        elif out.shape != shape:
+            raise ValueError(f"out has shape {out.shape}, expected {shape}")
+        self.buffer = out
+        self.num_predators = num_predators
+        self.length = 0
+
+    def record_state(self, state):
+        """Append the positions in a PPState (or any (predator_coords, prey_coords, ...) tuple)."""
+        row = self.buffer[self.length]
+        row[:self.num_predators] = state[0]
+        row[self.num_predators:] = state[1]
+        self.length += 1
+
+    def reset(self, env):
+        """Start over and record the initial positions."""
+        self.length = 0
+        self.record_state(env.unwrapped.state)
+
+    def record(self, env):
+        """Append the positions after one env step."""
+        self.record_state(env.unwrapped.state)
+
+    @property
+    def positions(self):
+        """(length, n_entities, 2) view of the recorded steps."""
+        return self.buffer[:self.length]
+
+
+class TrajectoryStore:
+    """
+    Trajectories for a whole sweep in a memory-mapped .npy file.
+
+    positions has shape (num_episodes, horizon + 1, n_entities, 2) and lives in
+    `path`; lengths (rows written per episode, 0 if the episode never ran)
+    lives next to it in `<path minus .npy>.lengths.npy`. Both are ordinary .npy
+    files, so np.load(path, mmap_mode="r") reads them back without this class.
+
+    The store pickles as its paths, so it can be passed to sweep worker
+    processes, which reopen the files and write their own episodes in place.
+    """
+
+    def __init__(self, path, num_predators, mode="r+"):
+        self.path = path
+        self.num_predators = num_predators
+        self.mode = mode
+        self._open()
+
+    @staticmethod
+    def _lengths_path(path):
+        return os.path.splitext(path)[0] + ".lengths.npy"
+
+    def _open(self):
+        self.positions = np.load(self.path, mmap_mode=self.mode)
+        self.lengths = np.load(self._lengths_path(self.path), mmap_mode=self.mode)
+
+    @classmethod
+    def create(cls, path, num_episodes, horizon, num_predators, num_prey):
+        """Create (or overwrite) the files for num_episodes episodes and open them."""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        positions = np.lib.format.open_memmap(
+            path, mode="w+", dtype=POS_DTYPE,
+            shape=(num_episodes, horizon + 1, num_predators + num_prey, 2),
+        )
+        lengths = np.lib.format.open_memmap(
+            cls._lengths_path(path), mode="w+", dtype=np.int32, shape=(num_episodes,),
+        )
+        del positions, lengths  # flushed on close
+        return cls(path, num_predators)
+
+    @classmethod
+    def open(cls, path, num_predators, mode="r"):
+        return cls(path, num_predators, mode=mode)
+
+    def __getstate__(self):
+        return {"path": self.path, "num_predators": self.num_predators, "mode": self.mode}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    def __len__(self):
+        return self.positions.shape[0]
+
+    def recorder(self, episode_idx):
+        """TrajectoryRecorder that writes straight into episode episode_idx."""
+        horizon = self.positions.shape[1] - 1
+        num_prey = self.positions.shape[2] - self.num_predators
+        return TrajectoryRecorder(horizon, self.num_predators, num_prey, out=self.positions[episode_idx])
+
+    def finish(self, episode_idx, recorder):
+        """Store the episode's length and flush its rows to disk."""
+        self.lengths[episode_idx] = recorder.length
+        self.positions.flush()
+        self.lengths.flush()
+
+    def episode(self, episode_idx):
+        """(length, n_entities, 2) positions of one episode."""
+        return self.positions[episode_idx, :self.lengths[episode_idx]]
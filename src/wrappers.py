@@ -25,7 +25,7 @@ class ActionLoggingWrapper(posggym.Wrapper):
     def reset(self, *args, **kwargs):
         obs, infos = self.env.reset(*args, **kwargs)
         self.t = 0
-        self._t0 = time.time()
+        self._t0 = time.perf_counter()
         # prime previous flags from current state
         self._prev_prey_caught = tuple(self.unwrapped.state[2])
         self.capture_events.clear()
@@ -54,7 +54,7 @@ class ActionLoggingWrapper(posggym.Wrapper):
                 # who was adjacent this step?
                 involved_pred_idx = [pi for pi, pc in enumerate(preds) if manhattan(pc, prey_coord) <= 1]
                 # wall-clock and step timing
-                wall_sec = None if self._t0 is None else (time.time() - self._t0)
+                wall_sec = None if self._t0 is None else (time.perf_counter() - self._t0)
                 event = {
                     "step": self.t,
                     "wall_time_sec": wall_sec,
@@ -89,9 +89,9 @@ class ActionLoggingWrapper(posggym.Wrapper):
             self.episode_rewards[aid] = self.episode_rewards.get(aid, 0.0) + float(r)
 
         # post-step state & logs
-        preds_after = tuple(self.unwrapped.state[0])
-        preys_after = tuple(self.unwrapped.state[1])
         if self.debug and (self.t % self.log_every == 0):
+            preds_after = tuple(self.unwrapped.state[0])
+            preys_after = tuple(self.unwrapped.state[1])
             print(f"         rewards={rewards} term={term} trunc={trunc} all_done={done}")
             print(f"         after  preds={preds_after}  preys={preys_after}")
 
@@ -100,7 +100,7 @@ class ActionLoggingWrapper(posggym.Wrapper):
 
         # episode summary when done
         if done:
-            total_wall = None if self._t0 is None else (time.time() - self._t0)
+            total_wall = None if self._t0 is None else (time.perf_counter() - self._t0)
             if self.debug:
                 print("\n=== EPISODE SUMMARY ===")
                 print(f"steps_taken={self.t+1} "